@@ -1,17 +1,46 @@
 
 import os
+import io
+import base64
+import bisect
+import csv
 import json
+import time
 import decimal
+import math
+import multiprocessing
+import hashlib
+import importlib.util
+import itertools
+import queue
+import random
+import re
+import threading
+import unicodedata
 from datetime import datetime, date, timedelta
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify, send_from_directory, render_template
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import lru_cache
+from flask import Flask, Response, request, jsonify, send_from_directory, render_template, g, has_app_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import psycopg2
-from psycopg2.extras import RealDictCursor
+import psycopg2.errors
+import psycopg2.extensions
+import psycopg2.pool
+from psycopg2.extras import RealDictCursor, execute_values
 from urllib.parse import urlparse
 import requests
+from requests.adapters import HTTPAdapter
 import bcrypt
 import jwt
+try:
+    import orjson
+except ImportError:  # in requirements.txt; without it JSON responses use the stdlib encoder
+    orjson = None
 import collections
 from collections import defaultdict
 
@@ -20,11 +49,108 @@ load_dotenv()
 HF_API_TOKEN = os.getenv("HF_API_TOKEN", "")
 HF_HEADERS = {"Authorization": f"Bearer {HF_API_TOKEN}"} if HF_API_TOKEN else {}
 EMOTION_MODEL = os.getenv("EMOTION_MODEL", "j-hartmann/emotion-english-distilroberta-base")
+EMOTION_API_URL = os.getenv("EMOTION_API_URL", f"https://api-inference.huggingface.co/models/{EMOTION_MODEL}")
+
+# Micro-batching: concurrent analyze_emotion calls are merged into one request
+# of up to EMOTION_BATCH_SIZE texts, waiting at most EMOTION_BATCH_WINDOW_MS.
+EMOTION_BATCH_SIZE = int(os.getenv("EMOTION_BATCH_SIZE", "16"))
+EMOTION_BATCH_WINDOW_MS = float(os.getenv("EMOTION_BATCH_WINDOW_MS", "10"))
+EMOTION_BATCH_CONCURRENCY = int(os.getenv("EMOTION_BATCH_CONCURRENCY", "4"))
+
+# Inference client: pooled keep-alive connections, separate connect/read
+# timeouts, jittered retries while the model is loading (503) and a circuit
+# breaker that fails fast after EMOTION_BREAKER_THRESHOLD consecutive failures.
+EMOTION_CONNECT_TIMEOUT = float(os.getenv("EMOTION_CONNECT_TIMEOUT", "3.05"))
+EMOTION_TIMEOUT = float(os.getenv("EMOTION_TIMEOUT", "15"))
+EMOTION_RETRIES = int(os.getenv("EMOTION_RETRIES", "2"))
+EMOTION_RETRY_BASE_SECONDS = float(os.getenv("EMOTION_RETRY_BASE_SECONDS", "0.5"))
+EMOTION_RETRY_MAX_SECONDS = float(os.getenv("EMOTION_RETRY_MAX_SECONDS", "5"))
+EMOTION_BREAKER_THRESHOLD = int(os.getenv("EMOTION_BREAKER_THRESHOLD", "5"))
+EMOTION_BREAKER_COOLDOWN = float(os.getenv("EMOTION_BREAKER_COOLDOWN", "30"))
+# Label stored on entries whose analysis had to be deferred
+PLACEHOLDER_EMOTION = "neutral"
+
+# Background analysis. In "async" mode POST /api/entries stores the entry as
+# pending and returns 202; worker threads fill in the emotion columns later.
+ENTRY_ANALYSIS_MODE = os.getenv("ENTRY_ANALYSIS_MODE", "sync")
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+ANALYSIS_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_MAX_ATTEMPTS", "5"))
+ANALYSIS_RETRY_BASE_SECONDS = float(os.getenv("ANALYSIS_RETRY_BASE_SECONDS", "2"))
+ANALYSIS_RETRY_MAX_SECONDS = float(os.getenv("ANALYSIS_RETRY_MAX_SECONDS", "300"))
+ANALYSIS_LEASE_SECONDS = float(os.getenv("ANALYSIS_LEASE_SECONDS", "120"))
+ANALYSIS_POLL_SECONDS = float(os.getenv("ANALYSIS_POLL_SECONDS", "5"))
+
+# entries is partitioned by month on created_at. Maintenance keeps partitions
+# ENTRY_PARTITION_MONTHS_AHEAD months ahead and applies retention: entries
+# older than their owner's plan history_days plus ENTRY_RETENTION_GRACE_DAYS
+# are moved to entries_archive ("archive"), deleted ("delete") or kept
+# ("keep"). One app process runs it every ENTRY_MAINTENANCE_SECONDS (0 = only
+# through `python db_setup.py --maintain`).
+ENTRY_PARTITION_MONTHS_AHEAD = int(os.getenv("ENTRY_PARTITION_MONTHS_AHEAD", "3"))
+ENTRY_RETENTION = os.getenv("ENTRY_RETENTION", "archive")
+ENTRY_RETENTION_GRACE_DAYS = int(os.getenv("ENTRY_RETENTION_GRACE_DAYS", "1"))
+ENTRY_RETENTION_BATCH_SIZE = int(os.getenv("ENTRY_RETENTION_BATCH_SIZE", "5000"))
+ENTRY_MAINTENANCE_SECONDS = float(os.getenv("ENTRY_MAINTENANCE_SECONDS", "3600"))
+
+# Two emotions "co-occur" in an entry when both score at least this many
+# percent. The rollups are built with this value; other thresholds passed to
+# /api/stats are computed from the entries table. Changing it requires a
+# rebuild_rollups().
+COOCCURRENCE_THRESHOLD = float(os.getenv("COOCCURRENCE_THRESHOLD", "10"))
+
+# Bulk import: rows are analyzed, quota-checked and inserted this many at a time
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "200"))
+
+# Export: rows fetched per round trip from the server-side cursor
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "2000"))
+# Largest page GET /api/entries/search returns; every match is ranked before paging
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "100"))
 JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key-change-in-production")
 
+# Password hashing runs on BCRYPT_WORKERS lower-priority processes per app
+# process (0 = in the request thread). At most BCRYPT_MAX_PENDING hashes may
+# be queued or running; further logins and registrations get a 503.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "2"))
+BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", "16"))
+BCRYPT_TIMEOUT = float(os.getenv("BCRYPT_TIMEOUT", "10"))
+BCRYPT_NICE = int(os.getenv("BCRYPT_NICE", "10"))
+
+# analyze_emotion result cache: an in-process LRU in front of the emotion_cache table
+EMOTION_CACHE_SIZE = int(os.getenv("EMOTION_CACHE_SIZE", "2048"))
+EMOTION_CACHE_TTL = float(os.getenv("EMOTION_CACHE_TTL", "86400"))
+
+# Authenticated-user cache: the users row behind each request, per process.
+# Writes in this process invalidate it; other processes see them after the TTL.
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "4096"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+
+# Conditional GETs: /api/entries, /api/stats and /api/profile carry an ETag
+# derived from the user's data_version, tier, usage and the date. Matching
+# If-None-Match requests get a 304; otherwise bodies of up to
+# RESPONSE_CACHE_MAX_BYTES are kept per URL and user and reused while the
+# ETag is unchanged.
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", "262144"))
+
+# Metrics are kept per process and served in the Prometheus text format at
+# /metrics (behind "Authorization: Bearer <METRICS_TOKEN>" when it is set).
+# Requests slower than SLOW_REQUEST_MS (0 = off) are logged with the time
+# spent in each phase.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+
 # New: Use a single DATABASE_URL for connection
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Connection pool sizing. Each request checks out one connection and every
+# helper it calls shares it; the pool only opens new ones up to DB_POOL_MAX.
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_POOL_HEALTHCHECK_SECONDS = float(os.getenv("DB_POOL_HEALTHCHECK_SECONDS", "30"))
+
 # Subscription plans configuration
 SUBSCRIPTION_PLANS = {
     "free": {
@@ -32,6 +158,7 @@ SUBSCRIPTION_PLANS = {
         "monthly_price": 0,
         "max_entries": 5,
         "history_days": 7,
+        "export_formats": [],
         "features": ["Basic emotion analysis", "7-day history"],
         "limitations": ["No advanced analytics", "No export功能"]
     },
@@ -40,6 +167,7 @@ SUBSCRIPTION_PLANS = {
         "monthly_price": 9.99,
         "max_entries": 1000,
         "history_days": 30,
+        "export_formats": ["csv"],
         "features": ["Detailed emotion analysis", "30-day history", "Advanced analytics", "Export to CSV"]
     },
     "enterprise": {
@@ -47,6 +175,7 @@ SUBSCRIPTION_PLANS = {
         "monthly_price": 29.99,
         "max_entries": 10000,
         "history_days": 365,
+        "export_formats": ["csv", "ndjson"],
         "features": ["Team management", "Unlimited history", "API access", "Custom emotion models"]
     }
 }
@@ -62,8 +191,205 @@ EMOTION_EMOJIS = {
     'neutral': '😐',
 }
 
+# Order of the scores in the emotion_scores vectors stored with entries and
+# cached analyses: one per label the model returns. Labels may be appended;
+# reordering or removing one needs a migration of the stored vectors.
+EMOTION_LABELS = tuple(EMOTION_EMOJIS)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+LABEL_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n"})
+
+
+def format_labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{str(value).translate(LABEL_ESCAPES)}"' for name, value in pairs) + "}"
+
+
+class Histogram:
+    """Thread-safe histogram with one series per combination of label values."""
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [count per bucket..., count above the last, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self):
+        with self._lock:
+            series = sorted((values, list(counts)) for values, counts in self._series.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for values, counts in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels(self.labels, values, le=bound)} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, values)} {counts[-1]}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, values)} {cumulative}")
+        return lines
+
+
+class Metrics:
+    """Registry of histograms plus collectors that report gauges when scraped."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self._histograms = []
+        self._collectors = []
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        histogram = Histogram(self.prefix + name, documentation, labels, buckets)
+        self._histograms.append(histogram)
+        return histogram
+
+    def collector(self, fn):
+        """Registers ``fn``, which yields (name, documentation, value) gauges at scrape time."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for histogram in self._histograms:
+            lines += histogram.render()
+        for collect in self._collectors:
+            try:
+                gauges = list(collect())
+            except Exception as err:
+                app.logger.warning("metrics collector %s failed: %s", collect.__name__, err)
+                continue
+            for name, documentation, value in gauges:
+                lines += [f"# HELP {self.prefix}{name} {documentation}", f"# TYPE {self.prefix}{name} gauge",
+                          f"{self.prefix}{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics("moodjournal_")
+request_latency = metrics.histogram(
+    "http_request_duration_seconds", "Time to handle a request, by route.", ("method", "route", "status"))
+request_phase_latency = metrics.histogram(
+    "http_request_phase_seconds", "Time requests spent in each phase, by route.", ("route", "phase"))
+query_latency = metrics.histogram(
+    "db_query_duration_seconds", "Time to execute a database statement, by query name.", ("query",))
+inference_latency = metrics.histogram(
+    "emotion_inference_duration_seconds", "Time per inference HTTP request, retries included.", ("outcome",))
+inference_batch_size = metrics.histogram(
+    "emotion_inference_batch_size", "Texts sent per inference request.", buckets=BATCH_SIZE_BUCKETS)
+
+
+def record_phase(phase, seconds):
+    """Adds ``seconds`` to the current request's ``phase`` (a no-op outside requests)."""
+    if has_app_context() and "phases" in g:
+        g.phases[phase] = g.phases.get(phase, 0.0) + seconds
+
+
+@contextmanager
+def timed_phase(phase):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter() - started)
+
+
+# Statements can name themselves with a leading "-- name: <name>" comment,
+# which also shows up in pg_stat_activity; others are named after their verb
+# and first table, e.g. "select_users".
+QUERY_NAME_RE = re.compile(r"^\s*--\s*name:\s*(\w+)")
+QUERY_TABLE_RE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+(\w+)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def query_name(head):
+    named = QUERY_NAME_RE.match(head)
+    if named:
+        return named.group(1)
+    words = head.split(None, 1)
+    verb = words[0].lower() if words else "unknown"
+    table = QUERY_TABLE_RE.search(head)
+    return f"{verb}_{table.group(1).lower()}" if table else verb
+
+
+class TimedCursorMixin:
+    """Times execute() into query_latency and the request's "db" phase."""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record_query(query, time.perf_counter() - started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            record_query(query, time.perf_counter() - started)
+
+
+def record_query(query, seconds):
+    """Observes one statement's time in query_latency and the request's "db" phase."""
+    # execute_values() sends bytes; only the start of a statement is needed for its name
+    head = (query.decode("utf-8", "replace") if isinstance(query, bytes) else str(query))[:300]
+    query_latency.observe(seconds, query_name(head))
+    record_phase("db", seconds)
+    if has_app_context() and "phases" in g:
+        g.queries = g.get("queries", 0) + 1
+
+
+_timed_cursor_classes = {}
+
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    """Connection whose cursors, of whatever cursor_factory, time their statements."""
+
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.get("cursor_factory") or self.cursor_factory or psycopg2.extensions.cursor
+        timed = _timed_cursor_classes.get(factory)
+        if timed is None:
+            timed = _timed_cursor_classes.setdefault(
+                factory, type(f"Timed{factory.__name__}", (TimedCursorMixin, factory), {}))
+        kwargs["cursor_factory"] = timed
+        return super().cursor(*args, **kwargs)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Counts building JSON responses as the request's "serialize" phase.
+
+    Compact output is encoded with orjson when it is installed, several
+    times faster than the stdlib on large entry pages. Keys stay sorted and
+    datetimes and other types orjson doesn't know still go through Flask's
+    conversions, so only the escaping of non-ASCII text differs.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs.get("indent"):
+            return super().dumps(obj, **kwargs)
+        options = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        return orjson.dumps(obj, default=self.default, option=options).decode("utf-8")
+
+    def response(self, *args, **kwargs):
+        with timed_phase("serialize"):
+            return super().response(*args, **kwargs)
+
+
 app = Flask(__name__, template_folder="templates", static_folder="static")
 app.secret_key = os.getenv("FLASK_SECRET", "dev-secret-key")
+app.json = TimedJSONProvider(app)
 CORS(app)
 
 
@@ -71,66 +397,976 @@ def connect_db():
     """Connects to the PostgreSQL database using the DATABASE_URL."""
     if not DATABASE_URL:
         raise Exception("DATABASE_URL environment variable is not set")
-    return psycopg2.connect(DATABASE_URL)
+    return psycopg2.connect(DATABASE_URL, connection_factory=InstrumentedConnection)
+
+
+class PoolTimeout(psycopg2.pool.PoolError):
+    """Raised when no pooled connection became free within DB_POOL_TIMEOUT."""
+
+
+class ConnectionPool:
+    """Thread-safe PostgreSQL connection pool with blocking checkout.
+
+    psycopg2's own pools raise as soon as they are exhausted; this one makes
+    callers wait (up to ``timeout`` seconds) for a connection to be returned,
+    pings connections that sat idle longer than ``healthcheck_interval`` and
+    replaces any that turn out to be dead. Checkout counts and wait times are
+    kept so saturation can be observed through ``stats()``.
+    """
+
+    def __init__(self, minconn, maxconn, timeout, healthcheck_interval):
+        if maxconn < 1 or minconn > maxconn:
+            raise ValueError("DB_POOL_MIN must be <= DB_POOL_MAX and DB_POOL_MAX >= 1")
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.healthcheck_interval = healthcheck_interval
+        self._cond = threading.Condition()
+        self._idle = collections.deque()  # (connection, returned_at)
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._replaced = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        for _ in range(minconn):
+            self._idle.append((connect_db(), time.monotonic()))
+            self._size += 1
+
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        conn = None
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._idle:
+                        conn, returned_at = self._idle.pop()
+                        break
+                    if self._size < self.maxconn:
+                        # Reserve the slot now, connect outside the lock.
+                        self._size += 1
+                        returned_at = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"No database connection available within {self.timeout}s")
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            waited = time.monotonic() - started
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            self._in_use += 1
+
+        try:
+            if conn is None:
+                conn = connect_db()
+            elif not self._is_healthy(conn, returned_at):
+                self._discard(conn)
+                with self._cond:
+                    self._replaced += 1
+                conn = connect_db()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def putconn(self, conn):
+        if not conn.closed:
+            try:
+                if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                self._discard(conn)
+        with self._cond:
+            self._in_use -= 1
+            if conn.closed:
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Checks out a connection for code running outside a Flask request."""
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def _is_healthy(self, conn, returned_at):
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.healthcheck_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @staticmethod
+    def _discard(conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "max_size": self.maxconn,
+                "saturation": round(self._in_use / self.maxconn, 4),
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "replaced_connections": self._replaced,
+                "avg_wait_ms": round(self._wait_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                "max_wait_ms": round(self._wait_max * 1000, 3),
+            }
 
 
-def init_db():
-    conn = connect_db()
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Returns the process-wide pool, creating it on first use (after any fork)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT, DB_POOL_HEALTHCHECK_SECONDS)
+    return _pool
+
+
+def get_db():
+    """Returns the connection checked out for the current request.
+
+    The first call in a request takes a connection from the pool; later calls
+    (from the auth, quota and entry helpers) reuse it. It is handed back in
+    ``release_db`` when the app context is torn down.
+    """
+    if 'db' not in g:
+        g.db = get_pool().getconn()
+    return g.db
+
+
+@contextmanager
+def db_connection():
+    """Yields the request's connection, or a pooled one outside of a request."""
+    if has_app_context():
+        yield get_db()
+    else:
+        with get_pool().connection() as conn:
+            yield conn
+
+
+def return_db():
+    """Hands the request's connection back early, before slow work that needs no database."""
+    conn = g.pop('db', None)
+    if conn is not None:
+        get_pool().putconn(conn)
+
+
+@app.teardown_appcontext
+def release_db(exc):
+    return_db()
+
+
+@app.errorhandler(PoolTimeout)
+def handle_pool_timeout(err):
+    return jsonify({"error": "Database is busy, please retry"}), 503
+
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+# Arbitrary advisory lock key; serializes migration runs started by several workers at once
+MIGRATIONS_LOCK_ID = 720_104
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """Returns (version, name, path) for every NNNN_name.sql or .py migration, oldest first.
+
+    SQL files are executed as-is. Python files define ``upgrade(cur)`` for
+    steps plain SQL cannot express. They must not import this module: an
+    applied migration has to keep doing what it did against the schema of
+    its time, so any query or constant it needs is copied into it.
+    """
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(filename)
+        version, _, name = stem.partition("_")
+        if ext in (".sql", ".py") and version.isdigit():
+            migrations.append((int(version), name, os.path.join(directory, filename)))
+    versions = [version for version, _, _ in migrations]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def migration_checksum(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read().replace(b"\r\n", b"\n")).hexdigest()
+
+
+def apply_migration(cur, path):
+    if path.endswith(".py"):
+        spec = importlib.util.spec_from_file_location(f"migration_{os.path.basename(path)[:-3]}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.upgrade(cur)
+    else:
+        with open(path, encoding="utf-8") as f:
+            cur.execute(f.read())
+
+
+def migration_status(cur):
+    """Returns (version, name, applied_at, checksum_ok) per known migration; applied_at is None if pending."""
+    cur.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+    applied = {}
+    if cur.fetchone()[0]:
+        cur.execute("SELECT version, checksum, applied_at FROM schema_migrations")
+        applied = {version: (checksum, applied_at) for version, checksum, applied_at in cur.fetchall()}
+    status = []
+    for version, name, path in load_migrations():
+        checksum, applied_at = applied.get(version, (None, None))
+        status.append((version, name, applied_at, checksum in (None, migration_checksum(path))))
+    return status
+
+
+def run_migrations(conn=None):
+    """Applies pending migrations in order and returns the versions applied.
+
+    All pending migrations run in a single transaction, so a failure leaves
+    the schema and the schema_migrations record exactly as they were.
+    """
+    own_conn = conn is None
+    conn = conn or connect_db()
     try:
         cur = conn.cursor()
-        # Create users table with PostgreSQL syntax
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATIONS_LOCK_ID,))
         cur.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                email VARCHAR(255) UNIQUE NOT NULL,
-                password_hash VARCHAR(255) NOT NULL,
-                name VARCHAR(255),
-                subscription_tier VARCHAR(20) DEFAULT 'free',
-                subscription_start DATE,
-                entries_this_month INT DEFAULT 0,
-                last_reset_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                checksum CHAR(64) NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
             )
         """)
-
-        # Create entries table with user_id foreign key
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS entries (
-                id SERIAL PRIMARY KEY,
-                user_id INT NOT NULL,
-                content TEXT NOT NULL,
-                emotion_label VARCHAR(32) NOT NULL,
-                emotion_score DECIMAL(5,2) NOT NULL,
-                emotions_json JSONB NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        cur.execute("SELECT version, checksum FROM schema_migrations")
+        applied = dict(cur.fetchall())
+        done = []
+        for version, name, path in load_migrations():
+            checksum = migration_checksum(path)
+            if version in applied:
+                if applied[version] != checksum:
+                    app.logger.warning("Migration %04d_%s was edited after it was applied", version, name)
+                continue
+            apply_migration(cur, path)
+            cur.execute(
+                "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                (version, name, checksum),
             )
-        """)
+            done.append(version)
+        conn.commit()
+        return done
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if own_conn:
+            conn.close()
 
-        # Create payments table
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS payments (
-                id SERIAL PRIMARY KEY,
-                user_id INT NOT NULL,
-                amount DECIMAL(10,2) NOT NULL,
-                plan VARCHAR(20) NOT NULL,
-                status VARCHAR(20) DEFAULT 'pending',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            )
-        """)
 
+def init_db():
+    """Brings the database schema up to date; kept for existing callers of the old setup."""
+    return run_migrations()
+
+
+# Every stored column of entries (all but the generated content_tsv), in table order
+ENTRY_TABLE_COLUMNS = (
+    "id, user_id, content, emotion_label, emotion_score, emotion_scores, created_at, "
+    "analysis_status, analysis_attempts, analysis_error, next_attempt_at, emotion_model"
+)
+# Arbitrary advisory lock key; only one process at a time runs entry maintenance
+ENTRY_MAINTENANCE_LOCK_ID = 720_105
+ENTRY_PARTITION_RE = re.compile(r"entries_p(\d{4})(\d{2})")
+
+ENTRY_PARTITIONS_SQL = """
+    SELECT c.relname
+    FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'entries'::regclass
+"""
+
+# Users whose plan is one of %(tiers)s; unknown tiers get the free plan, as in the app
+PLAN_USERS_SQL = """
+    SELECT id FROM users
+    WHERE CASE WHEN subscription_tier = ANY(%(plans)s) THEN subscription_tier ELSE 'free' END = ANY(%(tiers)s)
+"""
+# One batch of those users' entries created before %(cutoff)s
+EXPIRED_ENTRIES_SQL = f"""
+    SELECT id, created_at FROM entries
+    WHERE created_at < %(cutoff)s AND user_id IN ({PLAN_USERS_SQL})
+    LIMIT %(batch_size)s
+"""
+ARCHIVE_EXPIRED_ENTRIES_SQL = f"""
+    -- name: archive_expired_entries
+    WITH expired AS (
+        DELETE FROM entries WHERE (id, created_at) IN ({EXPIRED_ENTRIES_SQL})
+        RETURNING {ENTRY_TABLE_COLUMNS}
+    )
+    INSERT INTO entries_archive ({ENTRY_TABLE_COLUMNS})
+    SELECT {ENTRY_TABLE_COLUMNS} FROM expired
+"""
+DELETE_EXPIRED_ENTRIES_SQL = f"""
+    -- name: delete_expired_entries
+    DELETE FROM entries WHERE (id, created_at) IN ({EXPIRED_ENTRIES_SQL})
+"""
+
+
+def add_months(day, count):
+    """First day of the month ``count`` months after the one ``day`` falls in."""
+    index = day.year * 12 + day.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def entry_partitions(cur):
+    """Returns {first day of month: name} for the monthly partitions attached to entries."""
+    cur.execute(ENTRY_PARTITIONS_SQL)
+    partitions = {}
+    for (name,) in cur.fetchall():
+        match = ENTRY_PARTITION_RE.fullmatch(name)
+        if match:
+            partitions[date(int(match[1]), int(match[2]), 1)] = name
+    return partitions
+
+
+def create_entry_partition(cur, month):
+    """Creates the partition holding ``month``'s entries and returns its name.
+
+    Rows for that month that went to entries_default while the partition
+    was missing are moved into it first: a partition can't be attached
+    while the default partition still holds rows in its range.
+    """
+    name = f"entries_p{month:%Y%m}"
+    bounds = (month, add_months(month, 1))
+    cur.execute("SELECT EXISTS (SELECT 1 FROM entries_default WHERE created_at >= %s AND created_at < %s)", bounds)
+    if not cur.fetchone()[0]:
+        cur.execute(f"CREATE TABLE {name} PARTITION OF entries FOR VALUES FROM (%s) TO (%s)", bounds)
+        return name
+    cur.execute(f"CREATE TABLE {name} (LIKE entries INCLUDING DEFAULTS INCLUDING GENERATED)")
+    cur.execute(f"""
+        WITH moved AS (
+            DELETE FROM entries_default WHERE created_at >= %s AND created_at < %s
+            RETURNING {ENTRY_TABLE_COLUMNS}
+        )
+        INSERT INTO {name} ({ENTRY_TABLE_COLUMNS}) SELECT {ENTRY_TABLE_COLUMNS} FROM moved
+    """, bounds)
+    cur.execute(f"ALTER TABLE entries ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", bounds)
+    return name
+
+
+def ensure_entry_partitions(cur, first_month=None, today=None):
+    """Creates the missing monthly partitions of entries and returns their names.
+
+    They run from ``first_month`` (default: the start of the longest plan
+    history) to ENTRY_PARTITION_MONTHS_AHEAD months after this one, so every
+    entry a user can see is in the partition of its own month and queries
+    bounded by created_at skip the others.
+    """
+    today = today or date.today()
+    longest = max(plan['history_days'] for plan in SUBSCRIPTION_PLANS.values())
+    month = add_months(first_month or today - timedelta(days=longest), 0)
+    existing = entry_partitions(cur)
+    created = []
+    while month <= add_months(today, ENTRY_PARTITION_MONTHS_AHEAD):
+        if month not in existing:
+            created.append(create_entry_partition(cur, month))
+        month = add_months(month, 1)
+    return created
+
+
+def detach_expired_partitions(cur, cutoff, retention):
+    """Detaches the monthly partitions that end by ``cutoff`` and returns their names.
+
+    In "archive" mode they are kept as entries_archive_pYYYYMM tables,
+    otherwise they are dropped. Either way no rows are rewritten.
+    """
+    expired = [name for month, name in sorted(entry_partitions(cur).items()) if add_months(month, 1) <= cutoff]
+    for name in expired:
+        cur.execute(f"ALTER TABLE entries DETACH PARTITION {name}")
+        if retention == "archive":
+            cur.execute(f"ALTER TABLE {name} RENAME TO {name.replace('entries_', 'entries_archive_', 1)}")
+        else:
+            cur.execute(f"DROP TABLE {name}")
+    return expired
+
+
+def maintain_entries(conn, retention=None, today=None):
+    """Creates upcoming entries partitions and applies retention; returns a summary.
+
+    Whole months past the longest plan history are detached first. The
+    remaining expired entries, those of users on plans with shorter
+    histories, are then archived or deleted ENTRY_RETENTION_BATCH_SIZE at a
+    time with a commit after each batch, and their days are dropped from the
+    rollups. Nothing a user can currently see is touched. ``today``
+    defaults to the database's CURRENT_DATE, the clock the history window
+    of the queries uses too.
+    """
+    retention = retention or ENTRY_RETENTION
+    if retention not in ("archive", "delete", "keep"):
+        raise ValueError(f"Unknown ENTRY_RETENTION {retention!r}")
+    cur = conn.cursor()
+    try:
+        if today is None:
+            cur.execute("SELECT CURRENT_DATE")
+            today = cur.fetchone()[0]
+        # DDL on entries waits for an exclusive lock that would queue every
+        # request behind it; give up and retry next time rather than stall them
+        cur.execute("SET LOCAL lock_timeout = '5s'")
+        summary = {"retention": retention, "partitions_created": ensure_entry_partitions(cur, today=today),
+                   "partitions_detached": [], "entries_expired": 0}
+        conn.commit()
+        if retention == "keep":
+            return summary
+
+        tiers_by_history = defaultdict(list)
+        for tier, plan in SUBSCRIPTION_PLANS.items():
+            tiers_by_history[plan['history_days']].append(tier)
+        cutoffs = {days: today - timedelta(days=days + ENTRY_RETENTION_GRACE_DAYS) for days in tiers_by_history}
+        cur.execute("SET LOCAL lock_timeout = '5s'")
+        summary["partitions_detached"] = detach_expired_partitions(cur, cutoffs[max(cutoffs)], retention)
         conn.commit()
+
+        expire_sql = ARCHIVE_EXPIRED_ENTRIES_SQL if retention == "archive" else DELETE_EXPIRED_ENTRIES_SQL
+        for days, tiers in sorted(tiers_by_history.items()):
+            params = {"cutoff": cutoffs[days], "tiers": tiers, "plans": list(SUBSCRIPTION_PLANS),
+                      "batch_size": ENTRY_RETENTION_BATCH_SIZE}
+            while True:
+                cur.execute(expire_sql, params)
+                summary["entries_expired"] += cur.rowcount
+                conn.commit()
+                if cur.rowcount < ENTRY_RETENTION_BATCH_SIZE:
+                    break
+            for table in ("emotion_daily_rollups", "emotion_score_rollups", "emotion_pair_rollups"):
+                cur.execute(f"DELETE FROM {table} WHERE day < %(cutoff)s AND user_id IN ({PLAN_USERS_SQL})", params)
+            conn.commit()
+        return summary
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def run_entry_maintenance(conn):
+    """Runs maintain_entries unless another process already is; returns its summary or None."""
+    cur = conn.cursor()
+    cur.execute("SELECT pg_try_advisory_lock(%s)", (ENTRY_MAINTENANCE_LOCK_ID,))
+    locked = cur.fetchone()[0]
+    conn.commit()
+    if not locked:
+        return None
+    try:
+        return maintain_entries(conn)
     finally:
-        conn.close()
+        cur.execute("SELECT pg_advisory_unlock(%s)", (ENTRY_MAINTENANCE_LOCK_ID,))
+        conn.commit()
+
+
+# Upserts adding a batch's totals to each rollup table, in execute_values form
+DAILY_ROLLUP_UPSERT_SQL = """
+    INSERT INTO emotion_daily_rollups (user_id, day, emotion_label, entry_count, score_sum)
+    VALUES %s
+    ON CONFLICT (user_id, day, emotion_label) DO UPDATE
+    SET entry_count = emotion_daily_rollups.entry_count + EXCLUDED.entry_count,
+        score_sum = emotion_daily_rollups.score_sum + EXCLUDED.score_sum
+"""
+SCORE_ROLLUP_UPSERT_SQL = """
+    INSERT INTO emotion_score_rollups (user_id, day, emotion_label, score_sum, score_sq_sum)
+    VALUES %s
+    ON CONFLICT (user_id, day, emotion_label) DO UPDATE
+    SET score_sum = emotion_score_rollups.score_sum + EXCLUDED.score_sum,
+        score_sq_sum = emotion_score_rollups.score_sq_sum + EXCLUDED.score_sq_sum
+"""
+PAIR_ROLLUP_UPSERT_SQL = """
+    INSERT INTO emotion_pair_rollups (user_id, day, label_a, label_b, pair_count, score_product_sum)
+    VALUES %s
+    ON CONFLICT (user_id, day, label_a, label_b) DO UPDATE
+    SET pair_count = emotion_pair_rollups.pair_count + EXCLUDED.pair_count,
+        score_product_sum = emotion_pair_rollups.score_product_sum + EXCLUDED.score_product_sum
+"""
+
+
+def entry_rollup_rows(user_id, entries):
+    """Returns [(upsert_sql, rows)] adding ``entries`` to the user's daily rollups.
+
+    ``entries`` holds (created_at, emotion_label, emotion_score, emotion_scores)
+    tuples. Rows are sorted by key: upserting in key order keeps concurrent
+    writers from deadlocking.
+    """
+    label_totals = defaultdict(lambda: [0, 0.0])
+    score_totals = defaultdict(lambda: [0.0, 0.0])
+    pair_totals = defaultdict(lambda: [0, 0.0])
+    for created_at, label, score, scores in entries:
+        day = created_at.date()
+        label_totals[(day, label)][0] += 1
+        label_totals[(day, label)][1] += float(score)
+        scores = pad_scores(scores)
+        for emotion, value in zip(EMOTION_LABELS, scores):
+            if value is not None:
+                score_totals[(day, emotion)][0] += value
+                score_totals[(day, emotion)][1] += value * value
+        for a, b, label_a, label_b in EMOTION_LABEL_PAIRS:
+            if scores[a] is not None and scores[b] is not None:
+                totals = pair_totals[(day, label_a, label_b)]
+                totals[0] += scores[a] >= COOCCURRENCE_THRESHOLD and scores[b] >= COOCCURRENCE_THRESHOLD
+                totals[1] += scores[a] * scores[b]
+
+    upserts = []
+    if label_totals:
+        upserts.append((DAILY_ROLLUP_UPSERT_SQL, [
+            (user_id, day, label, count, round(total, 2)) for (day, label), (count, total) in sorted(label_totals.items())
+        ]))
+    if score_totals:
+        upserts.append((SCORE_ROLLUP_UPSERT_SQL, [
+            (user_id, day, label, total, sq) for (day, label), (total, sq) in sorted(score_totals.items())
+        ]))
+    if pair_totals:
+        upserts.append((PAIR_ROLLUP_UPSERT_SQL, [
+            (user_id, day, a, b, count, product) for (day, a, b), (count, product) in sorted(pair_totals.items())
+        ]))
+    return upserts
+
+
+def apply_entry_rollups(cur, user_id, entries):
+    """Adds analyzed entries to the user's daily rollups.
+
+    ``entries`` holds (created_at, emotion_label, emotion_score, emotion_scores)
+    tuples. Call this on the cursor that inserted or analyzed the entries,
+    before committing, so the rollups stay consistent with the entries table.
+    """
+    for sql, rows in entry_rollup_rows(user_id, entries):
+        execute_values(cur, sql, rows)
+
+
+def rebuild_rollups(cur, user_ids=None):
+    """Recomputes rollups from the entries table, for everyone or the given users."""
+    user_filter = "AND user_id = ANY(%(user_ids)s)" if user_ids is not None else ""
+    params = {"user_ids": list(user_ids or []), "threshold": COOCCURRENCE_THRESHOLD}
+    for table in ("emotion_daily_rollups", "emotion_score_rollups", "emotion_pair_rollups"):
+        cur.execute(f"DELETE FROM {table} WHERE TRUE {user_filter}", params)
+    # Nothing to add without entries. This also lets migration 0005 run on a
+    # new database, whose entries table does not have emotion_scores yet.
+    cur.execute(f"SELECT 1 FROM entries WHERE TRUE {user_filter} LIMIT 1", params)
+    if cur.fetchone() is None:
+        return
+    cur.execute(f"""
+        INSERT INTO emotion_daily_rollups (user_id, day, emotion_label, entry_count, score_sum)
+        SELECT user_id, created_at::date, emotion_label, COUNT(*), SUM(emotion_score)
+        FROM entries
+        WHERE analysis_status = 'done' {user_filter}
+        GROUP BY 1, 2, 3
+    """, params)
+    cur.execute(f"""
+        INSERT INTO emotion_score_rollups (user_id, day, emotion_label, score_sum, score_sq_sum)
+        SELECT user_id, day, label, SUM(score), SUM(score * score)
+        FROM ({ENTRY_SCORES_SQL.format(filters=user_filter)}) s
+        GROUP BY 1, 2, 3
+    """, params)
+    # Labels are ordered with the C collation to match Python's sorted()
+    cur.execute(f"""
+        INSERT INTO emotion_pair_rollups (user_id, day, label_a, label_b, pair_count, score_product_sum)
+        SELECT user_id, day, label_a, label_b,
+               COUNT(*) FILTER (WHERE score_a >= %(threshold)s::real AND score_b >= %(threshold)s::real),
+               SUM(score_a * score_b)
+        FROM ({ENTRY_PAIRS_SQL.format(filters=user_filter)}) p
+        GROUP BY 1, 2, 3, 4
+    """, params)
+
+
+# Every pair of label positions in emotion_scores as (a, b, label_a, label_b),
+# 0-based, with label_a < label_b as in the pair rollups
+EMOTION_LABEL_PAIRS = [
+    (EMOTION_LABELS.index(label_a), EMOTION_LABELS.index(label_b), label_a, label_b)
+    for label_a, label_b in itertools.combinations(sorted(EMOTION_LABELS), 2)
+]
+
+# One row per (analyzed entry, label) with the label's score in percent
+ENTRY_SCORES_SQL = f"""
+    SELECT e.id AS entry_id, e.user_id, e.created_at::date AS day, x.label, x.score::float AS score
+    FROM entries e, unnest(ARRAY[{', '.join(f"'{label}'" for label in EMOTION_LABELS)}], e.emotion_scores) x(label, score)
+    WHERE e.analysis_status = 'done' AND x.score IS NOT NULL {{filters}}
+"""
+
+# One row per (analyzed entry, label pair) with both scores, read by position
+# from the vector. Pairs come from a fixed list rather than from joining
+# entries to themselves, so the cost stays linear in the number of entries
+# whatever the planner's row estimates. Scores are compared with thresholds
+# cast to real, so that values stored as real compare as they did before storage.
+ENTRY_PAIRS_SQL = f"""
+    SELECT e.user_id, e.created_at::date AS day, p.label_a, p.label_b,
+           e.emotion_scores[p.a]::float AS score_a, e.emotion_scores[p.b]::float AS score_b
+    FROM entries e
+    CROSS JOIN (VALUES {', '.join(f"({a + 1}, {b + 1}, '{label_a}', '{label_b}')" for a, b, label_a, label_b in EMOTION_LABEL_PAIRS)}
+    ) p(a, b, label_a, label_b)
+    WHERE e.analysis_status = 'done'
+      AND e.emotion_scores[p.a] IS NOT NULL AND e.emotion_scores[p.b] IS NOT NULL {{filters}}
+"""
+
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# One pass over the rollups for every /api/stats aggregate except correlation.
+# The scanned range covers both the requested window and the current month;
+# FILTER clauses split the two. The GROUPING() bitmask (label=4, day=2,
+# weekday=1) tells the rows apart: 7 = window totals, 3 = per label,
+# 5 = per day, 6 = per weekday.
+STATS_AGGREGATE_SQL = """
+    -- name: stats_aggregate
+    SELECT GROUPING(emotion_label, day, weekday) AS grouping_set,
+           emotion_label, day, weekday,
+           COALESCE(SUM(entry_count) FILTER (WHERE day >= %(window_start)s), 0) AS entry_count,
+           SUM(score_sum) FILTER (WHERE day >= %(window_start)s) AS score_sum,
+           COALESCE(SUM(entry_count) FILTER (WHERE day >= %(month_start)s), 0) AS monthly_count
+    FROM (
+        SELECT day, emotion_label, entry_count, score_sum, EXTRACT(ISODOW FROM day)::int AS weekday
+        FROM emotion_daily_rollups
+        WHERE user_id = %(user_id)s AND day >= LEAST(%(window_start)s, %(month_start)s)
+    ) r
+    GROUP BY GROUPING SETS ((), (emotion_label), (day), (weekday))
+"""
+
+# Co-occurrence inputs from the rollups: pair rows (label_b set) carry the
+# thresholded count and score products, label rows the score moments.
+STATS_CORRELATION_SQL = """
+    -- name: stats_correlation
+    SELECT label_a, label_b, SUM(pair_count) AS count, SUM(score_product_sum) AS product_sum,
+           NULL::float AS score_sum, NULL::float AS score_sq_sum
+    FROM emotion_pair_rollups
+    WHERE user_id = %(user_id)s AND day >= %(window_start)s
+    GROUP BY label_a, label_b
+    UNION ALL
+    SELECT emotion_label, NULL, NULL, NULL, SUM(score_sum), SUM(score_sq_sum)
+    FROM emotion_score_rollups
+    WHERE user_id = %(user_id)s AND day >= %(window_start)s
+    GROUP BY emotion_label
+"""
+
+# The same inputs computed from entries for an arbitrary threshold. The
+# database does the pairing and aggregation, so memory stays bounded by the
+# label-by-label result no matter how many entries are in the window.
+ENTRY_CORRELATION_SQL = """
+    -- name: stats_correlation_entries
+    SELECT label_a, label_b,
+           COUNT(*) FILTER (WHERE score_a >= %(threshold)s::real AND score_b >= %(threshold)s::real) AS count,
+           SUM(score_a * score_b) AS product_sum, NULL::float AS score_sum, NULL::float AS score_sq_sum
+    FROM ({entry_pairs}) p
+    GROUP BY label_a, label_b
+    UNION ALL
+    SELECT label, NULL, NULL, NULL, SUM(score), SUM(score * score)
+    FROM ({entry_scores}) s
+    GROUP BY label
+"""
+
+
+def stats_window_days(requested, history_days):
+    """Parses the ?days= value ("30", "7d" or "all") and caps it at the plan's history."""
+    if requested in (None, "", "all"):
+        return history_days
+    days = int(str(requested).rstrip("d"))
+    if days < 1:
+        raise ValueError("days must be positive")
+    return min(days, history_days)
+
+
+def stats_threshold(requested):
+    """Parses the ?threshold= value, a score percentage from 0 to 100; None if it wasn't given."""
+    if requested in (None, ""):
+        return None
+    threshold = float(requested)
+    # Also rejects nan and inf
+    if not 0 <= threshold <= 100:
+        raise ValueError("threshold must be between 0 and 100")
+    return threshold
+
+
+def stats_params(user_id, days, threshold=None, today=None):
+    today = today or date.today()
+    return {
+        "user_id": user_id,
+        "window_start": today - timedelta(days=days - 1),
+        "month_start": today.replace(day=1),
+        "threshold": COOCCURRENCE_THRESHOLD if threshold is None else threshold,
+    }
+
+
+def build_cooccurrence(rows, entry_count, threshold):
+    """Builds the fixed-size label-by-label co-occurrence and correlation matrices.
+
+    Missing labels count as a score of 0, so with per-label sums and sums of
+    squares plus per-pair sums of products the Pearson correlation of every
+    pair follows without touching individual entries.
+    """
+    labels = list(EMOTION_EMOJIS)
+    labels += sorted({row[key] for row in rows for key in ('label_a', 'label_b') if row[key]} - set(labels))
+    index = {label: i for i, label in enumerate(labels)}
+    size = len(labels)
+    counts = [[0] * size for _ in range(size)]
+    products = [[0.0] * size for _ in range(size)]
+    sums = [0.0] * size
+    squares = [0.0] * size
+    for row in rows:
+        a = index[row['label_a']]
+        if row['label_b'] is None:
+            sums[a], squares[a] = row['score_sum'] or 0.0, row['score_sq_sum'] or 0.0
+            continue
+        b = index[row['label_b']]
+        counts[a][b] = counts[b][a] = int(row['count'] or 0)
+        products[a][b] = products[b][a] = row['product_sum'] or 0.0
+
+    n = entry_count
+    correlation = [[1.0 if a == b else 0.0 for b in range(size)] for a in range(size)]
+    for a in range(size):
+        for b in range(a + 1, size):
+            spread = (n * squares[a] - sums[a] ** 2) * (n * squares[b] - sums[b] ** 2)
+            if n and spread > 0:
+                r = (n * products[a][b] - sums[a] * sums[b]) / math.sqrt(spread)
+                correlation[a][b] = correlation[b][a] = round(max(-1.0, min(1.0, r)), 4)
+
+    pairs = [
+        {'pair': f"{labels[a]} & {labels[b]}", 'count': counts[a][b], 'correlation': correlation[a][b]}
+        for a in range(size) for b in range(a + 1, size) if counts[a][b]
+    ]
+    pairs.sort(key=lambda p: (-p['count'], -p['correlation'], p['pair']))
+    return pairs, {"labels": labels, "threshold": threshold, "counts": counts, "correlation": correlation}
+
+
+def build_stats(aggregate_rows, correlation_rows, params, days):
+    """Shapes the STATS_AGGREGATE_SQL and STATS_CORRELATION_SQL rows into the /api/stats payload."""
+    totals = {'entry_count': 0, 'score_sum': None, 'monthly_count': 0}
+    by_label, by_day, by_weekday = [], {}, {}
+    for row in aggregate_rows:
+        if row['grouping_set'] == 7:
+            totals = row
+        elif row['grouping_set'] == 3 and row['entry_count']:
+            by_label.append(row)
+        elif row['grouping_set'] == 5 and row['entry_count']:
+            by_day[row['day']] = float(row['score_sum']) / row['entry_count']
+        elif row['grouping_set'] == 6 and row['entry_count']:
+            by_weekday[row['weekday']] = float(row['score_sum']) / row['entry_count']
+
+    by_label.sort(key=lambda row: (-row['entry_count'], row['emotion_label']))
+    pairs, matrix = build_cooccurrence(correlation_rows, totals['entry_count'], params['threshold'])
+    top = by_label[0]['emotion_label'] if by_label else None
+    window_start = params['window_start']
+
+    return {
+        "days": days,
+        "total_entries": totals['entry_count'],
+        "monthly_entries": totals['monthly_count'],
+        "top_emotion": f"{top} {EMOTION_EMOJIS.get(top, '❓')}" if top else "None",
+        "avg_score": float(totals['score_sum']) / totals['entry_count'] if totals['entry_count'] else 0,
+        "emotion_distribution": [
+            {"label": row['emotion_label'], "count": row['entry_count'], "emoji": EMOTION_EMOJIS.get(row['emotion_label'], '❓')}
+            for row in by_label
+        ],
+        "mood_trend": [
+            {'date': day.strftime('%Y-%m-%d'), 'average_score': round(by_day.get(day, 0), 2)}
+            for day in (window_start + timedelta(days=i) for i in range(days))
+        ],
+        "weekly_mood_pattern": [
+            {'day': name, 'average_score': round(by_weekday.get(isodow, 0), 2)}
+            for isodow, name in enumerate(WEEKDAYS, start=1)
+        ],
+        "emotion_correlation": pairs,
+        "emotion_cooccurrence": matrix,
+    }
+
+
+def correlation_query(params):
+    """Rollups serve the configured threshold; any other one is computed from entries."""
+    if params['threshold'] == COOCCURRENCE_THRESHOLD:
+        return STATS_CORRELATION_SQL
+    filters = "AND e.user_id = %(user_id)s AND e.created_at >= %(window_start)s"
+    return ENTRY_CORRELATION_SQL.format(
+        entry_pairs=ENTRY_PAIRS_SQL.format(filters=filters),
+        entry_scores=ENTRY_SCORES_SQL.format(filters=filters),
+    )
+
+
+def compute_stats(cur, user_id, days, threshold=None, today=None):
+    """Runs the stats queries on a RealDictCursor and returns the payload.
+
+    ``today`` should be the database's CURRENT_DATE (the users row's today).
+    """
+    params = stats_params(user_id, days, threshold, today)
+    cur.execute(STATS_AGGREGATE_SQL, params)
+    aggregate_rows = cur.fetchall()
+    cur.execute(correlation_query(params), params)
+    return build_stats(aggregate_rows, cur.fetchall(), params, days)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many password hashes are already queued or running."""
+
+
+def init_hash_worker(nice, parent_pid):
+    """Lowers the hash worker's priority and exits it once the app process is gone.
+
+    Pool workers hold both ends of their task queue, so when the parent is
+    killed (e.g. a server stopped with SIGTERM) they would otherwise wait
+    for work forever.
+    """
+    if nice:
+        os.nice(nice)
+
+    def watch_parent():
+        while os.getppid() == parent_pid:
+            time.sleep(1)
+        os._exit(0)
+
+    threading.Thread(target=watch_parent, name="parent-watch", daemon=True).start()
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded process pool with admission control.
+
+    bcrypt's own functions are submitted to ``workers`` spawned processes
+    running at ``nice`` priority, so hashing neither holds the request
+    threads' CPU nor needs the app imported in the workers. At most
+    ``max_pending`` calls per process may be queued or running; the next one
+    raises PasswordHasherBusy instead of queueing. ``workers=0`` hashes in
+    the calling thread, still subject to admission control.
+    """
+
+    def __init__(self, rounds, workers, max_pending, timeout, nice=0):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max(1, max_pending)
+        self.timeout = timeout
+        self.nice = nice
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+
+    def hash(self, password):
+        return self._run(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(self.rounds)).decode('utf-8')
+
+    def check(self, password, hashed):
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed):
+        # "$2b$12$..." records the cost factor the hash was made with
+        try:
+            return int(hashed.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy()
+        started = time.monotonic()
+        with self._lock:
+            self.in_flight += 1
+        succeeded = held = False
+        try:
+            with timed_phase("password_hash"):
+                if self.workers < 1:
+                    result = fn(*args)
+                else:
+                    executor = self._get_executor()
+                    future = executor.submit(fn, *args)
+                    result = future.result(self.timeout)
+            succeeded = True
+            return result
+        except FutureTimeout:
+            # A hash a worker already started cannot be cancelled; it keeps
+            # its slot until it finishes so admission still bounds the pool's backlog
+            if not future.cancel():
+                held = True
+                future.add_done_callback(lambda _: self._release(started, False))
+            raise PasswordHasherBusy() from None
+        except BrokenProcessPool:
+            # A worker died; shut the pool down and start a fresh one on the next call
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+                    self._pid = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            if not held:
+                self._release(started, succeeded)
+
+    def _release(self, started, succeeded):
+        with self._lock:
+            self.in_flight -= 1
+            if succeeded:
+                self.completed += 1
+                self.total_seconds += time.monotonic() - started
+        self._slots.release()
+
+    def _get_executor(self):
+        # A pool inherited through fork is unusable, so each worker process creates its own
+        with self._lock:
+            if self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=init_hash_worker,
+                    initargs=(self.nice, os.getpid()),
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rounds": self.rounds,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_ms": round(self.total_seconds / self.completed * 1000, 1) if self.completed else 0.0,
+            }
+
+
+password_hasher = PasswordHasher(BCRYPT_ROUNDS, BCRYPT_WORKERS, BCRYPT_MAX_PENDING, BCRYPT_TIMEOUT, BCRYPT_NICE)
 
 
 def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return password_hasher.hash(password)
 
 
 def check_password(password, hashed):
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    return password_hasher.check(password, hashed)
+
+
+@app.errorhandler(PasswordHasherBusy)
+def handle_password_hasher_busy(err):
+    return jsonify({"error": "Too many sign-ins right now, please retry"}), 503, {"Retry-After": "1"}
 
 
 def create_jwt_token(user_id):
@@ -151,7 +1387,103 @@ def verify_jwt_token(token):
         return None
 
 
-def get_user_from_request():
+# today is the database's date, the clock that sets created_at, the rollup
+# days and the history window, so the stats buckets and ETags follow it too
+CURRENT_USER_SQL = """
+    -- name: current_user
+    SELECT id, email, name, subscription_tier, entries_this_month, last_reset_date, data_version,
+           CURRENT_DATE AS today
+    FROM users WHERE id = %s
+"""
+LOGIN_SQL = "-- name: login\nSELECT id, password_hash, name, subscription_tier FROM users WHERE email=%s"
+EMAIL_TAKEN_SQL = "-- name: email_taken\nSELECT id FROM users WHERE email=%s"
+
+
+class UserCache:
+    """TTL-bounded in-process cache of the users row that authentication reads.
+
+    Code that changes a user's tier or entry counters must call
+    ``invalidate`` after committing. A load that raced with an invalidation
+    is returned but not stored, so a stale row cannot outlive the write.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()  # user_id -> (expires_at, row)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.invalidations = 0
+
+    def get(self, conn, user_id, fresh=False):
+        """Returns the user's row; ``fresh`` skips the lookup and re-reads (and re-caches) it."""
+        user, generation = self.lookup(user_id, fresh)
+        if user is None:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(CURRENT_USER_SQL, (user_id,))
+            user = cur.fetchone()
+            self.store(user_id, user, generation)
+        return dict(user) if user else None
+
+    def lookup(self, user_id, fresh=False):
+        """Returns (row, generation) without querying; row is None unless a valid one is cached.
+
+        Pass ``generation`` to store() along with the row read on a miss.
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = None if fresh else self._entries.get(user_id)
+            if cached and cached[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return dict(cached[1]), self._generation
+            if cached:
+                del self._entries[user_id]
+            if fresh:
+                self.refreshes += 1
+            else:
+                self.misses += 1
+            return None, self._generation
+
+    def store(self, user_id, row, generation):
+        """Caches a row read after lookup(), unless it was invalidated in between."""
+        if row is None or self.max_size <= 0:
+            return
+        with self._lock:
+            if generation == self._generation:
+                self._entries[user_id] = (time.monotonic() + self.ttl, dict(row))
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+user_cache = UserCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+
+def get_user_from_request(fresh=False):
+    """The authenticated user's row, or None. ``fresh`` bypasses the user cache."""
     auth_header = request.headers.get('Authorization')
     if not auth_header or not auth_header.startswith('Bearer '):
         return None
@@ -161,80 +1493,911 @@ def get_user_from_request():
     if not payload:
         return None
 
-    conn = connect_db()
-    try:
-        # Use RealDictCursor to get dictionary-like results
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("SELECT id, email, name, subscription_tier, entries_this_month FROM users WHERE id = %s", (payload['user_id'],))
-        return cur.fetchone()
-    finally:
-        conn.close()
+    user = user_cache.get(get_db(), payload['user_id'], fresh=fresh)
+    if user:
+        # last_reset_date is only used for the monthly reset, not part of the user payload
+        user.pop('last_reset_date')
+    return user
 
 
 def get_user_entries_this_month(user_id):
-    conn = connect_db()
-    try:
-        cur = conn.cursor()
-        cur.execute("SELECT last_reset_date, entries_this_month FROM users WHERE id = %s", (user_id,))
-        user_data = cur.fetchone()
-
-        if user_data:
-            last_reset, entries_count = user_data
-            # handle None last_reset
-            if last_reset is None:
-                last_reset = datetime.utcnow()
-            current_date = date.today()
-
-            # if last_reset is a datetime, compare months/years
-            if isinstance(last_reset, datetime):
-                last_reset_month = last_reset.month
-                last_reset_year = last_reset.year
-            else:
-                # fallback if date object
-                last_reset_month = last_reset.month
-                last_reset_year = last_reset.year
+    conn = get_db()
+    user_data = user_cache.get(conn, user_id)
+
+    if user_data:
+        last_reset, entries_count = user_data['last_reset_date'], user_data['entries_this_month']
+        # handle None last_reset
+        if last_reset is None:
+            last_reset = datetime.utcnow()
+        current_date = user_data['today']
+
+        # if last_reset is a datetime, compare months/years
+        if isinstance(last_reset, datetime):
+            last_reset_month = last_reset.month
+            last_reset_year = last_reset.year
+        else:
+            # fallback if date object
+            last_reset_month = last_reset.month
+            last_reset_year = last_reset.year
+
+        if last_reset_month != current_date.month or last_reset_year != current_date.year:
+            cur = conn.cursor()
+            cur.execute("""
+                UPDATE users
+                SET entries_this_month = 0, last_reset_date = %s
+                WHERE id = %s
+            """, (current_date, user_id))
+            conn.commit()
+            user_cache.invalidate(user_id)
+            return 0
+        return entries_count
+    return 0
+
+
+BUMP_DATA_VERSION_SQL = "UPDATE users SET data_version = data_version + 1 WHERE id = %s"
+
+
+def bump_data_version(cur, user_id):
+    """Marks the user's entries as changed, invalidating their ETags.
+
+    Run it last in the transaction that writes the entries, so the users row
+    stays locked only briefly, and invalidate the user cache after the
+    commit so requests that read the cached row see the new version.
+    """
+    cur.execute(BUMP_DATA_VERSION_SQL, (user_id,))
+
+
+def user_etag(user):
+    """Weak validator for a user's entries, stats and profile, from a fresh users row.
+
+    The date is included because the stats and history windows move with it.
+    """
+    raw = f"{user['id']}:{user['data_version']}:{user['subscription_tier']}:{user['entries_this_month']}:{user['today']}"
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest()
+
+
+class ResponseCache:
+    """Bounded LRU of response bodies, each valid only for the ETag it was built under.
+
+    A lookup with a different ETag misses (and drops the stale body), so
+    nothing needs invalidating when the data changes.
+    """
+
+    def __init__(self, max_size, ttl, max_bytes):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()  # key -> (expires_at, etag, body)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, etag):
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached and cached[1] == etag and cached[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[2]
+            if cached:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, etag, body):
+        if self.max_size <= 0 or len(body) > self.max_bytes:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
 
-            if last_reset_month != current_date.month or last_reset_year != current_date.year:
-                cur.execute("""
-                    UPDATE users
-                    SET entries_this_month = 0, last_reset_date = %s
-                    WHERE id = %s
-                """, (current_date, user_id))
+
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_BYTES)
+
+
+def conditional_json(user, build):
+    """Answers a GET for ``user`` with a 304, a cached body or ``build()``'s result as JSON.
+
+    ``user`` must be a fresh row (get_user_from_request(fresh=True)): its
+    data_version is the validator, and a write committed by any process has
+    to change it before the next request. That primary-key read is all a
+    304 costs; build() only runs when the client's If-None-Match and the
+    response cache both miss.
+    """
+    etag = user_etag(user)
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        key = (request.path, user['id'], request.query_string)
+        body = response_cache.get(key, etag)
+        if body is None:
+            response = jsonify(build())
+            response_cache.put(key, etag, response.get_data())
+        else:
+            response = app.response_class(body, mimetype="application/json")
+    response.set_etag(etag, weak=True)
+    # Browsers keep the body but revalidate it on every use
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Authorization")
+    return response
+
+
+# The month rollover, the limit check and the increment in one statement.
+# The locked subquery reads the latest counter (a concurrent reservation for
+# the same user is waited for, then re-read) and treats it as 0 when the
+# last reset was in an earlier month. The row is always updated so the
+# caller gets the current usage back even when nothing was reserved.
+RESERVE_QUOTA_SQL = """
+    -- name: reserve_quota
+    UPDATE users u
+    SET entries_this_month = q.used + CASE
+            WHEN %(partial)s THEN LEAST(%(count)s, GREATEST(%(max_entries)s - q.used, 0))
+            WHEN q.used + %(count)s <= %(max_entries)s THEN %(count)s
+            ELSE 0
+        END,
+        last_reset_date = q.last_reset_date
+    FROM (
+        SELECT id,
+               CASE WHEN date_trunc('month', COALESCE(last_reset_date, NOW())) = date_trunc('month', NOW())
+                    THEN COALESCE(entries_this_month, 0) ELSE 0 END AS used,
+               CASE WHEN date_trunc('month', COALESCE(last_reset_date, NOW())) = date_trunc('month', NOW())
+                    THEN last_reset_date ELSE CURRENT_DATE END AS last_reset_date
+        FROM users
+        WHERE id = %(user_id)s
+        FOR UPDATE
+    ) q
+    WHERE u.id = q.id
+    RETURNING u.entries_this_month - q.used AS reserved, u.entries_this_month AS used
+"""
+
+
+def reserve_entries(user_id, max_entries, count=1, partial=False):
+    """Reserves ``count`` of the user's monthly entries and commits; returns (reserved, used).
+
+    Without ``partial`` the reservation is all or nothing; with it, as many
+    entries as still fit are reserved. Reserved entries that end up not being
+    created must be handed back with release_entries.
+    """
+    conn = get_db()
+    cur = conn.cursor()
+    cur.execute(RESERVE_QUOTA_SQL, {
+        "user_id": user_id, "max_entries": max_entries, "count": count, "partial": partial
+    })
+    row = cur.fetchone()
+    conn.commit()
+    user_cache.invalidate(user_id)
+    return row if row else (0, 0)
+
+
+RELEASE_QUOTA_SQL = """
+    -- name: release_quota
+    UPDATE users
+    SET entries_this_month = GREATEST(entries_this_month - %s, 0)
+    WHERE id = %s
+      AND date_trunc('month', COALESCE(last_reset_date, NOW())) = date_trunc('month', NOW())
+"""
+
+
+def release_entries(user_id, count):
+    """Returns reserved entries after a failed create, unless the month has rolled over since."""
+    conn = get_db()
+    # The failure may have left the request's transaction aborted
+    conn.rollback()
+    cur = conn.cursor()
+    cur.execute(RELEASE_QUOTA_SQL, (count, user_id))
+    conn.commit()
+    user_cache.invalidate(user_id)
+
+
+def emotion_cache_key(text: str):
+    """Hashes the normalized text together with the model that scores it."""
+    normalized = " ".join(unicodedata.normalize("NFC", text).split())
+    return hashlib.sha256(f"{EMOTION_MODEL}\x00{normalized}".encode("utf-8")).hexdigest()
+
+
+EMOTION_CACHE_SELECT_SQL = \
+    "SELECT cache_key, emotion_label, emotion_score, emotion_scores FROM emotion_cache WHERE cache_key = ANY(%s)"
+EMOTION_CACHE_INSERT_SQL = """
+    INSERT INTO emotion_cache (cache_key, model, emotion_label, emotion_score, emotion_scores)
+    VALUES (%s, %s, %s, %s, %s::real[])
+    ON CONFLICT (cache_key) DO NOTHING
+"""
+# The same in execute_values form, for put_many
+EMOTION_CACHE_INSERT_MANY_SQL = """
+    INSERT INTO emotion_cache (cache_key, model, emotion_label, emotion_score, emotion_scores)
+    VALUES %s
+    ON CONFLICT (cache_key) DO NOTHING
+"""
+
+
+class EmotionCache:
+    """Content-addressed cache of analyze_emotion results.
+
+    Lookups go to a bounded in-process LRU first (entries expire after
+    ``ttl`` seconds) and then to the ``emotion_cache`` table, which survives
+    restarts and is shared between workers. Database errors degrade to a
+    miss so a cache problem never fails an entry.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()  # key -> (expires_at, result)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        result = self.lookup(key)
+        if result is None:
+            result = self.loaded(key, self._load(key))
+        return result
+
+    def lookup(self, key):
+        """The in-process tier alone: the cached result, or None."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached and cached[0] > now:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return cached[1]
+            if cached:
+                del self._entries[key]
+        return None
+
+    def loaded(self, key, result):
+        """Counts a database lookup that found ``result`` (or None) and keeps it in memory."""
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.db_hits += 1
+        if result is not None:
+            self.remember(key, result)
+        return result
+
+    def get_many(self, keys):
+        """Looks up several keys with at most one database query; returns {key: result}."""
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                cached = self._entries.get(key)
+                if cached and cached[0] > now:
+                    self._entries.move_to_end(key)
+                    found[key] = cached[1]
+            self.memory_hits += len(found)
+
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        loaded = self._load_many(missing) if missing else {}
+        with self._lock:
+            self.db_hits += len(loaded)
+            self.misses += len(missing) - len(loaded)
+        for key, result in loaded.items():
+            self.remember(key, result)
+        found.update(loaded)
+        return found
+
+    def put(self, key, result):
+        self.put_many({key: result})
+
+    def put_many(self, results):
+        """Stores several {key: result} with one INSERT."""
+        if not results:
+            return
+        for key, result in results.items():
+            self.remember(key, result)
+        with db_connection() as conn:
+            try:
+                cur = conn.cursor()
+                # In key order, so concurrent writers of overlapping keys can't deadlock
+                rows = [(key, EMOTION_MODEL, *result) for key, result in sorted(results.items())]
+                execute_values(cur, EMOTION_CACHE_INSERT_MANY_SQL, rows,
+                               template="(%s, %s, %s, %s, %s::real[])", page_size=len(rows))
                 conn.commit()
-                return 0
-            return entries_count
-        return 0
-    finally:
-        conn.close()
+            except psycopg2.Error as err:
+                conn.rollback()
+                app.logger.warning("emotion cache write failed: %s", err)
+
+    def _load(self, key):
+        return self._load_many([key]).get(key)
+
+    def _load_many(self, keys):
+        with db_connection() as conn:
+            try:
+                cur = conn.cursor()
+                cur.execute(EMOTION_CACHE_SELECT_SQL, (keys,))
+                rows = cur.fetchall()
+                # End the read so the connection isn't idle in a transaction during inference
+                conn.commit()
+            except psycopg2.Error as err:
+                conn.rollback()
+                app.logger.warning("emotion cache read failed: %s", err)
+                return {}
+        return self.decode_rows(rows)
+
+    @staticmethod
+    def decode_rows(rows):
+        """{key: (label, score, emotion_scores)} from EMOTION_CACHE_SELECT_SQL rows."""
+        return {row[0].strip(): (row[1], float(row[2]), row[3]) for row in rows}
+
+    def remember(self, key, result):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.db_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.db_hits) / lookups, 4) if lookups else 0.0,
+            }
 
 
-def increment_user_entries(user_id):
-    conn = connect_db()
-    try:
-        cur = conn.cursor()
-        cur.execute("""
-            UPDATE users
-            SET entries_this_month = entries_this_month + 1
-            WHERE id = %s
-        """, (user_id,))
-        conn.commit()
-    finally:
-        conn.close()
+emotion_cache = EmotionCache(EMOTION_CACHE_SIZE, EMOTION_CACHE_TTL)
+
+
+class InferenceBatcher:
+    """Collects texts from concurrent callers and scores them in batches.
+
+    A dispatcher thread takes the first pending text, keeps collecting until
+    ``max_batch_size`` texts are queued or ``window`` seconds have passed,
+    and hands the batch to ``post_batch`` on a small executor so several
+    batches can be in flight. Each caller's Future receives the result for
+    its own text; identical texts in a batch are only sent once.
+    """
+
+    def __init__(self, post_batch, max_batch_size, window, concurrency):
+        self._post_batch = post_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.window = window
+        self.concurrency = max(1, concurrency)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._executor = None
+        self.batches = 0
+        self.texts = 0
+
+    def submit(self, text):
+        self._ensure_started()
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def analyze(self, text, timeout=None):
+        return self.submit(text).result(timeout)
+
+    def _ensure_started(self):
+        # Threads don't survive a fork, so each worker process starts its own dispatcher
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="inference")
+            threading.Thread(target=self._run, args=(self._queue,), name="inference-batcher", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self, pending):
+        while True:
+            batch = [pending.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        inference_batch_size.observe(len(texts))
+        with self._lock:
+            self.batches += 1
+            self.texts += len(texts)
+        try:
+            results = dict(zip(texts, self._post_batch(texts)))
+        except Exception as err:
+            for _, future in batch:
+                future.set_exception(err)
+            return
+        for text, future in batch:
+            future.set_result(results[text])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "texts": self.texts,
+                "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "window_ms": self.window * 1000,
+            }
 
 
-def analyze_emotion(text: str):
-    url = f"https://api-inference.huggingface.co/models/{EMOTION_MODEL}"
-    payload = {"inputs": text}
-    r = requests.post(url, headers=HF_HEADERS, json=payload, timeout=60)
-    r.raise_for_status()
-    data = r.json()
-    distribution = data[0] if isinstance(data, list) and isinstance(data[0], list) else data
+def normalize_distribution(distribution):
     dist_norm = sorted(
         [{"label": d["label"], "score": round(float(d["score"]) * 100, 2)} for d in distribution],
         key=lambda x: x["score"], reverse=True
     )
     top = dist_norm[0] if dist_norm else {"label": "neutral", "score": 50.0}
-    return top["label"], top["score"], dist_norm
+    return top["label"], top["score"], emotion_vector(dist_norm)
+
+
+def emotion_vector(distribution):
+    """Scores of a [{"label", "score"}] list in EMOTION_LABELS order, None where a label is missing.
+
+    Labels outside EMOTION_LABELS are left out.
+    """
+    by_label = {emotion["label"]: emotion["score"] for emotion in distribution}
+    return [by_label.get(label) for label in EMOTION_LABELS]
+
+
+def vector_distribution(scores):
+    """The [{"label", "score"}] list of an emotion_scores vector, highest score first."""
+    distribution = [
+        {"label": label, "score": score} for label, score in zip(EMOTION_LABELS, scores or ()) if score is not None
+    ]
+    distribution.sort(key=lambda x: x["score"], reverse=True)
+    return distribution
+
+
+def pad_scores(scores):
+    """An emotion_scores vector with one item per EMOTION_LABELS label, None where absent."""
+    scores = list(scores or ())
+    return scores + [None] * (len(EMOTION_LABELS) - len(scores))
+
+
+class InferenceUnavailable(Exception):
+    """Raised without calling the backend while the circuit breaker is open."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Emotion inference unavailable, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class InferenceClient:
+    """HTTP client for the inference backend with retries and a circuit breaker.
+
+    Requests go through a per-process Session whose adapter keeps up to
+    ``pool_size`` connections alive, with separate connect and read
+    timeouts. A 503 (the hosted model is still loading) or 429 is retried
+    up to ``retries`` times, waiting for the backend's ``estimated_time`` or
+    exponential backoff with full jitter, capped at ``retry_max``; so is a
+    failed connect. Read timeouts are not retried, since the backend may
+    still be working on the batch.
+
+    Once ``threshold`` calls in a row have failed the breaker opens and
+    calls raise InferenceUnavailable immediately. After ``cooldown`` seconds
+    one trial call is let through: success closes the breaker, failure
+    keeps it open for another cooldown.
+    """
+
+    RETRY_STATUSES = (429, 503)
+
+    def __init__(self, url, headers, connect_timeout, read_timeout, retries, retry_base, retry_max,
+                 threshold, cooldown, pool_size):
+        self.url = url
+        self.headers = headers
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = max(0, retries)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.pool_size = max(1, pool_size)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._session = None
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self.calls = 0
+        self.retried = 0
+        self.failed = 0
+        self.rejected = 0
+        self.trips = 0
+
+    def post(self, payload):
+        """POSTs ``payload`` as JSON and returns the decoded response body."""
+        trial = self._admit()
+        started = time.perf_counter()
+        try:
+            data = self._post_with_retries(payload)
+        except requests.HTTPError as err:
+            inference_latency.observe(time.perf_counter() - started, "http_error")
+            # The backend answered; a 4xx means the request was bad, not that it is down
+            status = err.response.status_code if err.response is not None else 500
+            self._record(status < 500 and status not in self.RETRY_STATUSES, trial)
+            raise
+        except Exception:
+            inference_latency.observe(time.perf_counter() - started, "error")
+            self._record(False, trial)
+            raise
+        inference_latency.observe(time.perf_counter() - started, "ok")
+        self._record(True, trial)
+        return data
+
+    def _post_with_retries(self, payload):
+        session = self._get_session()
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                r = session.post(self.url, headers=self.headers, json=payload, timeout=self.timeout)
+            except requests.ConnectionError:
+                # Includes ConnectTimeout; a ReadTimeout is not a ConnectionError and propagates
+                if last:
+                    raise
+                self._sleep(self.backoff(attempt))
+                continue
+            if r.status_code in self.RETRY_STATUSES and not last:
+                self._sleep(self.backoff(attempt, self.suggested_wait(r)))
+                continue
+            r.raise_for_status()
+            return r.json()
+
+    def _sleep(self, seconds):
+        with self._lock:
+            self.retried += 1
+        time.sleep(seconds)
+
+    def backoff(self, attempt, suggested=None):
+        if suggested is not None:
+            return min(suggested, self.retry_max) * random.uniform(1.0, 1.2)
+        return random.uniform(0, min(self.retry_base * (2 ** attempt), self.retry_max))
+
+    @staticmethod
+    def suggested_wait(response):
+        """Seconds the backend asked us to wait, from Retry-After or HF's estimated_time."""
+        try:
+            return float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
+            pass
+        try:
+            return float(response.json()["estimated_time"])
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def _admit(self):
+        """Raises InferenceUnavailable if the breaker is open; returns True for a trial call."""
+        with self._lock:
+            self.calls += 1
+            if self._opened_at is None:
+                return False
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if remaining <= 0 and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.rejected += 1
+            raise InferenceUnavailable(max(remaining, 1.0))
+
+    def _record(self, success, trial):
+        with self._lock:
+            if trial:
+                self._trial_running = False
+            if success:
+                self._failures = 0
+                self._opened_at = None
+                return
+            self.failed += 1
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.threshold:
+                if self._opened_at is None:
+                    self.trips += 1
+                self._opened_at = time.monotonic()
+
+    def _get_session(self):
+        # A Session's pooled sockets must not be shared with a forked child
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+                    self._pid = os.getpid()
+        return self._session
+
+    def stats(self):
+        with self._lock:
+            if self._opened_at is None:
+                state = "closed"
+            elif self._trial_running or time.monotonic() >= self._opened_at + self.cooldown:
+                state = "half_open"
+            else:
+                state = "open"
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "calls": self.calls,
+                "retries": self.retried,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "trips": self.trips,
+            }
+
+
+inference_client = InferenceClient(
+    EMOTION_API_URL, HF_HEADERS, EMOTION_CONNECT_TIMEOUT, EMOTION_TIMEOUT, EMOTION_RETRIES,
+    EMOTION_RETRY_BASE_SECONDS, EMOTION_RETRY_MAX_SECONDS, EMOTION_BREAKER_THRESHOLD,
+    EMOTION_BREAKER_COOLDOWN, EMOTION_BATCH_CONCURRENCY
+)
+
+
+def request_emotion_batch(texts):
+    """Scores several texts in one inference request; results follow input order."""
+    return decode_emotion_batch(texts, inference_client.post({"inputs": texts}))
+
+
+def decode_emotion_batch(texts, data):
+    """Normalizes the backend's response to a batch of ``texts``, one result per text."""
+    # A single input may come back unwrapped as one flat distribution
+    if len(texts) == 1 and data and isinstance(data, list) and isinstance(data[0], dict):
+        data = [data]
+    if not isinstance(data, list) or len(data) != len(texts):
+        raise ValueError(f"Inference returned {len(data) if isinstance(data, list) else 'no'} results for {len(texts)} inputs")
+    return [normalize_distribution(distribution) for distribution in data]
+
+
+inference_batcher = InferenceBatcher(
+    request_emotion_batch, EMOTION_BATCH_SIZE, EMOTION_BATCH_WINDOW_MS / 1000, EMOTION_BATCH_CONCURRENCY
+)
+
+
+def analyze_emotion(text: str):
+    key = emotion_cache_key(text)
+    cached = emotion_cache.get(key)
+    if cached is not None:
+        return cached
+    with timed_phase("inference"):
+        result = inference_batcher.analyze(text)
+    emotion_cache.put(key, result)
+    return result
+
+
+def analyze_emotions(texts):
+    """Batch form of analyze_emotion.
+
+    Every cache miss is submitted to the batcher before waiting on any of
+    them, so the texts share inference requests, and the new results are
+    cached with one write. A text that fails yields its exception in place
+    of a result.
+    """
+    results = [None] * len(texts)
+    pending = []
+    analyzed = {}
+    keys = [emotion_cache_key(text) for text in texts]
+    cached = emotion_cache.get_many(keys)
+    for i, (text, key) in enumerate(zip(texts, keys)):
+        if key in cached:
+            results[i] = cached[key]
+        else:
+            pending.append((i, key, inference_batcher.submit(text)))
+    for i, key, future in pending:
+        try:
+            with timed_phase("inference"):
+                results[i] = future.result()
+        except Exception as err:
+            results[i] = err
+            continue
+        analyzed[key] = results[i]
+    emotion_cache.put_many(analyzed)
+    return results
+
+
+# Leases up to N due entries (pending, or running with an expired lease) to one worker
+CLAIM_ENTRIES_SQL = """
+    -- name: claim_entries
+    UPDATE entries
+    SET analysis_status = 'running',
+        analysis_attempts = analysis_attempts + 1,
+        next_attempt_at = NOW() + make_interval(secs => %s)
+    WHERE (id, created_at) IN (
+        SELECT id, created_at FROM entries
+        WHERE analysis_status IN ('pending', 'running') AND next_attempt_at <= NOW()
+        ORDER BY next_attempt_at
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, user_id, content, analysis_attempts, created_at
+"""
+
+
+class AnalysisWorkerPool:
+    """Background threads that analyze entries stored with a pending status.
+
+    Workers claim due entries with ``FOR UPDATE SKIP LOCKED`` (so several
+    processes can share the queue), mark them ``running`` under a lease and
+    score them through analyze_emotions. A failure puts the entry back to
+    ``pending`` with exponential backoff and jitter until
+    ANALYSIS_MAX_ATTEMPTS is reached, after which it is marked ``failed``;
+    while the inference circuit breaker is open entries are simply put back
+    until it lets calls through again.
+    Entries whose lease expires (e.g. the process died) are claimed again.
+    """
+
+    def __init__(self, workers, max_attempts, retry_base, retry_max, lease, poll_interval, claim_size):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.claim_size = max(1, claim_size)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pid = None
+
+    def notify(self):
+        """Wakes the workers, starting them in this process if needed."""
+        self.ensure_started()
+        self._wakeup.set()
+
+    def ensure_started(self):
+        if self.workers < 1 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._wakeup = threading.Event()
+            for n in range(self.workers):
+                threading.Thread(target=self._run, name=f"analysis-worker-{n}", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            try:
+                claimed = self._claim()
+            except Exception as err:
+                app.logger.warning("analysis worker could not claim entries: %s", err)
+                claimed = []
+            if not claimed:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            results = analyze_emotions([entry['content'] for entry in claimed])
+            for entry, result in zip(claimed, results):
+                try:
+                    self._finish(entry, result)
+                except Exception as err:
+                    app.logger.warning("analysis worker could not save entry %s: %s", entry['id'], err)
+
+    def _claim(self):
+        with get_pool().connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(CLAIM_ENTRIES_SQL, (self.lease, self.claim_size))
+            claimed = cur.fetchall()
+            conn.commit()
+            return claimed
+
+    def _finish(self, entry, result):
+        with get_pool().connection() as conn:
+            cur = conn.cursor()
+            if not isinstance(result, Exception):
+                label, score_pct, scores = result
+                cur.execute("""
+                    UPDATE entries
+                    SET emotion_label = %s, emotion_score = %s, emotion_scores = %s::real[], emotion_model = %s,
+                        analysis_status = 'done', analysis_error = NULL, next_attempt_at = NULL
+                    WHERE id = %s AND created_at = %s AND analysis_status = 'running'
+                """, (label, score_pct, scores, EMOTION_MODEL, entry['id'], entry['created_at']))
+                if cur.rowcount:
+                    apply_entry_rollups(cur, entry['user_id'], [(entry['created_at'], label, score_pct, scores)])
+                    bump_data_version(cur, entry['user_id'])
+            elif isinstance(result, InferenceUnavailable):
+                # The breaker rejected the call without trying, so it doesn't use up an attempt
+                cur.execute("""
+                    UPDATE entries
+                    SET analysis_status = 'pending', analysis_attempts = analysis_attempts - 1,
+                        next_attempt_at = NOW() + make_interval(secs => %s)
+                    WHERE id = %s AND created_at = %s AND analysis_status = 'running'
+                """, (result.retry_after, entry['id'], entry['created_at']))
+            elif entry['analysis_attempts'] >= self.max_attempts:
+                cur.execute("""
+                    UPDATE entries
+                    SET analysis_status = 'failed', analysis_error = %s, next_attempt_at = NULL
+                    WHERE id = %s AND created_at = %s AND analysis_status = 'running'
+                """, (str(result), entry['id'], entry['created_at']))
+                if cur.rowcount:
+                    bump_data_version(cur, entry['user_id'])
+            else:
+                cur.execute("""
+                    UPDATE entries
+                    SET analysis_status = 'pending', analysis_error = %s,
+                        next_attempt_at = NOW() + make_interval(secs => %s)
+                    WHERE id = %s AND created_at = %s AND analysis_status = 'running'
+                """, (str(result), self.retry_delay(entry['analysis_attempts']), entry['id'], entry['created_at']))
+            conn.commit()
+        user_cache.invalidate(entry['user_id'])
+
+    def retry_delay(self, attempts):
+        delay = min(self.retry_base * (2 ** max(attempts - 1, 0)), self.retry_max)
+        return delay * random.uniform(0.5, 1.0)
+
+
+analysis_workers = AnalysisWorkerPool(
+    ANALYSIS_WORKERS, ANALYSIS_MAX_ATTEMPTS, ANALYSIS_RETRY_BASE_SECONDS, ANALYSIS_RETRY_MAX_SECONDS,
+    ANALYSIS_LEASE_SECONDS, ANALYSIS_POLL_SECONDS, EMOTION_BATCH_SIZE
+)
+
+
+class EntryMaintenance:
+    """Background thread that runs run_entry_maintenance every ``interval`` seconds.
+
+    Every app process starts one, the first round right away so that
+    partitions exist as soon as the app is up; the advisory lock lets only
+    one process do the work each round.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def ensure_started(self):
+        if self.interval <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            threading.Thread(target=self._run, name="entry-maintenance", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            try:
+                with get_pool().connection() as conn:
+                    summary = run_entry_maintenance(conn)
+                if summary:
+                    app.logger.info("entry maintenance: %s", summary)
+            except Exception as err:
+                app.logger.warning("entry maintenance failed: %s", err)
+            time.sleep(self.interval * random.uniform(0.9, 1.1))
+
+
+entry_maintenance = EntryMaintenance(ENTRY_MAINTENANCE_SECONDS)
+
+
+def wants_async_analysis(prefer, flag):
+    """Async analysis is the configured default or requested per call.
+
+    ``prefer`` is the Prefer header and ``flag`` the ?async= argument, None when absent.
+    """
+    if "respond-async" in (prefer or ""):
+        return True
+    if flag is not None:
+        return flag.lower() in ("1", "true", "yes")
+    return ENTRY_ANALYSIS_MODE == "async"
 
 
 def row_to_entry(row):
@@ -244,12 +2407,318 @@ def row_to_entry(row):
         "content": row['content'],
         "emotion_label": row['emotion_label'],
         "emotion_emoji": EMOTION_EMOJIS.get(row['emotion_label'], '❓'),
-        "emotion_score": float(row['emotion_score']),
-        "emotions": row['emotions_json'] if row['emotions_json'] else [],
+        # Pending entries have no score until a background worker analyzes them
+        "emotion_score": float(row['emotion_score']) if row['emotion_score'] is not None else None,
+        "emotions": vector_distribution(row['emotion_scores']),
+        "analysis_status": row.get('analysis_status', 'done'),
         "created_at": row['created_at'].isoformat(),
     }
 
 
+ENTRY_COLUMNS = "id, content, emotion_label, emotion_score, emotion_scores, analysis_status, created_at"
+
+# GET /api/entries?fields= picks from these per entry; ?include= picks the sections
+ENTRY_FIELDS = ("id", "content", "emotion_label", "emotion_emoji", "emotion_score", "emotions",
+                "analysis_status", "created_at")
+LIST_SECTIONS = ("entries", "trend", "original_trend", "multi_trend")
+DEFAULT_LIST_SECTIONS = ("entries", "original_trend", "multi_trend")
+
+
+def parse_choices(value, allowed, default):
+    """Splits a comma-separated query value; raises ValueError naming unknown items."""
+    if value is None:
+        return list(default)
+    chosen = [item.strip() for item in value.split(",") if item.strip()]
+    unknown = [item for item in chosen if item not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown value(s) {', '.join(unknown)}; choose from {', '.join(allowed)}")
+    return list(dict.fromkeys(chosen))
+
+
+def entry_trend(entries):
+    """Columnar trend of a page: parallel arrays, one score series per emotion label.
+
+    Replaces original_trend and multi_trend, which repeat every timestamp
+    and label once per entry.
+    """
+    labels = list(EMOTION_EMOJIS)
+    scores = []
+    for entry in entries:
+        by_label = {emotion['label']: emotion['score'] for emotion in entry['emotions']}
+        labels += [label for label in by_label if label not in labels]
+        scores.append(by_label)
+    return {
+        "created_at": [entry['created_at'] for entry in entries],
+        "score": [entry['emotion_score'] for entry in entries],
+        "emotions": {label: [by_label.get(label) for by_label in scores] for label in labels},
+    }
+
+
+def encode_cursor(row, direction):
+    """Opaque page cursor: the (created_at, id) of a boundary row and the paging direction."""
+    raw = json.dumps([row['created_at'].isoformat(), row['id'], direction], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Returns (created_at, id, direction); raises ValueError for anything malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, entry_id, direction = json.loads(raw)
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return datetime.fromisoformat(created_at), int(entry_id), direction
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+# Oldest created_at visible to a plan keeping %s days. It is computed on the
+# database's clock, which also sets created_at and the retention cutoffs, so
+# the window can't shift with the app server's time zone. LOCALTIMESTAMP is
+# stable, so the entries partitions outside the window are still pruned,
+# when the query starts rather than while it is planned.
+HISTORY_START_SQL = "LOCALTIMESTAMP - make_interval(days => %s)"
+
+
+def entry_filters(user_id, history_days, start_date=None, end_date=None):
+    """WHERE clauses and params for the entries a user can see in the given date range."""
+    filters = ["user_id = %s", f"created_at >= {HISTORY_START_SQL}"]
+    params = [user_id, history_days]
+    if start_date:
+        filters.append("created_at >= %s")
+        params.append(start_date)
+    if end_date:
+        filters.append("created_at <= %s")
+        params.append(end_date)
+    return filters, params
+
+
+def entries_page_query(user_id, history_days, limit, start_date=None, end_date=None, offset=0, cursor=None):
+    """Builds the SQL for one page of entries, newest first.
+
+    With a decoded ``cursor`` the page starts right after the boundary row,
+    compared as the row value (created_at, id), so the database seeks straight
+    to it instead of reading and discarding ``offset`` rows. Pages going back
+    ("prev") are read in ascending order and must be reversed by the caller.
+    One extra row is fetched to tell whether there is another page.
+    """
+    filters, params = entry_filters(user_id, history_days, start_date, end_date)
+    order = "DESC"
+    if cursor:
+        created_at, entry_id, direction = cursor
+        filters.append("(created_at, id) < (%s, %s)" if direction == "next" else "(created_at, id) > (%s, %s)")
+        params += [created_at, entry_id]
+        order = "DESC" if direction == "next" else "ASC"
+    # Note: the filters only contain safe pieces constructed above
+    query = f"""
+        -- name: list_entries
+        SELECT {ENTRY_COLUMNS}
+        FROM entries
+        WHERE {' AND '.join(filters)}
+        ORDER BY created_at {order}, id {order}
+        LIMIT %s
+    """
+    params.append(limit + 1)
+    if not cursor and offset:
+        query += " OFFSET %s"
+        params.append(offset)
+    return query, params
+
+
+def fetch_entry_page(cur, user_id, history_days, limit, start_date=None, end_date=None, offset=0, cursor=None):
+    """Runs entries_page_query and returns (rows, next_cursor, prev_cursor)."""
+    cur.execute(*entries_page_query(user_id, history_days, limit, start_date, end_date, offset, cursor))
+    return split_entry_page(cur.fetchall(), limit, offset, cursor)
+
+
+def split_entry_page(rows, limit, offset=0, cursor=None):
+    """Trims entries_page_query's extra row; returns (rows, next_cursor, prev_cursor)."""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if cursor and cursor[2] == "prev":
+        rows.reverse()
+        has_newer, has_older = has_more, True
+    else:
+        has_newer, has_older = bool(cursor or offset), has_more
+    next_cursor = encode_cursor(rows[-1], "next") if rows and has_older else None
+    prev_cursor = encode_cursor(rows[0], "prev") if rows and has_newer else None
+    return rows, next_cursor, prev_cursor
+
+
+def entry_count_query(user_id, history_days, start_date=None, end_date=None, approximate=False):
+    """Builds the SQL counting the entries that match the filters.
+
+    The approximate count comes from the daily rollups: it is cheap at any
+    journal size but counts only analyzed entries and whole days.
+    """
+    if approximate:
+        return """
+            -- name: count_entries_approx
+            SELECT COALESCE(SUM(entry_count), 0) AS count
+            FROM emotion_daily_rollups
+            WHERE user_id = %s AND day >= CURRENT_DATE - %s
+              AND (%s::date IS NULL OR day >= %s::date)
+              AND (%s::date IS NULL OR day <= %s::date)
+        """, [user_id, history_days, start_date or None, start_date or None, end_date or None, end_date or None]
+    filters, params = entry_filters(user_id, history_days, start_date, end_date)
+    return f"-- name: count_entries\nSELECT COUNT(*) AS count FROM entries WHERE {' AND '.join(filters)}", params
+
+
+def count_entries(cur, user_id, history_days, start_date=None, end_date=None, approximate=False):
+    cur.execute(*entry_count_query(user_id, history_days, start_date, end_date, approximate))
+    return int(cur.fetchone()['count'])
+
+
+SEARCH_MAX_QUERY_LENGTH = 256
+
+# Ranked full-text matches among the entries a user can see, best first. The
+# GIN index on content_tsv finds the matches; only those are ranked.
+ENTRY_SEARCH_SQL = """
+    -- name: search_entries
+    SELECT {columns}, rank
+    FROM (
+        SELECT {columns}, ts_rank_cd(content_tsv, query) AS rank
+        FROM entries, websearch_to_tsquery('english', %(q)s) query
+        WHERE {filters}
+    ) matches
+    {after}
+    ORDER BY rank DESC, created_at DESC, id DESC
+    LIMIT %(limit)s
+"""
+
+
+def encode_search_cursor(row):
+    """Opaque search cursor: the (rank, created_at, id) of the last row on a page."""
+    raw = json.dumps([row['rank'], row['created_at'].isoformat(), row['id']], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor):
+    """Returns (rank, created_at, id); raises ValueError for anything malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        rank, created_at, entry_id = json.loads(raw)
+        return float(rank), datetime.fromisoformat(created_at), int(entry_id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def parse_search_params(args):
+    """Validates GET /api/entries/search's query args; raises ValueError with the message for the 400."""
+    q = (args.get("q") or "").strip()
+    if not q:
+        raise ValueError("q is required")
+    if len(q) > SEARCH_MAX_QUERY_LENGTH:
+        raise ValueError(f"q must be at most {SEARCH_MAX_QUERY_LENGTH} characters")
+    try:
+        limit = int(args.get("limit", 20))
+        cursor = decode_search_cursor(args["cursor"]) if args.get("cursor") else None
+    except ValueError:
+        raise ValueError("Invalid pagination params") from None
+    if not 1 <= limit <= SEARCH_MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {SEARCH_MAX_LIMIT}")
+
+    emotion = args.get("emotion") or None
+    if emotion and emotion not in EMOTION_EMOJIS:
+        raise ValueError(f"Unknown emotion {emotion}; choose from {', '.join(EMOTION_EMOJIS)}")
+    try:
+        min_score = float(args["min_score"]) if args.get("min_score") else None
+        max_score = float(args["max_score"]) if args.get("max_score") else None
+    except ValueError:
+        raise ValueError("min_score and max_score must be numbers") from None
+
+    return {
+        "q": q,
+        "limit": limit,
+        "cursor": cursor,
+        "emotion": emotion,
+        "min_score": min_score,
+        "max_score": max_score,
+        "fields": parse_choices(args.get("fields"), ENTRY_FIELDS, ENTRY_FIELDS),
+    }
+
+
+def entry_search_query(user_id, history_days, q, limit, emotion=None, min_score=None, max_score=None, cursor=None):
+    """Builds the SQL for one page of search results; like entries_page_query it fetches one extra row.
+
+    A decoded ``cursor`` continues after that row in (rank, created_at, id) order.
+    """
+    filters = ["user_id = %(user_id)s", f"created_at >= {HISTORY_START_SQL % '%(history_days)s'}", "content_tsv @@ query"]
+    params = {"q": q, "user_id": user_id, "history_days": history_days, "limit": limit + 1}
+    if emotion:
+        filters.append("emotion_label = %(emotion)s")
+        params["emotion"] = emotion
+    if min_score is not None:
+        filters.append("emotion_score >= %(min_score)s")
+        params["min_score"] = min_score
+    if max_score is not None:
+        filters.append("emotion_score <= %(max_score)s")
+        params["max_score"] = max_score
+    after = ""
+    if cursor:
+        after = "WHERE (rank, created_at, id) < (%(rank)s::real, %(created_at)s, %(id)s)"
+        params["rank"], params["created_at"], params["id"] = cursor
+    query = ENTRY_SEARCH_SQL.format(columns=ENTRY_COLUMNS, filters=" AND ".join(filters), after=after)
+    return query, params
+
+
+def search_payload(params, rows):
+    """The GET /api/entries/search body for the rows entry_search_query returned."""
+    limit, fields = params['limit'], params['fields']
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    entries = []
+    for row in rows:
+        entry = row_to_entry(row)
+        if len(fields) != len(ENTRY_FIELDS):
+            entry = {field: entry[field] for field in fields}
+        entry["rank"] = round(float(row['rank']), 4)
+        entries.append(entry)
+    return {
+        "query": params['q'],
+        "limit": limit,
+        "next_cursor": encode_search_cursor(rows[-1]) if rows and has_more else None,
+        "entries": entries,
+    }
+
+
+@app.before_request
+def start_background_workers():
+    if ENTRY_ANALYSIS_MODE == "async":
+        analysis_workers.ensure_started()
+    entry_maintenance.ensure_started()
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.phases = {}
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Observes the request's latency and phases, and logs it if it was slow.
+
+    Time not spent in the database, inference, password hashing or JSON
+    serialization is reported as the "python" phase. Streamed bodies are
+    only timed until the response starts.
+    """
+    if "request_started" not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_started
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    request_latency.observe(elapsed, request.method, route, response.status_code)
+    phases = dict(g.phases, python=max(elapsed - sum(g.phases.values()), 0.0))
+    for phase, seconds in phases.items():
+        request_phase_latency.observe(seconds, route, phase)
+    if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+        app.logger.warning(
+            "slow request: %s %s %s took %.1f ms (%s; %d queries)", request.method, route, response.status_code,
+            elapsed * 1000, ", ".join(f"{phase} {seconds * 1000:.1f} ms" for phase, seconds in sorted(phases.items())),
+            g.get("queries", 0))
+    return response
+
+
 @app.route("/")
 def home():
     # If you want to serve templates.index.html, use render_template("index.html")
@@ -278,15 +2747,22 @@ def api_register():
     email, password, name = data.get("email", "").strip(), data.get("password", ""), data.get("name", "").strip()
     if not email or not password:
         return jsonify({"error": "Email and password are required"}), 400
-    conn = connect_db()
-    try:
-        cur = conn.cursor()
-        cur.execute("SELECT id FROM users WHERE email=%s", (email,))
-        if cur.fetchone():
-            return jsonify({"error": "User already exists"}), 409
 
-        password_hash = hash_password(password)
+    # Checked before hashing so a taken email costs no bcrypt work
+    conn = get_db()
+    cur = conn.cursor()
+    cur.execute(EMAIL_TAKEN_SQL, (email,))
+    exists = cur.fetchone()
+    return_db()
+    if exists:
+        return jsonify({"error": "User already exists"}), 409
+
+    # The connection isn't held during bcrypt
+    password_hash = hash_password(password)
 
+    conn = get_db()
+    try:
+        cur = conn.cursor()
         # Use RETURNING id to get the new user's ID
         sql = "INSERT INTO users (email, password_hash, name, subscription_tier, subscription_start) VALUES (%s, %s, %s, %s, %s) RETURNING id"
         values = (email, password_hash, name, 'free', date.today())
@@ -306,11 +2782,25 @@ def api_register():
                 "subscription_tier": "free"
             }
         }), 201
+    except psycopg2.errors.UniqueViolation:
+        # Registered by a concurrent request after the check above
+        conn.rollback()
+        return jsonify({"error": "User already exists"}), 409
     except psycopg2.Error as err:
         conn.rollback()
         return jsonify({"error": f"Database error: {err}"}), 500
-    finally:
-        conn.close()
+
+
+def upgrade_password_hash(user_id, password):
+    """Re-hashes a password made with a different BCRYPT_ROUNDS; skipped when hashing is busy."""
+    try:
+        password_hash = hash_password(password)
+    except PasswordHasherBusy:
+        return
+    conn = get_db()
+    cur = conn.cursor()
+    cur.execute("UPDATE users SET password_hash = %s WHERE id = %s", (password_hash, user_id))
+    conn.commit()
 
 
 @app.post("/api/login")
@@ -320,123 +2810,177 @@ def api_login():
     if not email or not password:
         return jsonify({"error": "Email and password are required"}), 400
 
-    conn = connect_db()
-    try:
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("SELECT id, password_hash, name, subscription_tier FROM users WHERE email=%s", (email,))
-        user = cur.fetchone()
-
-        if user and check_password(password, user['password_hash']):
-            token = create_jwt_token(user['id'])
-            return jsonify({
-                "message": "Login successful",
-                "token": token,
-                "user": {
-                    "id": user['id'],
-                    "email": email,
-                    "name": user['name'],
-                    "subscription_tier": user['subscription_tier']
-                }
-            })
-        else:
-            return jsonify({"error": "Invalid email or password"}), 401
-    finally:
-        conn.close()
+    conn = get_db()
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur.execute(LOGIN_SQL, (email,))
+    user = cur.fetchone()
+    return_db()
 
+    if user and check_password(password, user['password_hash']):
+        if password_hasher.needs_rehash(user['password_hash']):
+            upgrade_password_hash(user['id'], password)
+        token = create_jwt_token(user['id'])
+        return jsonify({
+            "message": "Login successful",
+            "token": token,
+            "user": {
+                "id": user['id'],
+                "email": email,
+                "name": user['name'],
+                "subscription_tier": user['subscription_tier']
+            }
+        })
+    else:
+        return jsonify({"error": "Invalid email or password"}), 401
 
-@app.get("/api/profile")
-def get_profile():
-    user = get_user_from_request()
-    if not user:
-        return jsonify({"error": "Authentication required"}), 401
 
-    entries_this_month = get_user_entries_this_month(user['id'])
+def profile_payload(user, entries_this_month):
     plan = SUBSCRIPTION_PLANS.get(user['subscription_tier'], SUBSCRIPTION_PLANS['free'])
-
-    return jsonify({
-        "user": user,
+    return {
+        "user": {key: value for key, value in user.items() if key not in ('data_version', 'today')},
         "usage": {
             "entries_this_month": entries_this_month,
             "entries_remaining": plan['max_entries'] - entries_this_month,
             "max_entries": plan['max_entries']
         },
         "plan": plan
-    })
+    }
 
 
-@app.get("/api/entries")
-def list_entries():
-    user = get_user_from_request()
+@app.get("/api/profile")
+def get_profile():
+    user = get_user_from_request(fresh=True)
     if not user:
         return jsonify({"error": "Authentication required"}), 401
 
-    try:
-        limit = int(request.args.get("limit", 10))
-        offset = int(request.args.get("offset", 0))
-    except ValueError:
-        return jsonify({"error": "Invalid pagination params"}), 400
-
-    plan = SUBSCRIPTION_PLANS.get(user['subscription_tier'], SUBSCRIPTION_PLANS['free'])
-    history_days = plan['history_days']
-
-    start_date = request.args.get("start_date")
-    end_date = request.args.get("end_date")
+    return conditional_json(user, lambda: profile_payload(user, get_user_entries_this_month(user['id'])))
 
-    # Use PostgreSQL interval syntax: we will use parameterized query with interval
-    filters = ["user_id = %s", "created_at >= NOW() - INTERVAL '%s days'"]
-    params = [user['id'], history_days]
 
-    if start_date:
-        filters.append("created_at >= %s")
-        params.append(start_date)
-    if end_date:
-        filters.append("created_at <= %s")
-        params.append(end_date)
+def parse_list_params(args):
+    """Validates GET /api/entries' query args; raises ValueError with the message for the 400."""
+    try:
+        limit = int(args.get("limit", 10))
+        offset = int(args.get("offset", 0))
+        cursor = decode_cursor(args["cursor"]) if args.get("cursor") else None
+    except ValueError:
+        raise ValueError("Invalid pagination params") from None
+    if limit < 1 or offset < 0 or (cursor and offset):
+        raise ValueError("Invalid pagination params")
 
-    where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
+    # Offset pages keep their exact total for older clients; cursor pages skip it unless asked
+    total_mode = args.get("total", "none" if cursor else "exact")
+    if total_mode not in ("exact", "approx", "none"):
+        raise ValueError("total must be exact, approx or none")
 
-    conn = connect_db()
-    try:
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        # Note: the where_clause only contains safe pieces constructed above
-        query = f"""
-            SELECT id, content, emotion_label, emotion_score, emotions_json, created_at
-            FROM entries
-            {where_clause}
-            ORDER BY created_at DESC
-            LIMIT %s OFFSET %s
-        """
-        cur.execute(query, (*params, limit, offset))
-        rows = cur.fetchall()
+    return {
+        "limit": limit,
+        "offset": offset,
+        "cursor": cursor,
+        "total_mode": total_mode,
+        "fields": parse_choices(args.get("fields"), ENTRY_FIELDS, ENTRY_FIELDS),
+        "sections": parse_choices(args.get("include"), LIST_SECTIONS, DEFAULT_LIST_SECTIONS),
+        "start_date": args.get("start_date"),
+        "end_date": args.get("end_date"),
+    }
 
-        count_query = f"SELECT COUNT(*) FROM entries {where_clause}"
-        # For count, use same params but without limit/offset
-        cur.execute(count_query, tuple(params))
-        total_row = cur.fetchone()
-        total = total_row['count'] if isinstance(total_row, dict) and 'count' in total_row else (total_row[0] if total_row else 0)
 
-        entries = [row_to_entry(r) for r in rows]
+def entry_list_payload(params, rows, next_cursor, prev_cursor, total):
+    """The GET /api/entries body for one page of rows, shaped by parse_list_params' params."""
+    entries = [row_to_entry(r) for r in rows]
+    fields, sections = params['fields'], params['sections']
 
-        original_trend = [
+    result = {
+        "total": total,
+        "total_mode": params['total_mode'],
+        "limit": params['limit'],
+        "offset": None if params['cursor'] else params['offset'],
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+    }
+    if "entries" in sections:
+        result["entries"] = entries if len(fields) == len(ENTRY_FIELDS) else [
+            {field: e[field] for field in fields} for e in entries
+        ]
+    if "trend" in sections:
+        result["trend"] = entry_trend(entries)
+    # The per-entry trend lists are kept for older clients
+    if "original_trend" in sections:
+        result["original_trend"] = [
             {"created_at": e["created_at"], "score": e["emotion_score"]}
             for e in entries
         ]
-
-        multi_trend = [
+    if "multi_trend" in sections:
+        result["multi_trend"] = [
             {"created_at": e["created_at"], "emotions": e["emotions"]}
             for e in entries
         ]
+    return result
 
-        return jsonify({
-            "total": total,
-            "limit": limit,
-            "offset": offset,
-            "entries": entries,
-            "original_trend": original_trend,
-            "multi_trend": multi_trend
-        })
-    finally:
-        conn.close()
+
+def entry_list_result(cur, user_id, history_days, params):
+    """Fetches the page (and total) parse_list_params' params ask for; returns the GET /api/entries body."""
+    start_date, end_date = params['start_date'], params['end_date']
+    page = fetch_entry_page(
+        cur, user_id, history_days, params['limit'], start_date, end_date, params['offset'], params['cursor']
+    )
+    total = None
+    if params['total_mode'] != "none":
+        total = count_entries(cur, user_id, history_days, start_date, end_date,
+                              approximate=params['total_mode'] == "approx")
+    return entry_list_payload(params, *page, total)
+
+
+@app.get("/api/entries")
+def list_entries():
+    user = get_user_from_request(fresh=True)
+    if not user:
+        return jsonify({"error": "Authentication required"}), 401
+
+    try:
+        params = parse_list_params(request.args)
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+    plan = SUBSCRIPTION_PLANS.get(user['subscription_tier'], SUBSCRIPTION_PLANS['free'])
+    return conditional_json(user, lambda: entry_list_result(
+        get_db().cursor(cursor_factory=RealDictCursor), user['id'], plan['history_days'], params))
+
+
+@app.get("/api/entries/search")
+def search_entries():
+    user = get_user_from_request(fresh=True)
+    if not user:
+        return jsonify({"error": "Authentication required"}), 401
+
+    try:
+        params = parse_search_params(request.args)
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+    plan = SUBSCRIPTION_PLANS.get(user['subscription_tier'], SUBSCRIPTION_PLANS['free'])
+
+    def build():
+        cur = get_db().cursor(cursor_factory=RealDictCursor)
+        cur.execute(*entry_search_query(
+            user['id'], plan['history_days'], params['q'], params['limit'], params['emotion'],
+            params['min_score'], params['max_score'], params['cursor']
+        ))
+        return search_payload(params, cur.fetchall())
+
+    return conditional_json(user, build)
+
+
+INSERT_ENTRY_SQL = f"""
+    INSERT INTO entries (user_id, content, emotion_label, emotion_score, emotion_scores, emotion_model)
+    VALUES (%s, %s, %s, %s, %s::real[], %s)
+    RETURNING {ENTRY_COLUMNS}
+"""
+# Entries waiting for the background workers, optionally with a placeholder label and a delay
+INSERT_PENDING_ENTRY_SQL = f"""
+    INSERT INTO entries (user_id, content, emotion_label, analysis_status, analysis_error, next_attempt_at)
+    VALUES (%s, %s, %s, 'pending', %s, NOW() + make_interval(secs => %s))
+    RETURNING {ENTRY_COLUMNS}
+"""
 
 
 @app.post("/api/entries")
@@ -450,9 +2994,187 @@ def create_entry():
     if not content:
         return jsonify({"error": "content is required"}), 400
 
-    entries_this_month = get_user_entries_this_month(user['id'])
     plan = SUBSCRIPTION_PLANS.get(user['subscription_tier'], SUBSCRIPTION_PLANS['free'])
 
+    # Counted up front so concurrent posts can never overshoot the limit
+    reserved, entries_this_month = reserve_entries(user['id'], plan['max_entries'])
+    if not reserved:
+        return jsonify({
+            "error": "Monthly entry limit exceeded",
+            "limit": plan['max_entries'],
+            "current": entries_this_month
+        }), 429
+    # The reservation is committed; the pool gets the connection back while the text is analyzed
+    return_db()
+
+    analysis = None
+    deferred = {"label": None, "error": None, "delay": 0}
+    if not wants_async_analysis(request.headers.get("Prefer"), request.args.get("async")):
+        try:
+            analysis = analyze_emotion(content)
+        except Exception as err:
+            # Keep the entry with a placeholder label; the background workers re-analyze it
+            app.logger.warning("emotion analysis failed, deferring entry: %s", err)
+            deferred = {
+                "label": PLACEHOLDER_EMOTION,
+                "error": str(err),
+                "delay": getattr(err, "retry_after", ANALYSIS_RETRY_BASE_SECONDS),
+            }
+
+    conn = get_db()
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+
+    try:
+        if analysis is None:
+            cur.execute(INSERT_PENDING_ENTRY_SQL, (user['id'], content, deferred['label'], deferred['error'], deferred['delay']))
+            row = cur.fetchone()
+        else:
+            label, score_pct, scores = analysis
+            cur.execute(INSERT_ENTRY_SQL, (user['id'], content, label, score_pct, scores, EMOTION_MODEL))
+            row = cur.fetchone()
+            apply_entry_rollups(cur, user['id'], [(row['created_at'], label, score_pct, scores)])
+        bump_data_version(cur, user['id'])
+        conn.commit()
+        user_cache.invalidate(user['id'])
+    except Exception:
+        release_entries(user['id'], reserved)
+        raise
+
+    if analysis is None:
+        analysis_workers.notify()
+        response = jsonify(row_to_entry(row))
+        response.headers['Location'] = f"/api/entries/{row['id']}"
+        return response, 202
+    return jsonify(row_to_entry(row)), 201
+
+
+def iter_bulk_rows(stream, fmt):
+    """Yields (row_number, record, error) from an NDJSON or CSV upload, one line at a time."""
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    if fmt == "csv":
+        for row_number, record in enumerate(csv.DictReader(text), start=1):
+            yield row_number, record, None
+        return
+    row_number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield row_number, None, "Invalid JSON"
+            continue
+        # Its shape is checked by parse_bulk_record
+        yield row_number, record, None
+
+
+def parse_bulk_record(record):
+    """Validates one imported record, returning (content, created_at); raises ValueError for the row's error."""
+    if not isinstance(record, dict):
+        raise ValueError("Each line must be a JSON object")
+    content = record.get("content")
+    if content is not None and not isinstance(content, str):
+        raise ValueError("content must be a string")
+    content = (content or "").strip()
+    if not content:
+        raise ValueError("content is required")
+    created_at = record.get("created_at") or None
+    if created_at:
+        try:
+            created_at = datetime.fromisoformat(created_at.strip())
+        except (AttributeError, ValueError):
+            raise ValueError("created_at must be an ISO 8601 timestamp")
+    return content, created_at
+
+
+def import_entry_batch(user, plan, batch, results):
+    """Analyzes and inserts one batch of parsed rows with a single multi-row INSERT.
+
+    Rows past the plan's monthly limit are reported as quota_exceeded. Rows
+    whose analysis failed are still stored, as pending, for the background
+    workers to retry.
+    """
+    reserved, _ = reserve_entries(user['id'], plan['max_entries'], len(batch), partial=True)
+    for row_number, _, _ in batch[reserved:]:
+        results.append({"row": row_number, "status": "quota_exceeded"})
+    batch = batch[:reserved]
+    if not batch:
+        return
+
+    try:
+        inserted, analyses = insert_entry_batch(user, batch)
+    except Exception:
+        release_entries(user['id'], reserved)
+        raise
+
+    for (row_number, _, _), (entry_id, status, _) in zip(batch, inserted):
+        results.append({
+            "row": row_number,
+            "status": "created" if status == 'done' else "pending_analysis",
+            "id": entry_id
+        })
+    if any(status == 'pending' for _, status, _ in inserted):
+        analysis_workers.notify()
+
+
+def insert_entry_batch(user, batch):
+    """Analyzes the batch and stores it with one multi-row INSERT; returns (inserted rows, analyses)."""
+    # reserve_entries has committed; the connection isn't held during analysis
+    return_db()
+    analyses = analyze_emotions([content for _, content, _ in batch])
+
+    values = []
+    for (row_number, content, created_at), analysis in zip(batch, analyses):
+        if isinstance(analysis, Exception):
+            values.append((user['id'], content, PLACEHOLDER_EMOTION, None, None, None, 'pending', True, created_at))
+        else:
+            label, score_pct, scores = analysis
+            values.append((user['id'], content, label, score_pct, scores, EMOTION_MODEL, 'done', False, created_at))
+
+    conn = get_db()
+    cur = conn.cursor()
+    inserted = execute_values(cur, """
+        INSERT INTO entries
+            (user_id, content, emotion_label, emotion_score, emotion_scores, emotion_model, analysis_status,
+             next_attempt_at, created_at)
+        VALUES %s
+        RETURNING id, analysis_status, created_at
+    """, values, template="(%s, %s, %s, %s, %s::real[], %s, %s, CASE WHEN %s THEN NOW() END, COALESCE(%s, NOW()))",
+        page_size=len(values), fetch=True)
+    apply_entry_rollups(cur, user['id'], [
+        (created_at, analysis[0], analysis[1], analysis[2])
+        for (_, status, created_at), analysis in zip(inserted, analyses) if status == 'done'
+    ])
+    bump_data_version(cur, user['id'])
+    conn.commit()
+    user_cache.invalidate(user['id'])
+    return inserted, analyses
+
+
+@app.post("/api/entries/bulk")
+def bulk_import_entries():
+    """Imports historical entries from an NDJSON or CSV body.
+
+    The body is read line by line and processed in batches of
+    BULK_IMPORT_BATCH_SIZE, so uploads of any size use bounded memory.
+    Each row needs ``content`` and may carry its original ``created_at``.
+    """
+    user = get_user_from_request()
+    if not user:
+        return jsonify({"error": "Authentication required"}), 401
+
+    fmt = request.args.get("format")
+    if not fmt:
+        if request.mimetype == "text/csv":
+            fmt = "csv"
+        elif request.mimetype in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+            fmt = "ndjson"
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson"}), 415
+
+    plan = SUBSCRIPTION_PLANS.get(user['subscription_tier'], SUBSCRIPTION_PLANS['free'])
+    entries_this_month = get_user_entries_this_month(user['id'])
     if entries_this_month >= plan['max_entries']:
         return jsonify({
             "error": "Monthly entry limit exceeded",
@@ -460,30 +3182,150 @@ def create_entry():
             "current": entries_this_month
         }), 429
 
-    label, score_pct, dist = analyze_emotion(content)
-    conn = connect_db()
+    results = []
+    batch = []
     try:
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("""
-            INSERT INTO entries (user_id, content, emotion_label, emotion_score, emotions_json)
-            VALUES (%s, %s, %s, %s, %s)
-            RETURNING id
-        """, (user['id'], content, label, score_pct, json.dumps(dist)))
+        for row_number, record, error in iter_bulk_rows(request.stream, fmt):
+            if error is None:
+                try:
+                    content, created_at = parse_bulk_record(record)
+                except ValueError as err:
+                    error = str(err)
+            if error is not None:
+                results.append({"row": row_number, "status": "error", "error": error})
+                continue
+            batch.append((row_number, content, created_at))
+            if len(batch) >= BULK_IMPORT_BATCH_SIZE:
+                import_entry_batch(user, plan, batch, results)
+                batch = []
+        if batch:
+            import_entry_batch(user, plan, batch, results)
+    except (UnicodeDecodeError, csv.Error) as err:
+        results.append({"row": None, "status": "error", "error": f"Could not read upload: {err}"})
+
+    results.sort(key=lambda r: r["row"] or 0)
+    summary = collections.Counter(r["status"] for r in results)
+    return jsonify({
+        "imported": summary["created"] + summary["pending_analysis"],
+        "pending_analysis": summary["pending_analysis"],
+        "quota_exceeded": summary["quota_exceeded"],
+        "errors": summary["error"],
+        "results": results
+    })
 
-        entry_row = cur.fetchone()
-        entry_id = entry_row['id'] if isinstance(entry_row, dict) and 'id' in entry_row else (entry_row[0] if entry_row else None)
-        conn.commit()
 
-        increment_user_entries(user['id'])
+EXPORT_COLUMNS = ["id", "created_at", "content", "emotion_label", "emotion_score", "analysis_status"]
 
-        cur.execute("""
-            SELECT id, content, emotion_label, emotion_score, emotions_json, created_at
-            FROM entries WHERE id=%s
-        """, (entry_id,))
-        row = cur.fetchone()
-        return jsonify(row_to_entry(row)), 201
-    finally:
-        conn.close()
+
+def export_record(row):
+    """Flattens an exported row into EXPORT_COLUMNS plus one score column per known label."""
+    entry_id, created_at, content, label, score, status, scores = row
+    record = {
+        "id": entry_id,
+        "created_at": created_at.isoformat(),
+        "content": content,
+        "emotion_label": label,
+        "emotion_score": float(score) if score is not None else None,
+        "analysis_status": status,
+    }
+    record.update(zip(EMOTION_LABELS, pad_scores(scores)))
+    return record
+
+
+def iter_export(user_id, history_days, fmt, start_date=None, end_date=None):
+    """Yields the user's entries, oldest first, as CSV or NDJSON text chunks.
+
+    Rows come from a server-side cursor EXPORT_FETCH_SIZE at a time, so
+    memory use does not depend on the size of the journal. The generator
+    checks out its own pooled connection because it runs after the request
+    that created it has finished and returned its connection.
+    """
+    filters, params = entry_filters(user_id, history_days, start_date, end_date)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS + list(EMOTION_LABELS))
+    if fmt == "csv":
+        writer.writeheader()
+
+    with get_pool().connection() as conn:
+        cur = conn.cursor(name="entries_export")
+        cur.itersize = EXPORT_FETCH_SIZE
+        try:
+            cur.execute(f"""
+                SELECT id, created_at, content, emotion_label, emotion_score, analysis_status, emotion_scores
+                FROM entries
+                WHERE {' AND '.join(filters)}
+                ORDER BY created_at, id
+            """, params)
+            for count, row in enumerate(cur, start=1):
+                record = export_record(row)
+                if fmt == "csv":
+                    writer.writerow(record)
+                else:
+                    buffer.write(json.dumps(record, ensure_ascii=False) + "\n")
+                if count % EXPORT_FETCH_SIZE == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+        finally:
+            cur.close()
+    yield buffer.getvalue()
+
+
+@app.get("/api/entries/export")
+def export_entries():
+    user = get_user_from_request()
+    if not user:
+        return jsonify({"error": "Authentication required"}), 401
+
+    fmt = request.args.get("format", "csv").lower()
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    plan = SUBSCRIPTION_PLANS.get(user['subscription_tier'], SUBSCRIPTION_PLANS['free'])
+    if fmt not in plan['export_formats']:
+        return jsonify({
+            "error": f"{fmt.upper()} export is not included in the {plan['name']} plan",
+            "export_formats": plan['export_formats']
+        }), 403
+
+    # Validated here because errors inside the stream can no longer change the response status
+    start_date, end_date = request.args.get("start_date"), request.args.get("end_date")
+    try:
+        for value in (start_date, end_date):
+            if value:
+                datetime.fromisoformat(value)
+    except ValueError:
+        return jsonify({"error": "start_date and end_date must be ISO 8601 dates"}), 400
+
+    filename = f"mood-journal-{date.today().isoformat()}.{fmt}"
+    return Response(
+        iter_export(user['id'], plan['history_days'], fmt, start_date, end_date),
+        mimetype="text/csv" if fmt == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@app.get("/api/entries/<int:entry_id>")
+def get_entry(entry_id):
+    """Single entry lookup; clients poll this for the analysis_status of a 202'd entry."""
+    user = get_user_from_request()
+    if not user:
+        return jsonify({"error": "Authentication required"}), 401
+
+    conn = get_db()
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur.execute("""
+        SELECT id, content, emotion_label, emotion_score, emotion_scores, analysis_status, analysis_error, created_at
+        FROM entries WHERE id = %s AND user_id = %s
+    """, (entry_id, user['id']))
+    row = cur.fetchone()
+    if not row:
+        return jsonify({"error": "Entry not found"}), 404
+
+    entry = row_to_entry(row)
+    if row['analysis_status'] == 'failed':
+        entry['analysis_error'] = row['analysis_error']
+    return jsonify(entry)
 
 
 @app.post("/api/subscription/upgrade")
@@ -498,159 +3340,122 @@ def upgrade_subscription():
     if not plan_tier or plan_tier not in SUBSCRIPTION_PLANS:
         return jsonify({"error": "Invalid plan specified"}), 400
 
-    conn = connect_db()
-    try:
-        cur = conn.cursor()
-        # Use CURRENT_DATE for PostgreSQL
-        cur.execute("""
-            UPDATE users
-            SET subscription_tier = %s, subscription_start = CURRENT_DATE
-            WHERE id = %s
-        """, (plan_tier, user['id']))
+    conn = get_db()
+    cur = conn.cursor()
+    # Use CURRENT_DATE for PostgreSQL
+    cur.execute("""
+        UPDATE users
+        SET subscription_tier = %s, subscription_start = CURRENT_DATE
+        WHERE id = %s
+    """, (plan_tier, user['id']))
+
+    cur.execute("""
+        INSERT INTO payments (user_id, amount, plan, status)
+        VALUES (%s, %s, %s, %s)
+    """, (user['id'], SUBSCRIPTION_PLANS[plan_tier]['monthly_price'], plan_tier, 'completed'))
+    conn.commit()
+    user_cache.invalidate(user['id'])
 
-        cur.execute("""
-            INSERT INTO payments (user_id, amount, plan, status)
-            VALUES (%s, %s, %s, %s)
-        """, (user['id'], SUBSCRIPTION_PLANS[plan_tier]['monthly_price'], plan_tier, 'completed'))
-        conn.commit()
-
-        return jsonify({
-            "message": f"Subscription upgraded to {plan_tier}",
-            "plan": SUBSCRIPTION_PLANS[plan_tier]
-        })
-    finally:
-        conn.close()
+    return jsonify({
+        "message": f"Subscription upgraded to {plan_tier}",
+        "plan": SUBSCRIPTION_PLANS[plan_tier]
+    })
 
 
 @app.get("/api/stats")
 def get_stats():
-    user = get_user_from_request()
+    user = get_user_from_request(fresh=True)
     if not user:
         return jsonify({"error": "Authentication required"}), 401
 
-    conn = connect_db()
+    plan = SUBSCRIPTION_PLANS.get(user['subscription_tier'], SUBSCRIPTION_PLANS['free'])
+    try:
+        days = stats_window_days(request.args.get("days"), plan['history_days'])
+    except ValueError:
+        return jsonify({"error": "Invalid days param"}), 400
     try:
-        # Use RealDictCursor to ensure all results are dictionaries
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        threshold = stats_threshold(request.args.get("threshold"))
+    except ValueError:
+        return jsonify({"error": "Invalid threshold param"}), 400
 
-        # Total Entries
-        cur.execute("SELECT COUNT(*) as total_entries FROM entries WHERE user_id = %s", (user['id'],))
-        total_entries_row = cur.fetchone()
-        total_entries = total_entries_row['total_entries'] if total_entries_row else 0
+    # Reads only the daily rollups, so the cost depends on the window, not on the number of entries
+    return conditional_json(user, lambda: compute_stats(
+        get_db().cursor(cursor_factory=RealDictCursor), user['id'], days, threshold, user['today']))
 
-        # Monthly Entries
-        cur.execute("""
-            SELECT COUNT(*) as monthly_entries FROM entries
-            WHERE user_id = %s AND EXTRACT(MONTH FROM created_at) = EXTRACT(MONTH FROM CURRENT_DATE)
-            AND EXTRACT(YEAR FROM created_at) = EXTRACT(YEAR FROM CURRENT_DATE)
-        """, (user['id'],))
-        monthly_entries_row = cur.fetchone()
-        monthly_entries = monthly_entries_row['monthly_entries'] if monthly_entries_row else 0
-
-        # Most Common Emotion
-        cur.execute("""
-            SELECT emotion_label, COUNT(*) as count
-            FROM entries
-            WHERE user_id = %s
-            GROUP BY emotion_label
-            ORDER BY count DESC
-            LIMIT 1
-        """, (user['id'],))
-        most_common = cur.fetchone()
-
-        top_emotion = f"{most_common['emotion_label']} {EMOTION_EMOJIS.get(most_common['emotion_label'], '❓')}" if most_common else "None"
-
-        # Average Score
-        cur.execute("SELECT AVG(emotion_score) as avg_score FROM entries WHERE user_id = %s", (user['id'],))
-        avg_score_row = cur.fetchone()
-        avg_score = avg_score_row['avg_score'] if avg_score_row and avg_score_row['avg_score'] is not None else 0
-
-        # Emotion Distribution Data
-        cur.execute("""
-            SELECT emotion_label, COUNT(*) as count FROM entries
-            WHERE user_id = %s
-            GROUP BY emotion_label
-        """, (user['id'],))
-        emotion_counts = cur.fetchall()
-
-        emotion_distribution_data = [
-            {"label": row['emotion_label'], "count": row['count'], "emoji": EMOTION_EMOJIS.get(row['emotion_label'], '❓')}
-            for row in emotion_counts
-        ]
 
-        # Mood Trend Data (last 30 days)
-        trend_data = defaultdict(lambda: {'count': 0, 'total_score': 0})
-        end_date = datetime.utcnow().date()
-        start_date = end_date - timedelta(days=30)
+@app.get("/api/dashboard/bootstrap")
+def dashboard_bootstrap():
+    """Everything the dashboard shows on load, with one authentication and one connection.
 
-        cur.execute("""
-            SELECT created_at, emotion_score FROM entries
-            WHERE user_id = %s AND created_at BETWEEN %s AND %s
-            ORDER BY created_at
-        """, (user['id'], start_date, end_date))
-        daily_scores = cur.fetchall()
-
-        for row in daily_scores:
-            timestamp, score = row['created_at'], row['emotion_score']
-            date_str = timestamp.strftime('%Y-%m-%d')
-            trend_data[date_str]['count'] += 1
-            trend_data[date_str]['total_score'] += float(score)
-
-        mood_trend_data = []
-        for i in range(31):
-            day = start_date + timedelta(days=i)
-            day_str = day.strftime('%Y-%m-%d')
-            entry = trend_data.get(day_str)
-            avg_score_for_day = round(entry['total_score'] / entry['count'], 2) if entry and entry['count'] > 0 else 0
-            mood_trend_data.append({'date': day_str, 'average_score': avg_score_for_day})
-
-        # New: Weekly Mood Pattern
-        weekly_mood = collections.OrderedDict({
-            'Monday': {'total_score': 0, 'count': 0}, 'Tuesday': {'total_score': 0, 'count': 0},
-            'Wednesday': {'total_score': 0, 'count': 0}, 'Thursday': {'total_score': 0, 'count': 0},
-            'Friday': {'total_score': 0, 'count': 0}, 'Saturday': {'total_score': 0, 'count': 0},
-            'Sunday': {'total_score': 0, 'count': 0}
-        })
+    Returns the bodies of GET /api/profile, GET /api/stats and GET
+    /api/entries under "profile", "stats" and "entries". It takes the
+    query args of /api/entries and /api/stats' ``days``.
+    """
+    user = get_user_from_request(fresh=True)
+    if not user:
+        return jsonify({"error": "Authentication required"}), 401
 
-        cur.execute("SELECT created_at, emotion_score FROM entries WHERE user_id = %s", (user['id'],))
-        weekly_data = cur.fetchall()
-        for row in weekly_data:
-            timestamp, score = row['created_at'], row['emotion_score']
-            day_name = timestamp.strftime('%A')
-            weekly_mood[day_name]['total_score'] += float(score)
-            weekly_mood[day_name]['count'] += 1
-
-        weekly_pattern = [{'day': day, 'average_score': round(data['total_score'] / data['count'], 2) if data['count'] > 0 else 0} for day, data in weekly_mood.items()]
-
-        # New: Emotion Correlation
-        cur.execute("SELECT emotions_json FROM entries WHERE user_id = %s", (user['id'],))
-        all_emotions_json = [row['emotions_json'] for row in cur.fetchall() if row['emotions_json']]
-
-        emotion_pairs = defaultdict(int)
-        for emotions in all_emotions_json:
-            # emotions_json is already a dictionary/list thanks to JSONB and psycopg2
-            labels = sorted([e['label'] for e in emotions])
-            for i in range(len(labels)):
-                for j in range(i + 1, len(labels)):
-                    pair = tuple(sorted((labels[i], labels[j])))
-                    emotion_pairs[pair] += 1
-
-        emotion_correlation_data = [
-            {'pair': f'{p[0]} & {p[1]}', 'count': c} for p, c in emotion_pairs.items()
-        ]
+    plan = SUBSCRIPTION_PLANS.get(user['subscription_tier'], SUBSCRIPTION_PLANS['free'])
+    try:
+        params = parse_list_params(request.args)
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+    try:
+        days = stats_window_days(request.args.get("days"), plan['history_days'])
+    except ValueError:
+        return jsonify({"error": "Invalid days param"}), 400
+
+    def build():
+        cur = get_db().cursor(cursor_factory=RealDictCursor)
+        return {
+            "profile": profile_payload(user, get_user_entries_this_month(user['id'])),
+            "stats": compute_stats(cur, user['id'], days, today=user['today']),
+            "entries": entry_list_result(cur, user['id'], plan['history_days'], params),
+        }
+
+    return conditional_json(user, build)
+
+
+@metrics.collector
+def component_gauges():
+    """The numeric counters from /api/health, e.g. moodjournal_db_pool_in_use."""
+    components = {
+        "db_pool": get_pool().stats(),
+        "emotion_cache": emotion_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "inference_client": inference_client.stats(),
+        "inference_batcher": inference_batcher.stats(),
+    }
+    for component, stats in components.items():
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield f"{component}_{key}", f"{key} from the {component} section of /api/health.", value
+    breaker = inference_client.stats()["state"]
+    yield "inference_client_breaker_open", "1 while the inference circuit breaker rejects calls.", int(breaker == "open")
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus scrape target. Counters are per process, like /api/health."""
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return jsonify({"error": "Authentication required"}), 401
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
-        return jsonify({
-            "total_entries": total_entries,
-            "monthly_entries": monthly_entries,
-            "top_emotion": top_emotion,
-            "avg_score": float(avg_score) if avg_score else 0,
-            "emotion_distribution": emotion_distribution_data,
-            "mood_trend": mood_trend_data,
-            "weekly_mood_pattern": weekly_pattern,
-            "emotion_correlation": emotion_correlation_data
-        })
-    finally:
-        conn.close()
+
+@app.get("/api/health")
+def health():
+    return jsonify({
+        "status": "ok",
+        "db_pool": get_pool().stats(),
+        "emotion_cache": emotion_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "inference_client": inference_client.stats(),
+        "inference_batches": inference_batcher.stats()
+    })
 
 
 if __name__ == "__main__":
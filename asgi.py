@@ -0,0 +1,594 @@
+"""ASGI entry point: serves the API from one event loop per process.
+
+    pip install -r requirements-asgi.txt
+    uvicorn asgi:app --workers 1 --port 8000
+
+Listing, searching and creating entries, the profile, stats, the
+dashboard bootstrap and health run as coroutines on an async psycopg
+pool and an httpx client, so a request waiting for PostgreSQL or the
+inference backend holds no thread, and a POST /api/entries holds no
+database connection while its text is scored.
+The remaining routes (registration and login, bulk import, export, single
+entries, upgrades, pages and /metrics) are the Flask app itself, mounted
+through a2wsgi and run on WSGI_THREADS threads. Both halves share the
+caches, the background analysis workers and the metrics of app.py.
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+import psycopg
+from a2wsgi import WSGIMiddleware
+from psycopg import AsyncClientCursor
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from werkzeug.http import parse_etags
+
+import app as core
+
+ASYNC_DB_POOL_MIN = int(os.getenv("ASYNC_DB_POOL_MIN", "1"))
+ASYNC_DB_POOL_MAX = int(os.getenv("ASYNC_DB_POOL_MAX", "20"))
+# Threads serving the mounted Flask routes
+WSGI_THREADS = int(os.getenv("WSGI_THREADS", "8"))
+
+logger = core.app.logger
+
+# Client-side binding sends the shared SQL with its values inlined, as
+# psycopg2 does for the Flask half: both halves run the same statement text,
+# and values are typed by the statement they appear in rather than by the
+# Python types psycopg would send as server-side parameters. psycopg would
+# return bytes for text columns of an SQL_ASCII database unless the client
+# encoding is set.
+db_pool = AsyncConnectionPool(
+    core.DATABASE_URL or "", min_size=ASYNC_DB_POOL_MIN, max_size=ASYNC_DB_POOL_MAX,
+    timeout=core.DB_POOL_TIMEOUT, max_idle=core.DB_POOL_HEALTHCHECK_SECONDS * 10,
+    kwargs={"row_factory": dict_row, "cursor_factory": AsyncClientCursor, "client_encoding": "utf8"},
+    check=AsyncConnectionPool.check_connection, open=False,
+)
+
+
+async def execute(conn, query, params=None):
+    """Runs one statement, timed into query_latency like the Flask app's cursors."""
+    started = time.perf_counter()
+    try:
+        return await conn.execute(query, params)
+    finally:
+        core.record_query(query, time.perf_counter() - started)
+
+
+async def fetchone(conn, query, params=None):
+    return await (await execute(conn, query, params)).fetchone()
+
+
+async def fetchall(conn, query, params=None):
+    return await (await execute(conn, query, params)).fetchall()
+
+
+async def apply_entry_rollups(conn, user_id, entries):
+    """apply_entry_rollups for an async connection: one multi-row upsert per table."""
+    for sql, rows in core.entry_rollup_rows(user_id, entries):
+        placeholders = "(" + ", ".join(["%s"] * len(rows[0])) + ")"
+        sql = sql.replace("VALUES %s", "VALUES " + ", ".join([placeholders] * len(rows)), 1)
+        await execute(conn, sql, [value for row in rows for value in row])
+
+
+def json_response(payload, status=200, headers=None):
+    """Encodes ``payload`` exactly as the Flask app's jsonify does."""
+    return Response(core.app.json.dumps(payload) + "\n", status, headers, media_type="application/json")
+
+
+async def authenticate(conn, request):
+    """The caller's fresh users row, or None; get_user_from_request(fresh=True) for coroutines."""
+    auth_header = request.headers.get("Authorization", "")
+    if not auth_header.startswith("Bearer "):
+        return None
+    payload = core.verify_jwt_token(auth_header[7:])
+    if not payload:
+        return None
+    user_id = payload['user_id']
+    _, generation = core.user_cache.lookup(user_id, fresh=True)
+    user = await fetchone(conn, core.CURRENT_USER_SQL, (user_id,))
+    core.user_cache.store(user_id, user, generation)
+    return user
+
+
+async def conditional_json(request, user, build):
+    """conditional_json for coroutines; ``build`` is awaited only when both caches miss.
+
+    The cache key matches the Flask one, so both halves reuse each other's bodies.
+    """
+    etag = core.user_etag(user)
+    headers = {"ETag": f'W/"{etag}"', "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if parse_etags(request.headers.get("If-None-Match")).contains_weak(etag):
+        return Response(status_code=304, headers=headers)
+    key = (request.url.path, user['id'], request.scope["query_string"])
+    body = core.response_cache.get(key, etag)
+    if body is None:
+        body = (core.app.json.dumps(await build()) + "\n").encode("utf-8")
+        core.response_cache.put(key, etag, body)
+    return Response(body, headers=headers, media_type="application/json")
+
+
+class AsyncInferenceClient(core.InferenceClient):
+    """InferenceClient on an httpx.AsyncClient, with the same timeouts, retries and breaker.
+
+    open() must run on the event loop before the first post(), aclose() on shutdown.
+    """
+
+    RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+    def open(self):
+        connect_timeout, read_timeout = self.timeout
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+        )
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def post(self, payload):
+        trial = self._admit()
+        started = time.perf_counter()
+        try:
+            data = await self._post_with_retries(payload)
+        except httpx.HTTPStatusError as err:
+            core.inference_latency.observe(time.perf_counter() - started, "http_error")
+            status = err.response.status_code
+            self._record(status < 500 and status not in self.RETRY_STATUSES, trial)
+            raise
+        except Exception:
+            core.inference_latency.observe(time.perf_counter() - started, "error")
+            self._record(False, trial)
+            raise
+        core.inference_latency.observe(time.perf_counter() - started, "ok")
+        self._record(True, trial)
+        return data
+
+    async def _post_with_retries(self, payload):
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                r = await self._client.post(self.url, headers=self.headers, json=payload)
+            except self.RETRY_ERRORS:
+                # A ReadTimeout is neither and propagates, as in the sync client
+                if last:
+                    raise
+                await self._sleep(self.backoff(attempt))
+                continue
+            if r.status_code in self.RETRY_STATUSES and not last:
+                await self._sleep(self.backoff(attempt, self.suggested_wait(r)))
+                continue
+            r.raise_for_status()
+            return r.json()
+
+    async def _sleep(self, seconds):
+        with self._lock:
+            self.retried += 1
+        await asyncio.sleep(seconds)
+
+
+class AsyncInferenceBatcher(core.InferenceBatcher):
+    """InferenceBatcher for the event loop: a dispatcher task instead of a thread.
+
+    Batches are collected the same way and posted as tasks, at most
+    ``concurrency`` at a time. The dispatcher waits for a free slot before
+    it starts a batch, so texts arriving while every slot is busy are sent
+    together rather than queued as many small batches. start() must run on
+    the event loop.
+    """
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._tasks = set()
+        self._dispatcher = asyncio.create_task(self._run(self._queue))
+
+    async def stop(self):
+        self._dispatcher.cancel()
+        await asyncio.gather(self._dispatcher, *self._tasks, return_exceptions=True)
+
+    async def analyze(self, text):
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((text, future))
+        return await future
+
+    async def _run(self, pending):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            batch = [await pending.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(pending.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            task = asyncio.create_task(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch):
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        core.inference_batch_size.observe(len(texts))
+        with self._lock:
+            self.batches += 1
+            self.texts += len(texts)
+        try:
+            results = dict(zip(texts, await self._post_batch(texts)))
+        except Exception as err:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(err)
+            return
+        finally:
+            self._slots.release()
+        for text, future in batch:
+            if not future.done():
+                future.set_result(results[text])
+
+
+inference_client = AsyncInferenceClient(
+    core.EMOTION_API_URL, core.HF_HEADERS, core.EMOTION_CONNECT_TIMEOUT, core.EMOTION_TIMEOUT,
+    core.EMOTION_RETRIES, core.EMOTION_RETRY_BASE_SECONDS, core.EMOTION_RETRY_MAX_SECONDS,
+    core.EMOTION_BREAKER_THRESHOLD, core.EMOTION_BREAKER_COOLDOWN, core.EMOTION_BATCH_CONCURRENCY
+)
+
+
+async def request_emotion_batch(texts):
+    return core.decode_emotion_batch(texts, await inference_client.post({"inputs": texts}))
+
+
+inference_batcher = AsyncInferenceBatcher(
+    request_emotion_batch, core.EMOTION_BATCH_SIZE, core.EMOTION_BATCH_WINDOW_MS / 1000,
+    core.EMOTION_BATCH_CONCURRENCY
+)
+
+
+async def analyze_emotion(text):
+    """analyze_emotion for coroutines, through the shared emotion cache."""
+    key = core.emotion_cache_key(text)
+    cached = core.emotion_cache.lookup(key)
+    if cached is None:
+        try:
+            async with db_pool.connection() as conn:
+                rows = await fetchall(conn, core.EMOTION_CACHE_SELECT_SQL, ([key],))
+            cached = core.emotion_cache.decode_rows([tuple(row.values()) for row in rows]).get(key)
+        except psycopg.Error as err:
+            logger.warning("emotion cache read failed: %s", err)
+        cached = core.emotion_cache.loaded(key, cached)
+    if cached is not None:
+        return cached
+
+    result = await inference_batcher.analyze(text)
+    core.emotion_cache.remember(key, result)
+    label, score, scores = result
+    try:
+        async with db_pool.connection() as conn:
+            await execute(conn, core.EMOTION_CACHE_INSERT_SQL, (key, core.EMOTION_MODEL, label, score, scores))
+    except psycopg.Error as err:
+        logger.warning("emotion cache write failed: %s", err)
+    return result
+
+
+async def entries_this_month(conn, user, last_reset):
+    """get_user_entries_this_month for a fresh row: starts the new month's count if one began."""
+    today = user['today']
+    if last_reset is None or (last_reset.year, last_reset.month) == (today.year, today.month):
+        return user['entries_this_month']
+    await execute(conn, "UPDATE users SET entries_this_month = 0, last_reset_date = %s WHERE id = %s",
+                  (today, user['id']))
+    await conn.commit()
+    core.user_cache.invalidate(user['id'])
+    return 0
+
+
+routes = []
+
+
+def route(path, methods=("GET",)):
+    """Registers a coroutine endpoint and times it into request_latency under ``path``."""
+    def register(handler):
+        async def endpoint(request):
+            started = time.perf_counter()
+            try:
+                response = await handler(request)
+            except PoolTimeout:
+                response = json_response({"error": "Database is busy, please retry"}, 503)
+            elapsed = time.perf_counter() - started
+            core.request_latency.observe(elapsed, request.method, path, response.status_code)
+            if core.SLOW_REQUEST_MS and elapsed * 1000 >= core.SLOW_REQUEST_MS:
+                logger.warning("slow request: %s %s %s took %.1f ms", request.method, path,
+                               response.status_code, elapsed * 1000)
+            return response
+
+        routes.append(Route(path, endpoint, methods=list(methods)))
+        return handler
+    return register
+
+
+@route("/api/profile")
+async def get_profile(request):
+    async with db_pool.connection() as conn:
+        user = await authenticate(conn, request)
+        if not user:
+            return json_response({"error": "Authentication required"}, 401)
+        last_reset = user.pop('last_reset_date')
+
+        async def build():
+            return core.profile_payload(user, await entries_this_month(conn, user, last_reset))
+
+        return await conditional_json(request, user, build)
+
+
+@route("/api/entries")
+async def list_entries(request):
+    async with db_pool.connection() as conn:
+        user = await authenticate(conn, request)
+        if not user:
+            return json_response({"error": "Authentication required"}, 401)
+
+        try:
+            params = core.parse_list_params(request.query_params)
+        except ValueError as err:
+            return json_response({"error": str(err)}, 400)
+
+        plan = core.SUBSCRIPTION_PLANS.get(user['subscription_tier'], core.SUBSCRIPTION_PLANS['free'])
+        history_days = plan['history_days']
+        start_date, end_date = params['start_date'], params['end_date']
+
+        async def build():
+            rows = await fetchall(conn, *core.entries_page_query(
+                user['id'], history_days, params['limit'], start_date, end_date, params['offset'], params['cursor']
+            ))
+            page = core.split_entry_page(rows, params['limit'], params['offset'], params['cursor'])
+
+            total = None
+            if params['total_mode'] != "none":
+                row = await fetchone(conn, *core.entry_count_query(
+                    user['id'], history_days, start_date, end_date, approximate=params['total_mode'] == "approx"
+                ))
+                total = int(row['count'])
+            return core.entry_list_payload(params, *page, total)
+
+        return await conditional_json(request, user, build)
+
+
+@route("/api/entries/search")
+async def search_entries(request):
+    async with db_pool.connection() as conn:
+        user = await authenticate(conn, request)
+        if not user:
+            return json_response({"error": "Authentication required"}, 401)
+
+        try:
+            params = core.parse_search_params(request.query_params)
+        except ValueError as err:
+            return json_response({"error": str(err)}, 400)
+
+        plan = core.SUBSCRIPTION_PLANS.get(user['subscription_tier'], core.SUBSCRIPTION_PLANS['free'])
+
+        async def build():
+            rows = await fetchall(conn, *core.entry_search_query(
+                user['id'], plan['history_days'], params['q'], params['limit'], params['emotion'],
+                params['min_score'], params['max_score'], params['cursor']
+            ))
+            return core.search_payload(params, rows)
+
+        return await conditional_json(request, user, build)
+
+
+@route("/api/entries", methods=("POST",))
+async def create_entry(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    content = (data.get("content") or "").strip() if isinstance(data, dict) else ""
+
+    async with db_pool.connection() as conn:
+        user = await authenticate(conn, request)
+        if not user:
+            return json_response({"error": "Authentication required"}, 401)
+        if not content:
+            return json_response({"error": "content is required"}, 400)
+
+        plan = core.SUBSCRIPTION_PLANS.get(user['subscription_tier'], core.SUBSCRIPTION_PLANS['free'])
+        # Counted up front so concurrent posts can never overshoot the limit
+        quota = await fetchone(conn, core.RESERVE_QUOTA_SQL, {
+            "user_id": user['id'], "max_entries": plan['max_entries'], "count": 1, "partial": False
+        })
+        await conn.commit()
+    core.user_cache.invalidate(user['id'])
+    reserved = quota['reserved'] if quota else 0
+    if not reserved:
+        return json_response({
+            "error": "Monthly entry limit exceeded",
+            "limit": plan['max_entries'],
+            "current": quota['used'] if quota else 0
+        }, 429)
+
+    # No connection is held while the text is scored
+    analysis = None
+    deferred = {"label": None, "error": None, "delay": 0}
+    if not core.wants_async_analysis(request.headers.get("Prefer"), request.query_params.get("async")):
+        try:
+            analysis = await analyze_emotion(content)
+        except Exception as err:
+            # Keep the entry with a placeholder label; the background workers re-analyze it
+            logger.warning("emotion analysis failed, deferring entry: %s", err)
+            deferred = {
+                "label": core.PLACEHOLDER_EMOTION,
+                "error": str(err),
+                "delay": getattr(err, "retry_after", core.ANALYSIS_RETRY_BASE_SECONDS),
+            }
+
+    try:
+        async with db_pool.connection() as conn:
+            if analysis is None:
+                row = await fetchone(conn, core.INSERT_PENDING_ENTRY_SQL, (
+                    user['id'], content, deferred['label'], deferred['error'], deferred['delay']))
+            else:
+                label, score_pct, scores = analysis
+                row = await fetchone(conn, core.INSERT_ENTRY_SQL, (
+                    user['id'], content, label, score_pct, scores, core.EMOTION_MODEL))
+                await apply_entry_rollups(conn, user['id'], [(row['created_at'], label, score_pct, scores)])
+            await execute(conn, core.BUMP_DATA_VERSION_SQL, (user['id'],))
+        core.user_cache.invalidate(user['id'])
+    except Exception:
+        async with db_pool.connection() as conn:
+            await execute(conn, core.RELEASE_QUOTA_SQL, (reserved, user['id']))
+        core.user_cache.invalidate(user['id'])
+        raise
+
+    if analysis is None:
+        core.analysis_workers.notify()
+        return json_response(core.row_to_entry(row), 202, {"Location": f"/api/entries/{row['id']}"})
+    return json_response(core.row_to_entry(row), 201)
+
+
+@route("/api/stats")
+async def get_stats(request):
+    async with db_pool.connection() as conn:
+        user = await authenticate(conn, request)
+        if not user:
+            return json_response({"error": "Authentication required"}, 401)
+
+        plan = core.SUBSCRIPTION_PLANS.get(user['subscription_tier'], core.SUBSCRIPTION_PLANS['free'])
+        try:
+            days = core.stats_window_days(request.query_params.get("days"), plan['history_days'])
+        except ValueError:
+            return json_response({"error": "Invalid days param"}, 400)
+        try:
+            threshold = core.stats_threshold(request.query_params.get("threshold"))
+        except ValueError:
+            return json_response({"error": "Invalid threshold param"}, 400)
+
+        async def build():
+            params = core.stats_params(user['id'], days, threshold, user['today'])
+            aggregate_rows = await fetchall(conn, core.STATS_AGGREGATE_SQL, params)
+            correlation_rows = await fetchall(conn, core.correlation_query(params), params)
+            return core.build_stats(aggregate_rows, correlation_rows, params, days)
+
+        return await conditional_json(request, user, build)
+
+
+@route("/api/dashboard/bootstrap")
+async def dashboard_bootstrap(request):
+    async with db_pool.connection() as conn:
+        user = await authenticate(conn, request)
+        if not user:
+            return json_response({"error": "Authentication required"}, 401)
+        last_reset = user.pop('last_reset_date')
+
+        plan = core.SUBSCRIPTION_PLANS.get(user['subscription_tier'], core.SUBSCRIPTION_PLANS['free'])
+        history_days = plan['history_days']
+        try:
+            params = core.parse_list_params(request.query_params)
+        except ValueError as err:
+            return json_response({"error": str(err)}, 400)
+        try:
+            days = core.stats_window_days(request.query_params.get("days"), history_days)
+        except ValueError:
+            return json_response({"error": "Invalid days param"}, 400)
+
+        async def build():
+            used = await entries_this_month(conn, user, last_reset)
+            stats_params = core.stats_params(user['id'], days, today=user['today'])
+            start_date, end_date = params['start_date'], params['end_date']
+            # The reads don't depend on each other, so they go out in one pipeline:
+            # one round trip to PostgreSQL instead of one per query
+            started = time.perf_counter()
+            async with conn.pipeline():
+                listed = await conn.execute(*core.entries_page_query(
+                    user['id'], history_days, params['limit'], start_date, end_date, params['offset'], params['cursor']
+                ))
+                count = None
+                if params['total_mode'] != "none":
+                    count = await conn.execute(*core.entry_count_query(
+                        user['id'], history_days, start_date, end_date, approximate=params['total_mode'] == "approx"
+                    ))
+                aggregate = await conn.execute(core.STATS_AGGREGATE_SQL, stats_params)
+                correlation = await conn.execute(core.correlation_query(stats_params), stats_params)
+                rows = await listed.fetchall()
+                total = int((await count.fetchone())['count']) if count else None
+                aggregate_rows = await aggregate.fetchall()
+                correlation_rows = await correlation.fetchall()
+            core.record_query("-- name: dashboard_bootstrap", time.perf_counter() - started)
+
+            page = core.split_entry_page(rows, params['limit'], params['offset'], params['cursor'])
+            return {
+                "profile": core.profile_payload(user, used),
+                "stats": core.build_stats(aggregate_rows, correlation_rows, stats_params, days),
+                "entries": core.entry_list_payload(params, *page, total),
+            }
+
+        return await conditional_json(request, user, build)
+
+
+def component_stats():
+    return {
+        "async_db_pool": db_pool.get_stats(),
+        "async_inference_client": inference_client.stats(),
+        "async_inference_batches": inference_batcher.stats(),
+    }
+
+
+@route("/api/health")
+async def health(request):
+    # db_pool, inference_client and inference_batches are the Flask half's, used by the mounted routes and workers
+    return json_response({
+        "status": "ok",
+        "db_pool": core.get_pool().stats(),
+        "emotion_cache": core.emotion_cache.stats(),
+        "user_cache": core.user_cache.stats(),
+        "response_cache": core.response_cache.stats(),
+        "password_hasher": core.password_hasher.stats(),
+        "inference_client": core.inference_client.stats(),
+        "inference_batches": core.inference_batcher.stats(),
+        **component_stats(),
+    })
+
+
+@core.metrics.collector
+def async_component_gauges():
+    """The numeric counters of the async pool, client and batcher, e.g. moodjournal_async_db_pool_pool_size."""
+    for component, stats in component_stats().items():
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield f"{component}_{key}", f"{key} from the {component} section of /api/health.", value
+
+
+@asynccontextmanager
+async def lifespan(_):
+    if not core.DATABASE_URL:
+        raise Exception("DATABASE_URL environment variable is not set")
+    await db_pool.open()
+    inference_client.open()
+    inference_batcher.start()
+    if core.ENTRY_ANALYSIS_MODE == "async":
+        core.analysis_workers.ensure_started()
+    core.entry_maintenance.ensure_started()
+    try:
+        yield
+    finally:
+        await inference_batcher.stop()
+        await inference_client.aclose()
+        await db_pool.close()
+
+
+app = Starlette(
+    routes=routes + [Mount("/", app=WSGIMiddleware(core.app, workers=WSGI_THREADS))],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    lifespan=lifespan,
+)
@@ -0,0 +1,144 @@
+"""Local stand-in for the Hugging Face emotion inference endpoint.
+
+Accepts the same ``{"inputs": ...}`` payload (a string or a list of
+strings) on any path and answers with a deterministic distribution over
+the EMOTION_EMOJIS labels for each input, after an optional delay. Point
+the app at it with EMOTION_API_URL=http://127.0.0.1:8765/.
+
+    python bench/fake_inference.py --port 8765 --latency-ms 200
+
+GET /stats returns how many requests and texts were served, which shows
+how well concurrent calls were batched.
+
+Faults can be injected to exercise the app's retries and circuit breaker:
+the first --loading requests get the 503 "model is loading" answer Hugging
+Face sends while a model starts, --error-rate of requests fail with a 500
+and --hang-rate of them stall for --hang-ms before answering. POST /faults
+with a JSON object of the same settings (e.g. {"error_rate": 1.0}) changes
+them while the server runs.
+
+    python bench/fake_inference.py --loading 3 --error-rate 0.1 --hang-rate 0.05
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LABELS = ['joy', 'sadness', 'anger', 'fear', 'disgust', 'surprise', 'neutral']
+
+
+def fake_distribution(text):
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    weights = [b + 1 for b in digest[:len(LABELS)]]
+    total = sum(weights)
+    return sorted(
+        [{"label": label, "score": w / total} for label, w in zip(LABELS, weights)],
+        key=lambda d: d["score"], reverse=True
+    )
+
+
+def new_counters():
+    return {"requests": 0, "texts": 0, "max_batch": 0, "loading": 0, "errors": 0, "hangs": 0}
+
+
+def new_faults(loading=0, estimated_time=1.0, error_rate=0.0, hang_rate=0.0, hang_ms=30000.0):
+    return {"loading": loading, "estimated_time": estimated_time, "error_rate": error_rate,
+            "hang_rate": hang_rate, "hang_ms": hang_ms}
+
+
+class FakeInferenceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    counters = new_counters()
+    faults = new_faults()
+    lock = threading.Lock()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.rstrip("/") == "/faults":
+            with self.lock:
+                self.faults.update((k, v) for k, v in body.items() if k in self.faults)
+                return self._send(200, dict(self.faults))
+
+        inputs = body.get("inputs", "")
+        texts = inputs if isinstance(inputs, list) else [inputs]
+        with self.lock:
+            self.counters["requests"] += 1
+            if self.faults["loading"] > 0:
+                self.faults["loading"] -= 1
+                fault = "loading"
+            elif random.random() < self.faults["error_rate"]:
+                fault = "errors"
+            elif random.random() < self.faults["hang_rate"]:
+                fault = "hangs"
+            else:
+                fault = None
+                self.counters["texts"] += len(texts)
+                self.counters["max_batch"] = max(self.counters["max_batch"], len(texts))
+            if fault:
+                self.counters[fault] += 1
+        if fault == "loading":
+            return self._send(503, {"error": "Model is currently loading",
+                                    "estimated_time": self.faults["estimated_time"]})
+        if fault == "errors":
+            return self._send(500, {"error": "Injected failure"})
+        if fault == "hangs":
+            time.sleep(self.faults["hang_ms"] / 1000)
+        if self.latency:
+            time.sleep(self.latency)
+        self._send(200, [fake_distribution(t) for t in texts])
+
+    def do_GET(self):
+        with self.lock:
+            self._send(200, {**self.counters, "faults": dict(self.faults)})
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host="127.0.0.1", port=8765, latency_ms=0.0, **faults):
+    """Starts the fake server in a background thread and returns it.
+
+    Keyword arguments set the initial faults (see new_faults).
+    """
+    handler = type("Handler", (FakeInferenceHandler,), {
+        "latency": latency_ms / 1000,
+        "counters": new_counters(),
+        "faults": new_faults(**faults),
+        "lock": threading.Lock(),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--loading", type=int, default=0, help="answer this many requests with 503 model loading")
+    parser.add_argument("--estimated-time", type=float, default=1.0, help="estimated_time sent with those 503s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 500")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="fraction of requests stalling for --hang-ms")
+    parser.add_argument("--hang-ms", type=float, default=30000.0)
+    args = parser.parse_args()
+    server = serve(args.host, args.port, args.latency_ms, loading=args.loading, estimated_time=args.estimated_time,
+                   error_rate=args.error_rate, hang_rate=args.hang_rate, hang_ms=args.hang_ms)
+    print(f"Fake inference listening on http://{args.host}:{args.port}/")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,342 @@
+"""Load-tests the API against a seeded database and a fake inference backend.
+
+Seeds --users users with --entries-per-user analyzed entries each (their
+old entries are removed first, so every run starts from the same data),
+starts bench/fake_inference.py with --latency-ms and the app pointed at it,
+each in its own process, then lets --concurrency client threads call a
+weighted mix of endpoints for --seconds after a --warmup period:
+
+    python bench/loadtest.py --users 20 --entries-per-user 2000 --concurrency 16 \\
+        --seconds 30 --output results/$(git rev-parse --short HEAD).json
+
+The app runs on a threaded werkzeug server by default; --server-cmd runs
+something else instead, e.g. --server-cmd "gunicorn -k gthread --threads 8
+-b 127.0.0.1:{port} app:app" ({port} is substituted, DATABASE_URL and
+EMOTION_API_URL are passed in the environment).
+
+The result is one JSON document with the run's settings and, per endpoint
+and in total, request counts, status codes, throughput and p50/p95/p99 in
+ms, plus the server's process count and resident memory (summed over
+its process tree, Linux only). Compare two of them with
+
+    python bench/loadtest.py --compare before.json after.json --max-regression 0.1
+
+which prints the change per endpoint and exits non-zero if any p95 grew,
+or throughput fell, by more than --max-regression.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shlex
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+import requests  # noqa: E402
+
+import app  # noqa: E402
+import seed  # noqa: E402
+
+# Relative weights of the endpoints in the default mix
+DEFAULT_MIX = {"login": 5, "list_entries": 35, "create_entry": 15, "profile": 20, "stats": 25}
+
+
+def endpoint_call(name, base_url, user, run_id):
+    """Returns a function that makes one ``name`` request for ``user`` and returns its status code.
+
+    Entry texts include ``run_id`` so a rerun can't be answered from the emotion cache.
+    """
+    headers = {"Authorization": f"Bearer {user['token']}"}
+    if name == "login":
+        return lambda session, rng: session.post(
+            f"{base_url}/api/login", json={"email": user['email'], "password": seed.PASSWORD}).status_code
+    if name == "list_entries":
+        return lambda session, rng: session.get(
+            f"{base_url}/api/entries", params={"limit": 20}, headers=headers).status_code
+    if name == "create_entry":
+        return lambda session, rng: session.post(
+            f"{base_url}/api/entries", headers=headers,
+            json={"content": f"Load test entry {run_id}-{rng.getrandbits(64):x} about work and sleep"}).status_code
+    if name == "profile":
+        return lambda session, rng: session.get(f"{base_url}/api/profile", headers=headers).status_code
+    if name == "stats":
+        return lambda session, rng: session.get(
+            f"{base_url}/api/stats", params={"days": rng.choice([7, 30, 365])}, headers=headers).status_code
+    raise ValueError(f"Unknown endpoint {name}")
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    samples = sorted(samples)
+    pick = lambda q: round(samples[min(len(samples) - 1, int(len(samples) * q))], 2)  # noqa: E731
+    return {"p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99),
+            "mean_ms": round(statistics.mean(samples), 2), "max_ms": round(samples[-1], 2)}
+
+
+def summarize(results, seconds):
+    """Per-endpoint and total statistics from [(endpoint, status, ms)]."""
+    by_endpoint = {}
+    for endpoint, status, ms in results:
+        by_endpoint.setdefault(endpoint, []).append((status, ms))
+    by_endpoint["total"] = [(status, ms) for _, status, ms in results]
+    summary = {}
+    for endpoint, samples in sorted(by_endpoint.items()):
+        statuses = [status for status, _ in samples]
+        ok = [ms for status, ms in samples if status < 400]
+        summary[endpoint] = {
+            "requests": len(samples),
+            "errors": len(samples) - len(ok),
+            "statuses": {str(code): statuses.count(code) for code in sorted(set(statuses))},
+            "throughput_rps": round(len(ok) / seconds, 2),
+            **percentiles(ok),
+        }
+    return summary
+
+
+def drive(base_url, users, mix, concurrency, warmup, seconds, rng_seed):
+    """Runs the client threads; returns [(endpoint, status, ms)] from the measured period."""
+    names, weights = zip(*mix.items())
+    run_id = uuid.uuid4().hex[:8]
+    results, lock = [], threading.Lock()
+    started = time.monotonic()
+    measure_from, deadline = started + warmup, started + warmup + seconds
+
+    def loop(n):
+        rng = random.Random(rng_seed + n)
+        user = users[n % len(users)]
+        calls = {name: endpoint_call(name, base_url, user, run_id) for name in names}
+        session = requests.Session()
+        while True:
+            name = rng.choices(names, weights)[0]
+            begin = time.monotonic()
+            if begin >= deadline:
+                break
+            try:
+                status = calls[name](session, rng)
+            except requests.RequestException:
+                status = 599
+            end = time.monotonic()
+            if begin >= measure_from:
+                with lock:
+                    results.append((name, status, (end - begin) * 1000))
+
+    threads = [threading.Thread(target=loop, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def prepare_users(conn, users, entries_per_user, days):
+    """Reseeds the load-test users from scratch; returns [{id, email, token}]."""
+    emails = [f"loadtest-{n}@example.com" for n in range(users)]
+    cur = conn.cursor()
+    cur.execute("DELETE FROM entries WHERE user_id IN (SELECT id FROM users WHERE email = ANY(%s))", (emails,))
+    user_ids = seed.seed(conn, users, entries_per_user, days, prefix="loadtest")
+    cur.execute("UPDATE users SET entries_this_month = 0 WHERE id = ANY(%s)", (user_ids,))
+    conn.commit()
+    return [{"id": user_id, "email": email, "token": app.create_jwt_token(user_id)}
+            for user_id, email in zip(user_ids, emails)]
+
+
+def wait_for(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"{url} exited with status {process.returncode} before it was ready")
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    sys.exit(f"{url} did not come up within {timeout}s")
+
+
+def process_tree_memory(pid):
+    """Process count and summed resident memory (MB) of ``pid`` and its descendants; None off Linux."""
+    parents = {}
+    try:
+        entries = [entry for entry in os.listdir("/proc") if entry.isdigit()]
+    except OSError:
+        return None
+    for entry in entries:
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name in parentheses may contain spaces; the parent pid is the second field after it
+                parents[int(entry)] = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    tree, frontier = {pid}, [pid]
+    while frontier:
+        parent = frontier.pop()
+        children = [child for child, ppid in parents.items() if ppid == parent]
+        tree.update(children)
+        frontier += children
+    rss_kb = 0
+    for member in tree:
+        try:
+            with open(f"/proc/{member}/status") as f:
+                rss_kb += sum(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+        except OSError:
+            continue
+    return {"processes": len(tree), "rss_mb": round(rss_kb / 1024, 1)}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def serve(port):
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    from werkzeug.serving import run_simple
+    run_simple("127.0.0.1", port, app.app, threaded=True)
+
+
+def run(args):
+    mix = dict(DEFAULT_MIX)
+    for item in args.mix or []:
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            sys.exit(f"Unknown endpoint {name!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight)
+    mix = {name: weight for name, weight in mix.items() if weight > 0}
+
+    app.init_db()
+    conn = app.connect_db()
+    try:
+        users = prepare_users(conn, args.users, args.entries_per_user, args.days)
+    finally:
+        conn.close()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    inference_url = f"http://127.0.0.1:{args.inference_port}/"
+    env = {**os.environ, "EMOTION_API_URL": inference_url}
+    if args.server_cmd:
+        server_cmd = shlex.split(args.server_cmd.format(port=args.port))
+    else:
+        server_cmd = [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(args.port)]
+    processes = []
+    try:
+        processes.append(subprocess.Popen([
+            sys.executable, os.path.join(BENCH_DIR, "fake_inference.py"),
+            "--port", str(args.inference_port), "--latency-ms", str(args.latency_ms)
+        ], stdout=subprocess.DEVNULL))
+        wait_for(inference_url, processes[-1])
+        processes.append(subprocess.Popen(server_cmd, env=env, cwd=os.path.join(BENCH_DIR, "..")))
+        wait_for(f"{base_url}/api/health", processes[-1])
+
+        results = drive(base_url, users, mix, args.concurrency, args.warmup, args.seconds, args.seed)
+        inference = requests.get(inference_url, timeout=5).json()
+        server = process_tree_memory(processes[-1].pid)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait()
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "server": args.server_cmd or "werkzeug (threaded)",
+            "users": args.users,
+            "entries_per_user": args.entries_per_user,
+            "concurrency": args.concurrency,
+            "seconds": args.seconds,
+            "warmup": args.warmup,
+            "latency_ms": args.latency_ms,
+            "mix": mix,
+            "seed": args.seed,
+        },
+        "endpoints": summarize(results, args.seconds),
+        "inference": inference,
+        "server": server,
+    }
+
+
+def compare(before_path, after_path, max_regression):
+    """Prints per-endpoint changes between two result files; returns the regressed endpoints."""
+    with open(before_path) as f:
+        before_run = json.load(f)
+    with open(after_path) as f:
+        after_run = json.load(f)
+    before, after = before_run["endpoints"], after_run["endpoints"]
+    regressions = []
+    print(f"{'endpoint':<14}{'rps':>22}{'p50 ms':>22}{'p95 ms':>22}{'p99 ms':>22}")
+    for endpoint in sorted(set(before) & set(after)):
+        old, new = before[endpoint], after[endpoint]
+        cells = []
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            if key not in old or key not in new:
+                cells.append(f"{'-':>22}")
+                continue
+            change = (new[key] - old[key]) / old[key] if old[key] else 0.0
+            cells.append(f"{old[key]:>9} -> {new[key]:<7}{change:+6.0%}")
+        print(f"{endpoint:<14}" + "".join(cells))
+        if old.get("p95_ms") and new.get("p95_ms", 0) > old["p95_ms"] * (1 + max_regression):
+            regressions.append(endpoint)
+        elif old.get("throughput_rps") and new.get("throughput_rps", 0) < old["throughput_rps"] * (1 - max_regression):
+            regressions.append(endpoint)
+    if before_run.get("server") and after_run.get("server"):
+        old, new = before_run["server"], after_run["server"]
+        print(f"server memory: {old['rss_mb']} MB in {old['processes']} processes -> "
+              f"{new['rss_mb']} MB in {new['processes']} processes")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--entries-per-user", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=365, help="spread seeded entries over this many days")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--latency-ms", type=float, default=50, help="fake inference latency")
+    parser.add_argument("--mix", nargs="+", metavar="ENDPOINT=WEIGHT",
+                        help=f"override endpoint weights (default {' '.join(f'{k}={v}' for k, v in DEFAULT_MIX.items())})")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the request mix")
+    parser.add_argument("--server-cmd", help="command that serves the app on {port}")
+    parser.add_argument("--port", type=int, default=8769)
+    parser.add_argument("--inference-port", type=int, default=8770)
+    parser.add_argument("--output", help="write the JSON result here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files")
+    parser.add_argument("--max-regression", type=float, default=0.1)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args.port)
+    if args.compare:
+        regressions = compare(*args.compare, args.max_regression)
+        if regressions:
+            sys.exit(f"Regressed by more than {args.max_regression:.0%}: {', '.join(regressions)}")
+        return
+
+    result = json.dumps(run(args), indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(result + "\n")
+    else:
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
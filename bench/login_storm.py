@@ -0,0 +1,137 @@
+"""Measures dashboard latency while a burst of logins hashes passwords.
+
+For each scenario the app is started in a subprocess (a threaded werkzeug
+server) with the scenario's BCRYPT_* settings. --dashboard-threads clients
+poll GET /api/stats and GET /api/entries, first alone and then while
+--login-threads clients log in as fast as they can.
+
+    python bench/login_storm.py --seconds 10 --login-threads 16
+
+"inline" hashes in the request threads without a limit, as the app used to;
+"pool" uses the default process pool and admission control. Prints one JSON
+object per scenario and phase with dashboard p50/p95/p99 in ms and login
+outcomes.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import requests  # noqa: E402
+
+import app  # noqa: E402
+import seed  # noqa: E402
+
+SCENARIOS = {
+    "inline": {"BCRYPT_WORKERS": "0", "BCRYPT_MAX_PENDING": "100000"},
+    "pool": {},
+}
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    samples = sorted(samples)
+    pick = lambda q: round(samples[min(len(samples) - 1, int(len(samples) * q))], 1)  # noqa: E731
+    return {"count": len(samples), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99),
+            "mean_ms": round(statistics.mean(samples), 1)}
+
+
+def run_clients(threads, seconds, request):
+    """Calls ``request(session)`` from ``threads`` threads for ``seconds``; returns [(status, ms)]."""
+    results, lock = [], threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def loop():
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            status = request(session)
+            with lock:
+                results.append((status, (time.perf_counter() - started) * 1000))
+
+    workers = [threading.Thread(target=loop) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    return workers, results
+
+
+def measure(base_url, token, email, args):
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def dashboard(session):
+        status = session.get(f"{base_url}/api/stats?days=30", headers=headers).status_code
+        return session.get(f"{base_url}/api/entries?limit=10", headers=headers).status_code if status == 200 else status
+
+    def login(session):
+        return session.post(f"{base_url}/api/login", json={"email": email, "password": seed.PASSWORD}).status_code
+
+    phases = {}
+    for phase, login_threads in (("idle", 0), ("login_storm", args.login_threads)):
+        storm, logins = run_clients(login_threads, args.seconds, login)
+        readers, reads = run_clients(args.dashboard_threads, args.seconds, dashboard)
+        for worker in storm + readers:
+            worker.join()
+        phases[phase] = {
+            "dashboard": percentiles([ms for status, ms in reads if status == 200]),
+            "dashboard_errors": sum(status != 200 for status, _ in reads),
+            "logins_ok": sum(status == 200 for status, _ in logins),
+            "logins_rejected": sum(status == 503 for status, _ in logins),
+            "login": percentiles([ms for status, ms in logins if status == 200]),
+        }
+    return phases
+
+
+def serve(port):
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    from werkzeug.serving import run_simple
+    run_simple("127.0.0.1", port, app.app, threaded=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--login-threads", type=int, default=16)
+    parser.add_argument("--dashboard-threads", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8768)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        return serve(args.port)
+
+    app.init_db()
+    conn = app.connect_db()
+    try:
+        user_id = seed.seed(conn, 1, 2000, 90, prefix="login-storm")[0]
+    finally:
+        conn.close()
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    for name in args.scenarios:
+        env = {**os.environ, "DB_POOL_MAX": str(args.login_threads + args.dashboard_threads + 4), **SCENARIOS[name]}
+        server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", "--port", str(args.port)], env=env)
+        try:
+            for _ in range(100):
+                try:
+                    requests.get(f"{base_url}/api/health", timeout=1)
+                    break
+                except requests.ConnectionError:
+                    time.sleep(0.1)
+            token = app.create_jwt_token(user_id)
+            for phase, result in measure(base_url, token, "login-storm-0@example.com", args).items():
+                print(json.dumps({"scenario": name, "phase": phase, **result}))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
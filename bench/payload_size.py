@@ -0,0 +1,84 @@
+"""Compares GET /api/entries payload size and latency for the legacy and lean shapes.
+
+Seeds one user with --entries entries, then requests pages of each --limits
+size through the Flask test client, so the timing covers the queries,
+building the response and encoding it:
+
+- "legacy": the default response, where every entry's timestamp, score
+  and distribution also appear in original_trend and multi_trend
+- "lean": what the dashboard asks for, ?include=entries,trend with only the
+  fields it renders and the columnar trend
+
+Each shape is measured with the stdlib JSON encoder and, when it is
+installed, with orjson. The response cache is disabled so every request
+does the full work.
+
+    python bench/payload_size.py --entries 5000 --limits 10 100 500 --repeat 30
+
+Prints one JSON object per (limit, shape, encoder) with the body size in
+bytes (raw and gzipped) and median/p95 latency in ms.
+"""
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ["RESPONSE_CACHE_SIZE"] = "0"
+
+import app  # noqa: E402
+import seed  # noqa: E402
+
+LEAN_QUERY = "include=entries,trend&fields=id,content,emotion_label,emotion_score,created_at"
+
+
+def measure(client, url, headers, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        samples.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.data
+    samples.sort()
+    body = response.get_data()
+    return {
+        "bytes": len(body),
+        "gzip_bytes": len(gzip.compress(body)),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--limits", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    app.init_db()
+    conn = app.connect_db()
+    try:
+        user_id = seed.seed(conn, 1, args.entries, 365, prefix=f"payload-{args.entries}")[0]
+    finally:
+        conn.close()
+
+    client = app.app.test_client()
+    headers = {"Authorization": f"Bearer {app.create_jwt_token(user_id)}"}
+    encoders = {"stdlib": None}
+    if app.orjson is not None:
+        encoders["orjson"] = app.orjson
+    for limit in args.limits:
+        for shape, query in (("legacy", ""), ("lean", LEAN_QUERY)):
+            url = f"/api/entries?limit={limit}&total=none" + (f"&{query}" if query else "")
+            for encoder, module in encoders.items():
+                app.orjson = module
+                result = measure(client, url, headers, args.repeat)
+                print(json.dumps({"limit": limit, "shape": shape, "encoder": encoder, **result}))
+
+
+if __name__ == "__main__":
+    main()
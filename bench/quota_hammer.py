@@ -0,0 +1,86 @@
+"""Hammers one user with concurrent entry creation and checks the monthly limit holds.
+
+Starts the app and a fake inference server in-process, creates a fresh
+user on the chosen plan and fires --requests POST /api/entries calls from
+--concurrency threads. Afterwards the number of stored entries and the
+user's counter must both equal the plan's max_entries (or the number of
+requests, if lower); the script exits non-zero otherwise.
+
+    python bench/quota_hammer.py --tier free --requests 200 --concurrency 50
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import requests  # noqa: E402
+from werkzeug.serving import make_server  # noqa: E402
+
+import fake_inference  # noqa: E402
+
+INFERENCE_PORT = 8766
+os.environ["EMOTION_API_URL"] = f"http://127.0.0.1:{INFERENCE_PORT}/"
+
+import app  # noqa: E402
+import seed  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tier", default="free", choices=list(app.SUBSCRIPTION_PLANS))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=50, help="fake inference latency")
+    parser.add_argument("--async", dest="async_mode", action="store_true", help="create entries with ?async=1")
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    app.init_db()
+    fake_inference.serve(port=INFERENCE_PORT, latency_ms=args.latency_ms)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", args.port, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    conn = app.connect_db()
+    cur = conn.cursor()
+    user_id = seed.create_user(cur, f"quota-{uuid.uuid4().hex[:12]}@example.com", args.tier)
+    conn.commit()
+
+    url = f"http://127.0.0.1:{args.port}/api/entries" + ("?async=1" if args.async_mode else "")
+    headers = {"Authorization": f"Bearer {app.create_jwt_token(user_id)}"}
+
+    def post(n):
+        return requests.post(url, json={"content": f"hammer entry {n} {uuid.uuid4()}"}, headers=headers).status_code
+
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        statuses = list(pool.map(post, range(args.requests)))
+    server.shutdown()
+
+    cur.execute("SELECT COUNT(*) FROM entries WHERE user_id = %s", (user_id,))
+    stored = cur.fetchone()[0]
+    cur.execute("SELECT entries_this_month FROM users WHERE id = %s", (user_id,))
+    counter = cur.fetchone()[0]
+    conn.close()
+
+    expected = min(app.SUBSCRIPTION_PLANS[args.tier]["max_entries"], args.requests)
+    result = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "limit": app.SUBSCRIPTION_PLANS[args.tier]["max_entries"],
+        "statuses": {str(code): statuses.count(code) for code in sorted(set(statuses))},
+        "stored_entries": stored,
+        "counter": counter,
+        "ok": stored == counter == expected,
+    }
+    print(json.dumps(result))
+    sys.exit(0 if result["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Measures GET /api/entries/search query time over a large seeded corpus.
+
+Seeds --users users with --entries-per-user entries each (a million in
+all by default). Entry texts are drawn from a fixed vocabulary with a
+Zipf-like skew, so the terms range from very common to rare. Users that
+already hold that many entries are reused, so reruns skip the seeding.
+Each of --terms is then searched in one user's journal (the default
+terms run from common to absent):
+
+- "search": entry_search_query as the endpoint runs it, for the first
+  page and for the page reached after --depth cursor steps
+- "ilike": content ILIKE '%word%' for every word of the term, newest
+  first, which is what search costs without the tsvector index (and
+  without ranking)
+
+    python bench/search_scaling.py --users 100 --entries-per-user 10000 --repeat 20
+
+Prints one JSON object per (term, method) with the number of matches,
+median/p95 in ms and whether the plan used entries_content_tsv_idx.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from psycopg2.extras import RealDictCursor  # noqa: E402
+
+import app  # noqa: E402
+import seed  # noqa: E402
+
+# Most frequent first; the word at position k is drawn with probability ~1/k
+VOCABULARY = """
+    today work tired family sleep friends happy coffee morning evening stress meeting walk dinner
+    anxious weekend project deadline mother father sister brother rain sunny calm phone email
+    gym run lunch office team boss call tea headache music movie book cooking garden dog cat
+    train traffic budget doctor appointment birthday party beach hike mountain river park
+    grateful lonely excited worried angry bored proud nervous hopeful relaxed overwhelmed
+    presentation interview promotion vacation airport hotel museum concert festival wedding
+    neighbor landlord plumber dentist therapist yoga meditation journal painting pottery
+    violin piano guitar chess puzzle marathon bicycle kayak telescope origami calligraphy
+""".split()
+
+SEED_CORPUS_SQL = """
+    INSERT INTO entries (user_id, content, emotion_label, emotion_score, created_at)
+    SELECT %(user_id)s,
+           array_to_string(ARRAY(
+               SELECT words[floor(power(%(vocabulary)s, random()))::int]
+               FROM generate_series(1, 8 + g %% 25)
+           ), ' '),
+           labels[1 + g %% 7],
+           round((30 + random() * 70)::numeric, 2),
+           NOW() - random() * %(days)s * INTERVAL '1 day'
+    FROM generate_series(1, %(count)s) g,
+         (SELECT %(words)s::text[] AS words, %(labels)s::varchar[] AS labels) v
+"""
+
+ILIKE_SQL = f"""
+    SELECT {app.ENTRY_COLUMNS}
+    FROM entries
+    WHERE user_id = %(user_id)s AND created_at >= {app.HISTORY_START_SQL % '%(history_days)s'}
+      AND content ILIKE ALL(%(patterns)s)
+    ORDER BY created_at DESC, id DESC
+    LIMIT %(limit)s
+"""
+
+
+def seed_corpus(conn, users, entries_per_user, days):
+    """Creates the benchmark users and their entries unless they already exist; returns their ids."""
+    cur = conn.cursor()
+    password_hash = app.hash_password(seed.PASSWORD)
+    user_ids = []
+    for n in range(users):
+        user_id = seed.create_user(cur, f"search-bench-{n}@example.com", "enterprise", password_hash)
+        cur.execute("SELECT COUNT(*) FROM entries WHERE user_id = %s", (user_id,))
+        if cur.fetchone()[0] != entries_per_user:
+            cur.execute("DELETE FROM entries WHERE user_id = %s", (user_id,))
+            cur.execute(SEED_CORPUS_SQL, {
+                "user_id": user_id, "count": entries_per_user, "days": days, "words": VOCABULARY,
+                "vocabulary": len(VOCABULARY), "labels": list(app.EMOTION_LABELS),
+            })
+        conn.commit()
+        user_ids.append(user_id)
+    cur.execute("ANALYZE entries")
+    conn.commit()
+    return user_ids
+
+
+def uses_index(plan, name):
+    return plan.get("Index Name") == name or any(uses_index(child, name) for child in plan.get("Plans", []))
+
+
+def measure(cur, sql, params, repeat):
+    cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+    plan = cur.fetchone()['QUERY PLAN']
+    plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cur.execute(sql, params)
+        cur.fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "uses_tsv_index": uses_index(plan, "entries_content_tsv_idx"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--entries-per-user", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--terms", nargs="+", default=["today", "coffee", "garden", "violin", "coffee garden", "xylophone"])
+    parser.add_argument("--emotion", help="also filter every search by this emotion label")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--depth", type=int, default=10, help="cursor steps to the deep page")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app.init_db()
+    conn = app.connect_db()
+    try:
+        user_id = seed_corpus(conn, args.users, args.entries_per_user, args.days)[0]
+        history_days = app.SUBSCRIPTION_PLANS["enterprise"]["history_days"]
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        for term in args.terms:
+            cur.execute(
+                "SELECT COUNT(*) AS count FROM entries WHERE user_id = %s AND content_tsv @@ websearch_to_tsquery('english', %s)",
+                (user_id, term))
+            matches = cur.fetchone()['count']
+
+            cursor = None
+            for page in range(args.depth + 1):
+                sql, params = app.entry_search_query(user_id, history_days, term, args.limit, args.emotion, cursor=cursor)
+                if page in (0, args.depth):
+                    result = measure(cur, sql, params, args.repeat)
+                    print(json.dumps({"term": term, "method": "search", "page": page, "matches": matches, **result}))
+                cur.execute(sql, params)
+                rows = cur.fetchall()
+                if len(rows) <= args.limit:
+                    break
+                row = rows[args.limit - 1]
+                cursor = (row['rank'], row['created_at'], row['id'])
+
+            params = {"user_id": user_id, "history_days": history_days, "limit": args.limit + 1,
+                      "patterns": [f"%{word}%" for word in term.split()]}
+            result = measure(cur, ILIKE_SQL, params, args.repeat)
+            print(json.dumps({"term": term, "method": "ilike", "page": 0, "matches": matches, **result}))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Seeds a database with synthetic users and analyzed journal entries.
+
+Entries are generated server-side with generate_series, so seeding
+hundreds of thousands of rows takes seconds. Seeded users all have the
+password "password" and emails bench-<n>@example.com.
+
+    python bench/seed.py --users 50 --entries-per-user 2000 --days 365
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import app  # noqa: E402
+
+PASSWORD = "password"
+
+SEED_ENTRIES_SQL = """
+    INSERT INTO entries (user_id, content, emotion_label, emotion_score, emotion_scores, created_at)
+    SELECT %(user_id)s,
+           'Seeded journal entry ' || g || ' about work, family and sleep',
+           labels[1 + (g * 7919) %% 7],
+           top_score,
+           ARRAY(SELECT CASE WHEN i = 1 + (g * 7919) %% 7 THEN top_score ELSE round((100 - top_score) / 6, 2) END
+                 FROM generate_series(1, 7) i)::real[],
+           NOW() - random() * %(days)s * INTERVAL '1 day'
+    FROM generate_series(1, %(count)s) g,
+         LATERAL (SELECT round(30 + ((g::bigint * 2654435761) %% 6500) / 100.0, 2) AS top_score) s,
+         (SELECT %(labels)s::varchar[] AS labels) l
+"""
+
+
+def create_user(cur, email, tier="enterprise", password_hash=None):
+    cur.execute("""
+        INSERT INTO users (email, password_hash, name, subscription_tier, subscription_start)
+        VALUES (%s, %s, %s, %s, CURRENT_DATE)
+        ON CONFLICT (email) DO UPDATE SET subscription_tier = EXCLUDED.subscription_tier
+        RETURNING id
+    """, (email, password_hash or app.hash_password(PASSWORD), email.split("@")[0], tier))
+    return cur.fetchone()[0]
+
+
+def seed_entries(cur, user_id, count, days):
+    """Inserts ``count`` analyzed entries spread over the last ``days`` days."""
+    cur.execute(SEED_ENTRIES_SQL, {
+        "user_id": user_id, "count": count, "days": days, "labels": list(app.EMOTION_LABELS)
+    })
+
+
+def seed(conn, users, entries_per_user, days, tier="enterprise", prefix="bench"):
+    """Creates ``users`` users with ``entries_per_user`` entries each; returns their ids."""
+    password_hash = app.hash_password(PASSWORD)
+    cur = conn.cursor()
+    user_ids = []
+    for n in range(users):
+        user_id = create_user(cur, f"{prefix}-{n}@example.com", tier, password_hash)
+        seed_entries(cur, user_id, entries_per_user, days)
+        user_ids.append(user_id)
+    app.rebuild_rollups(cur, user_ids)
+    cur.execute("ANALYZE")
+    conn.commit()
+    return user_ids
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--entries-per-user", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--tier", default="enterprise", choices=list(app.SUBSCRIPTION_PLANS))
+    args = parser.parse_args()
+
+    app.init_db()
+    conn = app.connect_db()
+    try:
+        ids = seed(conn, args.users, args.entries_per_user, args.days, args.tier)
+    finally:
+        conn.close()
+    print(f"Seeded {len(ids)} users with {args.entries_per_user} entries each")
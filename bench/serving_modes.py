@@ -0,0 +1,60 @@
+"""Compares gunicorn sync workers with the single-process ASGI mode under the same load.
+
+Runs bench/loadtest.py once per mode against the same seeded users,
+request mix and fake inference latency, then prints loadtest's comparison
+table with the first mode as the baseline, followed by both servers'
+process counts and memory:
+
+    python bench/serving_modes.py --sync-workers 4 --concurrency 64 --latency-ms 250 \\
+        --mix create_entry=50 --output-dir results/serving
+
+"sync" is gunicorn with --sync-workers sync workers, one request per
+process at a time; "asgi" is a single uvicorn worker serving asgi:app
+(needs requirements-asgi.txt). Other arguments, such as --users,
+--seconds or --mix, are passed on to loadtest.py unchanged.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+import loadtest  # noqa: E402
+
+MODES = {
+    "sync": "gunicorn --worker-class sync --workers {workers} --bind 127.0.0.1:{port} app:app",
+    "asgi": "uvicorn asgi:app --workers 1 --host 127.0.0.1 --port {port} --log-level warning",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--sync-workers", type=int, default=4, help="gunicorn workers for the sync mode")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=250, help="fake inference latency")
+    parser.add_argument("--output-dir", default="results/serving")
+    args, loadtest_args = parser.parse_known_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    outputs = []
+    for mode in args.modes:
+        output = os.path.join(args.output_dir, f"{mode}.json")
+        server_cmd = MODES[mode].replace("{workers}", str(args.sync_workers))
+        print(f"{mode}: {server_cmd}", file=sys.stderr)
+        subprocess.run([
+            sys.executable, os.path.join(BENCH_DIR, "loadtest.py"), "--server-cmd", server_cmd,
+            "--concurrency", str(args.concurrency), "--latency-ms", str(args.latency_ms),
+            "--output", output, *loadtest_args
+        ], check=True)
+        outputs.append(output)
+
+    for before, after in zip(outputs, outputs[1:]):
+        print(f"\n{before} -> {after}")
+        loadtest.compare(before, after, max_regression=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Measures how /api/stats query time scales with journal size.
+
+For each size, a fresh user is seeded with that many entries over the last
+year, then the stats queries are timed for several windows. For contrast
+the same aggregates are also computed straight from the entries table,
+which is what the endpoint used to do before the rollups existed.
+
+    python bench/stats_scaling.py --sizes 1000 10000 100000 --repeat 20
+
+Prints one JSON object per (size, window) with median and p95 in ms.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from psycopg2.extras import RealDictCursor  # noqa: E402
+
+import app  # noqa: E402
+import seed  # noqa: E402
+
+ENTRIES_SCAN_SQL = """
+    SELECT GROUPING(emotion_label, created_at::date, EXTRACT(ISODOW FROM created_at)) AS grouping_set,
+           COUNT(*), SUM(emotion_score)
+    FROM entries
+    WHERE user_id = %(user_id)s AND analysis_status = 'done'
+    GROUP BY GROUPING SETS ((), (emotion_label), (created_at::date), (EXTRACT(ISODOW FROM created_at)))
+"""
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--windows", type=int, nargs="+", default=[7, 30, 365])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app.init_db()
+    conn = app.connect_db()
+    try:
+        for size in args.sizes:
+            user_id = seed.seed(conn, 1, size, 365, prefix=f"stats-scale-{size}")[0]
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            for days in args.windows:
+                result = timed(lambda: app.compute_stats(cur, user_id, days), args.repeat)
+                print(json.dumps({"entries": size, "days": days, "source": "rollups", **result}))
+            result = timed(lambda: (cur.execute(ENTRIES_SCAN_SQL, {"user_id": user_id}), cur.fetchall()), args.repeat)
+            print(json.dumps({"entries": size, "days": "all", "source": "entries_scan", **result}))
+            conn.rollback()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,263 @@
-from app import init_db
-init_db()
-print("Database initialized!")
+"""Applies database migrations and checks that the hot queries use indexes.
+
+    python db_setup.py                # apply pending migrations
+    python db_setup.py --status       # list applied and pending migrations
+    python db_setup.py --check-plans  # EXPLAIN the hot queries on seeded data
+    python db_setup.py --check-upgrade  # migrate a scratch copy of the original schema
+    python db_setup.py --check-quota  # race quota reservations against the monthly limit
+    python db_setup.py --maintain     # create entries partitions and apply retention
+"""
+import argparse
+import json
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import psycopg2
+
+import app
+from bench.seed import create_user, seed_entries
+
+# Data as the original app stored it, before any migration existed
+BASELINE_EMOTIONS = [
+    {"label": "joy", "score": 61.5}, {"label": "surprise", "score": 22.0}, {"label": "neutral", "score": 16.5},
+]
+
+
+def hot_queries(user_id, email, history_days=365):
+    """Yields (name, sql, params) for the queries behind the busiest endpoints."""
+    newest = (datetime.now(), 2 ** 31 - 1)
+    yield "login", app.LOGIN_SQL, [email]
+    yield "email_taken", app.EMAIL_TAKEN_SQL, [email]
+    yield "current_user", app.CURRENT_USER_SQL, [user_id]
+    yield ("list_entries", *app.entries_page_query(user_id, history_days, 10))
+    yield ("list_entries_next", *app.entries_page_query(user_id, history_days, 10, cursor=(*newest, "next")))
+    yield ("list_entries_prev", *app.entries_page_query(user_id, history_days, 10, cursor=(datetime(2000, 1, 1), 0, "prev")))
+    yield ("count_entries", *app.entry_count_query(user_id, history_days))
+    yield ("count_entries_approx", *app.entry_count_query(user_id, history_days, approximate=True))
+    yield ("search_entries", *app.entry_search_query(user_id, history_days, "family", 20))
+    yield ("search_entries_filtered", *app.entry_search_query(user_id, history_days, "family sleep", 20, "joy", 50))
+    params = app.stats_params(user_id, 30)
+    yield "stats_aggregate", app.STATS_AGGREGATE_SQL, params
+    yield "stats_correlation", app.correlation_query(params), params
+    params = app.stats_params(user_id, 30, threshold=app.COOCCURRENCE_THRESHOLD + 1)
+    yield "stats_correlation_threshold", app.correlation_query(params), params
+    yield "claim_entries", app.CLAIM_ENTRIES_SQL, [app.ANALYSIS_LEASE_SECONDS, app.EMOTION_BATCH_SIZE]
+
+
+def seq_scans(plan):
+    """Relations read with a sequential scan anywhere in an EXPLAIN (FORMAT JSON) plan."""
+    found = [plan["Relation Name"]] if plan["Node Type"] == "Seq Scan" else []
+    for child in plan.get("Plans", []):
+        found += seq_scans(child)
+    return found
+
+
+def scanned_partitions(plan):
+    """Partitions of entries read anywhere in an EXPLAIN (FORMAT JSON) plan, after pruning."""
+    name = plan.get("Relation Name", "")
+    found = {name} if name == "entries_default" or app.ENTRY_PARTITION_RE.fullmatch(name) else set()
+    for child in plan.get("Plans", []):
+        found |= scanned_partitions(child)
+    return found
+
+
+def check_plans(conn, users, entries_per_user):
+    """Seeds users inside a transaction, EXPLAINs every hot query and rolls back.
+
+    Sequential scans are disabled for the check, so one that remains in a
+    plan means no index can serve the query; otherwise small tables such as
+    users would legitimately be scanned. Returns the number of such queries.
+    Queries on entries also report how many of its partitions they read.
+    """
+    cur = conn.cursor()
+    failures = 0
+    try:
+        user_ids = []
+        for n in range(users):
+            user_ids.append(create_user(cur, f"plan-check-{n}@example.com", password_hash="x"))
+            seed_entries(cur, user_ids[-1], entries_per_user, 365)
+        app.rebuild_rollups(cur, user_ids)
+        cur.execute("ANALYZE")
+        cur.execute("SET LOCAL enable_seqscan = off")
+        partitions = len(app.entry_partitions(cur)) + 1
+        for name, sql, params in hot_queries(user_ids[0], "plan-check-0@example.com"):
+            cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cur.fetchone()[0]
+            plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+            scans = seq_scans(plan)
+            failures += bool(scans)
+            read = len(scanned_partitions(plan))
+            print(f"{'FAIL' if scans else 'ok  '} {name}" + (f" ({read}/{partitions} partitions)" if read else "")
+                  + (f": sequential scan on {', '.join(scans)}" if scans else ""))
+    finally:
+        conn.rollback()
+    return failures
+
+
+def check_upgrade(conn):
+    """Migrates a scratch database holding the original schema and data, then checks the result.
+
+    The scratch database is created next to the configured one and dropped
+    afterwards. Its tables are created without schema_migrations, the way
+    the app's first release left them, so every migration runs against
+    rows it has to carry forward. Returns a list of problems found.
+    """
+    scratch = f"{conn.info.dbname}_upgrade_check"
+    conn.autocommit = True
+    admin = conn.cursor()
+    admin.execute(f"DROP DATABASE IF EXISTS {scratch}")
+    admin.execute(f"CREATE DATABASE {scratch}")
+    problems = []
+    try:
+        old = psycopg2.connect(app.DATABASE_URL, dbname=scratch)
+        try:
+            cur = old.cursor()
+            with open(app.load_migrations()[0][2], encoding="utf-8") as f:
+                cur.execute(f.read())
+            cur.execute("INSERT INTO users (email, password_hash, name) VALUES ('upgrade@example.com', 'x', 'Upgrade') RETURNING id")
+            user_id = cur.fetchone()[0]
+            cur.execute("""
+                INSERT INTO entries (user_id, content, emotion_label, emotion_score, emotions_json, created_at)
+                VALUES (%s, 'A good day at the lake', 'joy', 61.5, %s, NOW() - INTERVAL '3 days')
+            """, (user_id, json.dumps(BASELINE_EMOTIONS)))
+            old.commit()
+
+            applied = app.run_migrations(old)
+            print(f"Applied migrations: {', '.join(f'{v:04d}' for v in applied)}")
+            pending = [f"{v:04d}_{name}" for v, name, applied_at, _ in app.migration_status(cur) if applied_at is None]
+            if pending:
+                problems.append(f"migrations still pending: {', '.join(pending)}")
+            cur.execute("SELECT content, emotion_label, emotion_scores, analysis_status FROM entries WHERE user_id = %s", (user_id,))
+            rows = cur.fetchall()
+            if rows != [("A good day at the lake", "joy", app.emotion_vector(BASELINE_EMOTIONS), "done")]:
+                problems.append(f"entry not carried forward: {rows}")
+            cur.execute("SELECT emotion_label, entry_count FROM emotion_daily_rollups WHERE user_id = %s", (user_id,))
+            if cur.fetchall() != [("joy", 1)]:
+                problems.append("emotion_daily_rollups not backfilled")
+            cur.execute("SELECT COUNT(*) FROM emotion_score_rollups WHERE user_id = %s", (user_id,))
+            if cur.fetchone()[0] != len(BASELINE_EMOTIONS):
+                problems.append("emotion_score_rollups not backfilled")
+            for name, sql, params in hot_queries(user_id, "upgrade@example.com"):
+                try:
+                    cur.execute(sql, params)
+                except psycopg2.Error as err:
+                    problems.append(f"{name} fails on the upgraded schema: {err}".strip())
+                    old.rollback()
+            old.rollback()
+        finally:
+            old.close()
+    finally:
+        admin.execute(f"DROP DATABASE IF EXISTS {scratch}")
+    return problems
+
+
+def check_quota(conn, requests, concurrency):
+    """Races quota reservations for one free-plan user from many connections and checks the counter.
+
+    Runs RESERVE_QUOTA_SQL and RELEASE_QUOTA_SQL the way entry creation
+    does, each call committed on its own connection, so the row lock is all
+    that keeps them from overshooting. Covers all-or-nothing reservations,
+    partial ones after a release, and the month rollover. The user is
+    committed first, so every connection sees it, and deleted afterwards.
+    Returns a list of problems found.
+    """
+    limit = app.SUBSCRIPTION_PLANS["free"]["max_entries"]
+    cur = conn.cursor()
+    user_id = create_user(cur, f"quota-check-{uuid.uuid4().hex[:12]}@example.com", "free", password_hash="x")
+    conn.commit()
+    local = threading.local()
+    opened = []
+    problems = []
+
+    def run(sql, params):
+        if not hasattr(local, "conn"):
+            local.conn = app.connect_db()
+            opened.append(local.conn)
+        worker = local.conn.cursor()
+        worker.execute(sql, params)
+        row = worker.fetchone() if worker.description else None
+        local.conn.commit()
+        return row
+
+    def reserve_all(pool, count, partial=False):
+        params = {"user_id": user_id, "max_entries": limit, "count": count, "partial": partial}
+        return sum(row[0] for row in pool.map(lambda _: run(app.RESERVE_QUOTA_SQL, params), range(requests)))
+
+    def expect(name, reserved, expected):
+        cur.execute("SELECT entries_this_month FROM users WHERE id = %s", (user_id,))
+        used = cur.fetchone()[0]
+        conn.rollback()
+        ok = reserved == expected == used
+        print(f"{'ok  ' if ok else 'FAIL'} {name}: reserved {reserved}, counter {used}")
+        if not ok:
+            problems.append(f"{name}: reserved {reserved} and counter {used}, expected {expected}")
+
+    pool = ThreadPoolExecutor(concurrency)
+    try:
+        expect("reserve one at a time", reserve_all(pool, 1), min(limit, requests))
+        released = min(limit, requests) // 2
+        run(app.RELEASE_QUOTA_SQL, (released, user_id))
+        expect("release", min(limit, requests) - released, min(limit, requests) - released)
+        expect("partial reservations", min(limit, requests) - released + reserve_all(pool, 3, partial=True),
+               min(limit, requests * 3))
+        cur.execute("UPDATE users SET last_reset_date = CURRENT_DATE - INTERVAL '1 month' WHERE id = %s", (user_id,))
+        conn.commit()
+        expect("month rollover", reserve_all(pool, 1), min(limit, requests))
+    finally:
+        pool.shutdown()
+        for worker_conn in opened:
+            worker_conn.close()
+        conn.rollback()
+        cur.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        conn.commit()
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--status", action="store_true", help="list migrations without applying them")
+    parser.add_argument("--check-plans", action="store_true", help="fail if a hot query plans a sequential scan")
+    parser.add_argument("--check-upgrade", action="store_true", help="fail if the original schema does not migrate cleanly")
+    parser.add_argument("--check-quota", action="store_true", help="fail if concurrent reservations overshoot the limit")
+    parser.add_argument("--maintain", action="store_true", help="create entries partitions and apply retention")
+    parser.add_argument("--users", type=int, default=20, help="users seeded for --check-plans")
+    parser.add_argument("--entries-per-user", type=int, default=2000, help="entries seeded per user for --check-plans")
+    parser.add_argument("--requests", type=int, default=200, help="reservations per round for --check-quota")
+    parser.add_argument("--concurrency", type=int, default=50, help="connections reserving at once for --check-quota")
+    args = parser.parse_args()
+
+    conn = app.connect_db()
+    try:
+        if args.status:
+            for version, name, applied_at, checksum_ok in app.migration_status(conn.cursor()):
+                state = applied_at.isoformat(sep=" ", timespec="seconds") if applied_at else "pending"
+                print(f"{version:04d}_{name}: {state}" + ("" if checksum_ok else " (edited since applied)"))
+        elif args.check_plans:
+            app.run_migrations(conn)
+            failed = check_plans(conn, args.users, args.entries_per_user)
+            if failed:
+                sys.exit(f"{failed} hot queries fall back to sequential scans")
+        elif args.check_upgrade:
+            problems = check_upgrade(conn)
+            for problem in problems:
+                print(f"FAIL {problem}")
+            if problems:
+                sys.exit(f"{len(problems)} problems after upgrading the original schema")
+            print("ok   original schema upgrades cleanly")
+        elif args.check_quota:
+            app.run_migrations(conn)
+            problems = check_quota(conn, args.requests, args.concurrency)
+            if problems:
+                sys.exit(f"{len(problems)} quota checks failed")
+        elif args.maintain:
+            app.run_migrations(conn)
+            summary = app.run_entry_maintenance(conn)
+            print(json.dumps(summary) if summary else "Entry maintenance is already running in another process")
+        else:
+            applied = app.run_migrations(conn)
+            print(f"Applied migrations: {', '.join(f'{v:04d}' for v in applied)}" if applied else "Database is up to date")
+    finally:
+        conn.close()
@@ -0,0 +1,8 @@
+-- Entries can be stored before they are analyzed; workers track attempts and retries.
+ALTER TABLE entries
+    ALTER COLUMN emotion_label DROP NOT NULL,
+    ALTER COLUMN emotion_score DROP NOT NULL,
+    ADD COLUMN IF NOT EXISTS analysis_status VARCHAR(16) NOT NULL DEFAULT 'done',
+    ADD COLUMN IF NOT EXISTS analysis_attempts INT NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS analysis_error TEXT NULL,
+    ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP NULL;
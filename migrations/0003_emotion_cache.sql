@@ -0,0 +1,9 @@
+-- Persistent tier of the analyze_emotion cache, keyed by text + model hash
+CREATE TABLE IF NOT EXISTS emotion_cache (
+    cache_key CHAR(64) PRIMARY KEY,
+    model VARCHAR(255) NOT NULL,
+    emotion_label VARCHAR(32) NOT NULL,
+    emotion_score DECIMAL(5,2) NOT NULL,
+    emotions_json JSONB NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
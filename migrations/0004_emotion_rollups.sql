@@ -0,0 +1,35 @@
+-- Per-user daily rollups that /api/stats reads instead of scanning entries.
+-- They are updated in the same transaction as every analyzed entry.
+CREATE TABLE IF NOT EXISTS emotion_daily_rollups (
+    user_id INT NOT NULL,
+    day DATE NOT NULL,
+    emotion_label VARCHAR(32) NOT NULL,
+    entry_count INT NOT NULL DEFAULT 0,
+    score_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day, emotion_label),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS emotion_pair_rollups (
+    user_id INT NOT NULL,
+    day DATE NOT NULL,
+    label_a VARCHAR(32) NOT NULL,
+    label_b VARCHAR(32) NOT NULL,
+    pair_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day, label_a, label_b),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Per-label distribution moments and pair score products for correlation
+CREATE TABLE IF NOT EXISTS emotion_score_rollups (
+    user_id INT NOT NULL,
+    day DATE NOT NULL,
+    emotion_label VARCHAR(32) NOT NULL,
+    score_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    score_sq_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day, emotion_label),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+ALTER TABLE emotion_pair_rollups
+    ADD COLUMN IF NOT EXISTS score_product_sum DOUBLE PRECISION NOT NULL DEFAULT 0;
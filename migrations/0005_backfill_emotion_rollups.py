@@ -0,0 +1,56 @@
+"""Fills the rollups from existing entries, using the configured COOCCURRENCE_THRESHOLD.
+
+The queries read the schema as it is at this point (emotions_json), like
+app.rebuild_rollups did when this migration was written.
+"""
+import os
+
+# One row per (analyzed entry, label) with the label's score in percent
+ENTRY_SCORES_SQL = """
+    SELECT e.user_id, e.created_at::date AS day, x->>'label' AS label, (x->>'score')::float AS score
+    FROM entries e, jsonb_array_elements(e.emotions_json) x
+    WHERE e.analysis_status = 'done' AND e.emotions_json IS NOT NULL
+"""
+
+# One row per (analyzed entry, label pair) with both scores
+ENTRY_PAIRS_SQL = """
+    SELECT e.user_id, e.created_at::date AS day, a.label AS label_a, b.label AS label_b,
+           a.score AS score_a, b.score AS score_b
+    FROM entries e
+    CROSS JOIN LATERAL (
+        SELECT x->>'label' AS label, (x->>'score')::float AS score FROM jsonb_array_elements(e.emotions_json) x
+    ) a
+    CROSS JOIN LATERAL (
+        SELECT x->>'label' AS label, (x->>'score')::float AS score FROM jsonb_array_elements(e.emotions_json) x
+    ) b
+    WHERE e.analysis_status = 'done' AND e.emotions_json IS NOT NULL
+      AND a.label COLLATE "C" < b.label COLLATE "C"
+"""
+
+
+def upgrade(cur):
+    threshold = float(os.getenv("COOCCURRENCE_THRESHOLD", "10"))
+    for table in ("emotion_daily_rollups", "emotion_score_rollups", "emotion_pair_rollups"):
+        cur.execute(f"DELETE FROM {table}")
+    cur.execute("""
+        INSERT INTO emotion_daily_rollups (user_id, day, emotion_label, entry_count, score_sum)
+        SELECT user_id, created_at::date, emotion_label, COUNT(*), SUM(emotion_score)
+        FROM entries
+        WHERE analysis_status = 'done'
+        GROUP BY 1, 2, 3
+    """)
+    cur.execute(f"""
+        INSERT INTO emotion_score_rollups (user_id, day, emotion_label, score_sum, score_sq_sum)
+        SELECT user_id, day, label, SUM(score), SUM(score * score)
+        FROM ({ENTRY_SCORES_SQL}) s
+        GROUP BY 1, 2, 3
+    """)
+    # Labels are ordered with the C collation to match Python's sorted()
+    cur.execute(f"""
+        INSERT INTO emotion_pair_rollups (user_id, day, label_a, label_b, pair_count, score_product_sum)
+        SELECT user_id, day, label_a, label_b,
+               COUNT(*) FILTER (WHERE score_a >= %(threshold)s AND score_b >= %(threshold)s),
+               SUM(score_a * score_b)
+        FROM ({ENTRY_PAIRS_SQL}) p
+        GROUP BY 1, 2, 3, 4
+    """, {"threshold": threshold})
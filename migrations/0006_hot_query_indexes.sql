@@ -0,0 +1,12 @@
+-- Every entries listing, count and entries-based stats query filters on one
+-- user and a created_at range, and pages in (created_at, id) order. Scanned
+-- backwards the same index serves "prev" cursor pages.
+CREATE INDEX IF NOT EXISTS entries_user_created_idx ON entries (user_id, created_at DESC, id DESC);
+
+-- The analysis workers poll for due entries. Only pending and running rows
+-- are indexed, so the index stays tiny however many entries are done.
+CREATE INDEX IF NOT EXISTS entries_analysis_due_idx ON entries (next_attempt_at)
+    WHERE analysis_status IN ('pending', 'running');
+
+-- Email lookups at login and registration use the UNIQUE constraint's index
+-- on users(email); the rollup tables are read through their primary keys.
@@ -0,0 +1,4 @@
+-- Incremented in the same transaction as every write to a user's entries
+-- (new entries, finished analyses), so GET /api/entries, /api/stats and
+-- /api/profile can build their ETags from the users row alone.
+ALTER TABLE users ADD COLUMN IF NOT EXISTS data_version BIGINT NOT NULL DEFAULT 0;
@@ -0,0 +1,9 @@
+-- Full-text search over entry content. The tsvector is a generated column,
+-- so PostgreSQL keeps it current on every insert and update of content;
+-- GET /api/entries/search parses queries with the same 'english' configuration.
+ALTER TABLE entries ADD COLUMN IF NOT EXISTS content_tsv tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', content)) STORED;
+
+-- Searches combine this index with entries_user_created_idx (a BitmapAnd)
+-- to keep only the user's matches in their history window.
+CREATE INDEX IF NOT EXISTS entries_content_tsv_idx ON entries USING GIN (content_tsv);
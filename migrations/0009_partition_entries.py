@@ -0,0 +1,99 @@
+"""Range-partitions entries by month on created_at.
+
+The rows are copied into a partitioned table with one partition per month
+from the oldest entry through three months ahead, plus entries_default
+for anything outside them; entry maintenance in the app creates the
+months after that. The indexes of 0006 and
+0008 are rebuilt on the new table after the copy. A primary key of a
+partitioned table has to include the partition key, so it becomes
+(id, created_at); ids still come from the same sequence.
+
+Also creates entries_archive, where retention moves expired entries.
+"""
+
+PARTITIONED_ENTRIES_SQL = """
+    CREATE TABLE entries_partitioned (
+        id INT NOT NULL DEFAULT nextval('entries_id_seq'),
+        user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+        content TEXT NOT NULL,
+        emotion_label VARCHAR(32) NULL,
+        emotion_score DECIMAL(5,2) NULL,
+        emotions_json JSONB NULL,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        analysis_status VARCHAR(16) NOT NULL DEFAULT 'done',
+        analysis_attempts INT NOT NULL DEFAULT 0,
+        analysis_error TEXT NULL,
+        next_attempt_at TIMESTAMP NULL,
+        content_tsv tsvector GENERATED ALWAYS AS (to_tsvector('english', content)) STORED,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at)
+"""
+
+INDEXES_SQL = """
+    CREATE INDEX entries_user_created_idx ON entries (user_id, created_at DESC, id DESC);
+    CREATE INDEX entries_analysis_due_idx ON entries (next_attempt_at)
+        WHERE analysis_status IN ('pending', 'running');
+    CREATE INDEX entries_content_tsv_idx ON entries USING GIN (content_tsv);
+"""
+
+# The stored columns as of this migration; later ones may add or change some
+COLUMNS = (
+    "id, user_id, content, emotion_label, emotion_score, emotions_json, created_at, "
+    "analysis_status, analysis_attempts, analysis_error, next_attempt_at"
+)
+
+# First day of every month from the oldest entry's (or this one) to three months ahead
+PARTITION_MONTHS_SQL = """
+    SELECT d::date FROM generate_series(
+        date_trunc('month', COALESCE(%s, NOW())), date_trunc('month', NOW()) + INTERVAL '3 months', INTERVAL '1 month'
+    ) d
+"""
+
+ARCHIVE_SQL = """
+    CREATE TABLE IF NOT EXISTS entries_archive (
+        id INT NOT NULL,
+        user_id INT NOT NULL,
+        content TEXT NOT NULL,
+        emotion_label VARCHAR(32) NULL,
+        emotion_score DECIMAL(5,2) NULL,
+        emotions_json JSONB NULL,
+        created_at TIMESTAMP NOT NULL,
+        analysis_status VARCHAR(16) NOT NULL,
+        analysis_attempts INT NOT NULL,
+        analysis_error TEXT NULL,
+        next_attempt_at TIMESTAMP NULL,
+        archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, created_at)
+    );
+    CREATE INDEX IF NOT EXISTS entries_archive_user_created_idx ON entries_archive (user_id, created_at);
+"""
+
+
+def upgrade(cur):
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = 'entries'::regclass")
+    if cur.fetchone()[0] != 'p':
+        cur.execute("SELECT MIN(created_at) FROM entries")
+        oldest = cur.fetchone()[0]
+        cur.execute("UPDATE entries SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+        # The old table owns the id sequence; detach it so dropping the table keeps it
+        cur.execute("ALTER SEQUENCE entries_id_seq OWNED BY NONE")
+        cur.execute(PARTITIONED_ENTRIES_SQL)
+        cur.execute("ALTER TABLE entries RENAME TO entries_unpartitioned")
+        cur.execute("ALTER TABLE entries_partitioned RENAME TO entries")
+        cur.execute("CREATE TABLE entries_default PARTITION OF entries DEFAULT")
+        cur.execute(PARTITION_MONTHS_SQL, (oldest,))
+        for (month,) in cur.fetchall():
+            cur.execute(f"""
+                CREATE TABLE entries_p{month:%Y%m} PARTITION OF entries
+                FOR VALUES FROM (%s) TO (%s::date + INTERVAL '1 month')
+            """, (month, month))
+        cur.execute(f"""
+            INSERT INTO entries ({COLUMNS})
+            SELECT {COLUMNS} FROM entries_unpartitioned
+        """)
+        cur.execute("DROP TABLE entries_unpartitioned")
+        cur.execute("ALTER SEQUENCE entries_id_seq OWNED BY entries.id")
+        cur.execute("ALTER TABLE entries RENAME CONSTRAINT entries_partitioned_pkey TO entries_pkey")
+        cur.execute("ALTER TABLE entries RENAME CONSTRAINT entries_partitioned_user_id_fkey TO entries_user_id_fkey")
+        cur.execute(INDEXES_SQL)
+    cur.execute(ARCHIVE_SQL)
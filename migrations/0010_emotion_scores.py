@@ -0,0 +1,38 @@
+"""Stores emotion distributions as fixed-order real[] vectors.
+
+emotions_json repeated every label name in every row. emotion_scores holds
+one score per label of EMOTION_LABELS, in that order, with NULL for labels
+the model did not return. ALTER COLUMN ... TYPE rewrites each table once,
+so no dead copy of the JSON is left behind, and rebuilds its indexes.
+Archived months detached from entries are converted too.
+"""
+
+VECTOR_FUNCTION_SQL = """
+    CREATE FUNCTION pg_temp.emotion_vector(distribution JSONB, labels TEXT[]) RETURNS REAL[]
+    LANGUAGE sql IMMUTABLE STRICT AS $$
+        SELECT array_agg(
+            (SELECT (x->>'score')::real FROM jsonb_array_elements(distribution) x WHERE x->>'label' = l LIMIT 1)
+            ORDER BY i
+        )
+        FROM unnest(labels) WITH ORDINALITY AS u(l, i)
+    $$
+"""
+
+
+# EMOTION_LABELS as of this migration: the order of the scores in every vector
+LABELS = ['joy', 'sadness', 'anger', 'fear', 'disgust', 'surprise', 'neutral']
+
+
+def upgrade(cur):
+    cur.execute(VECTOR_FUNCTION_SQL)
+    cur.execute("""
+        SELECT relname FROM pg_class
+        WHERE relkind = 'r' AND relname ~ '^entries_archive_p[0-9]{6}$' AND pg_table_is_visible(oid)
+    """)
+    tables = ["entries", "entries_archive", "emotion_cache"] + [name for (name,) in cur.fetchall()]
+    for table in tables:
+        cur.execute(f"""
+            ALTER TABLE {table} ALTER COLUMN emotions_json TYPE REAL[]
+            USING pg_temp.emotion_vector(emotions_json, %s)
+        """, (LABELS,))
+        cur.execute(f"ALTER TABLE {table} RENAME COLUMN emotions_json TO emotion_scores")
@@ -0,0 +1,32 @@
+"""Records which model scored each entry, and tracks re-analysis runs.
+
+emotion_model is set whenever an entry is analyzed; entries analyzed
+before this migration keep NULL, since the model that scored them is not
+known. reanalysis_checkpoints holds the progress of reanalyze.py, one row
+per target model. Archived months detached from entries get the column
+too, so they can still be attached or copied like the other tables.
+"""
+
+CHECKPOINTS_SQL = """
+    CREATE TABLE IF NOT EXISTS reanalysis_checkpoints (
+        model VARCHAR(255) PRIMARY KEY,
+        user_id INT NOT NULL DEFAULT 0,
+        created_at TIMESTAMP NULL,
+        entry_id INT NULL,
+        entries_scanned BIGINT NOT NULL DEFAULT 0,
+        entries_updated BIGINT NOT NULL DEFAULT 0,
+        started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        finished_at TIMESTAMP NULL
+    )
+"""
+
+
+def upgrade(cur):
+    cur.execute("""
+        SELECT relname FROM pg_class
+        WHERE relkind = 'r' AND relname ~ '^entries_archive_p[0-9]{6}$' AND pg_table_is_visible(oid)
+    """)
+    for table in ["entries", "entries_archive"] + [name for (name,) in cur.fetchall()]:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS emotion_model VARCHAR(255) NULL")
+    cur.execute(CHECKPOINTS_SQL)
@@ -0,0 +1,225 @@
+"""Re-scores analyzed entries with the configured EMOTION_MODEL.
+
+Changing EMOTION_MODEL only affects entries analyzed from then on. This
+re-analyzes the others: every done entry whose emotion_model differs.
+
+    EMOTION_MODEL=org/new-model python reanalyze.py   # start the pass, or resume it after a crash
+    python reanalyze.py --status                       # progress of every pass
+    python reanalyze.py --restart                      # run another pass over the whole table
+
+Users are handled in id order. Each user's stale entries are streamed
+from a server-side cursor and analyzed --chunk-size at a time through
+analyze_emotions, which reuses cached results and sends the misses in
+EMOTION_BATCH_SIZE requests, at most EMOTION_BATCH_CONCURRENCY in flight.
+Each chunk is written back with one UPDATE, in the same transaction that
+advances the pass's row in reanalysis_checkpoints and bumps the user's
+data_version. The user's rollups are rebuilt once all their entries are
+done. Running the command again after a crash or Ctrl-C continues after
+the last saved chunk.
+
+If any entry of a chunk fails to analyze, the chunk is not written and
+the run stops. The results that did come back are cached, so the resumed
+run does not pay for them again. A pass does not return to users it has
+finished, so entries the old model analyzed meanwhile (e.g. in app
+processes not yet restarted with the new one) need a --restart pass.
+Archived entries are left as they are.
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+from psycopg2.extras import RealDictCursor, execute_values
+
+import app
+
+# Arbitrary advisory lock key; only one re-analysis runs at a time
+REANALYSIS_LOCK_ID = 720_106
+PROGRESS_SECONDS = 30
+
+STALE_ENTRIES_SQL = """
+    SELECT id, created_at, content
+    FROM entries
+    WHERE user_id = %(user_id)s AND analysis_status = 'done' AND emotion_model IS DISTINCT FROM %(model)s
+      AND created_at >= %(created_at)s AND (created_at, id) > (%(created_at)s, %(entry_id)s)
+    ORDER BY created_at, id
+"""
+UPDATE_ENTRIES_SQL = """
+    UPDATE entries e
+    SET emotion_label = v.label, emotion_score = v.score, emotion_scores = v.scores, emotion_model = v.model
+    FROM (VALUES %s) v(id, created_at, label, score, scores, model)
+    WHERE e.id = v.id AND e.created_at = v.created_at AND e.analysis_status = 'done'
+"""
+UPDATE_ENTRIES_TEMPLATE = "(%s, %s::timestamp, %s, %s::numeric, %s::real[], %s)"
+
+# A pass has finished every user up to user_id; created_at and entry_id are
+# the last entry saved while user_id itself is still in progress, else NULL.
+START_PASS_SQL = "INSERT INTO reanalysis_checkpoints (model) VALUES (%s) ON CONFLICT (model) DO NOTHING"
+RESTART_PASS_SQL = """
+    UPDATE reanalysis_checkpoints
+    SET user_id = 0, created_at = NULL, entry_id = NULL, entries_scanned = 0, entries_updated = 0,
+        started_at = NOW(), updated_at = NOW(), finished_at = NULL
+    WHERE model = %s
+"""
+CHECKPOINT_SQL = "SELECT * FROM reanalysis_checkpoints WHERE model = %s"
+SAVE_CHECKPOINT_SQL = """
+    UPDATE reanalysis_checkpoints
+    SET user_id = %(user_id)s, created_at = %(created_at)s, entry_id = %(entry_id)s,
+        entries_scanned = entries_scanned + %(scanned)s, entries_updated = entries_updated + %(updated)s,
+        updated_at = NOW()
+    WHERE model = %(model)s
+"""
+FINISH_PASS_SQL = "UPDATE reanalysis_checkpoints SET updated_at = NOW(), finished_at = NOW() WHERE model = %s"
+STALE_COUNT_SQL = """
+    SELECT COUNT(*) FROM entries WHERE analysis_status = 'done' AND emotion_model IS DISTINCT FROM %s
+"""
+
+
+class Reanalysis:
+    """One pass of re-analysis towards ``model``.
+
+    Entries are read on ``read_conn`` and written on ``conn``, so that
+    committing a chunk does not close the cursor streaming the user's
+    entries. The read transaction ends with each user.
+    """
+
+    def __init__(self, read_conn, conn, model, chunk_size):
+        self.read_conn = read_conn
+        self.conn = conn
+        self.model = model
+        self.chunk_size = max(1, chunk_size)
+        self.scanned = 0
+        self.updated = 0
+        self.started = time.monotonic()
+        self.reported = self.started
+
+    def run(self, restart=False):
+        """Runs or resumes the pass; returns its checkpoint row, or None if another run holds the lock."""
+        cur = self.conn.cursor(cursor_factory=RealDictCursor)
+        # A session lock, released when the connection closes however the run ends
+        cur.execute("SELECT pg_try_advisory_lock(%s) AS locked", (REANALYSIS_LOCK_ID,))
+        if not cur.fetchone()['locked']:
+            self.conn.commit()
+            return None
+        cur.execute(START_PASS_SQL, (self.model,))
+        if restart:
+            cur.execute(RESTART_PASS_SQL, (self.model,))
+        cur.execute(CHECKPOINT_SQL, (self.model,))
+        checkpoint = cur.fetchone()
+        if checkpoint['finished_at'] is not None:
+            self.conn.commit()
+            return checkpoint
+        cur.execute("SELECT id FROM users WHERE id > %s ORDER BY id", (checkpoint['user_id'],))
+        user_ids = [row['id'] for row in cur.fetchall()]
+        self.conn.commit()
+
+        if checkpoint['created_at'] is not None:
+            self.reanalyze_user(checkpoint['user_id'], (checkpoint['created_at'], checkpoint['entry_id']), True)
+        for user_id in user_ids:
+            self.reanalyze_user(user_id)
+        cur.execute(FINISH_PASS_SQL, (self.model,))
+        cur.execute(CHECKPOINT_SQL, (self.model,))
+        checkpoint = cur.fetchone()
+        self.conn.commit()
+        return checkpoint
+
+    def reanalyze_user(self, user_id, after=(datetime.min, 0), resumed=False):
+        """Re-analyzes the user's stale entries after ``after`` (created_at, id), then rebuilds their rollups.
+
+        ``resumed`` marks a user an earlier run had started, whose rollups
+        need rebuilding even if no entries are left.
+        """
+        read = self.read_conn.cursor(name=f"reanalyze_{user_id}")
+        updated = 0
+        try:
+            read.execute(STALE_ENTRIES_SQL, {
+                "user_id": user_id, "model": self.model, "created_at": after[0], "entry_id": after[1],
+            })
+            while True:
+                rows = read.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                updated += self.save_chunk(user_id, rows)
+        finally:
+            read.close()
+            self.read_conn.commit()
+
+        cur = self.conn.cursor()
+        if updated or resumed:
+            app.rebuild_rollups(cur, [user_id])
+            app.bump_data_version(cur, user_id)
+        cur.execute(SAVE_CHECKPOINT_SQL, {
+            "model": self.model, "user_id": user_id, "created_at": None, "entry_id": None, "scanned": 0, "updated": 0,
+        })
+        self.conn.commit()
+
+    def save_chunk(self, user_id, rows):
+        """Analyzes one chunk of (id, created_at, content) rows and writes it back; returns the rows updated."""
+        results = app.analyze_emotions([content for _, _, content in rows])
+        failed = [result for result in results if isinstance(result, Exception)]
+        if failed:
+            raise RuntimeError(f"{len(failed)} of {len(rows)} entries of user {user_id} could not be analyzed: {failed[0]}")
+
+        cur = self.conn.cursor()
+        values = [(entry_id, created_at, *result, self.model) for (entry_id, created_at, _), result in zip(rows, results)]
+        execute_values(cur, UPDATE_ENTRIES_SQL, values, template=UPDATE_ENTRIES_TEMPLATE, page_size=len(values))
+        updated = cur.rowcount
+        if updated:
+            app.bump_data_version(cur, user_id)
+        last_id, last_created_at, _ = rows[-1]
+        cur.execute(SAVE_CHECKPOINT_SQL, {
+            "model": self.model, "user_id": user_id, "created_at": last_created_at, "entry_id": last_id,
+            "scanned": len(rows), "updated": updated,
+        })
+        self.conn.commit()
+
+        self.scanned += len(rows)
+        self.updated += updated
+        if time.monotonic() - self.reported >= PROGRESS_SECONDS:
+            self.reported = time.monotonic()
+            print(json.dumps({
+                "user_id": user_id, "scanned": self.scanned, "updated": self.updated,
+                "entries_per_second": round(self.scanned / (self.reported - self.started), 1),
+            }), flush=True)
+        return updated
+
+
+def checkpoint_record(checkpoint):
+    return {key: value.isoformat(sep=" ", timespec="seconds") if isinstance(value, datetime) else value
+            for key, value in checkpoint.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--status", action="store_true", help="show every pass and the entries still stale")
+    parser.add_argument("--restart", action="store_true", help="start a new pass from the first user")
+    parser.add_argument("--chunk-size", type=int, default=app.EMOTION_BATCH_SIZE * app.EMOTION_BATCH_CONCURRENCY * 4,
+                        help="entries analyzed and saved per checkpoint")
+    args = parser.parse_args()
+
+    conn = app.connect_db()
+    read_conn = app.connect_db()
+    read_conn.set_session(readonly=True)
+    try:
+        app.run_migrations(conn)
+        if args.status:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute("SELECT * FROM reanalysis_checkpoints ORDER BY started_at")
+            for checkpoint in cur.fetchall():
+                print(json.dumps(checkpoint_record(checkpoint)))
+            cur.execute(STALE_COUNT_SQL, (app.EMOTION_MODEL,))
+            print(json.dumps({"model": app.EMOTION_MODEL, "stale_entries": cur.fetchone()['count']}))
+            conn.rollback()
+        else:
+            started = time.monotonic()
+            try:
+                checkpoint = Reanalysis(read_conn, conn, app.EMOTION_MODEL, args.chunk_size).run(args.restart)
+            except RuntimeError as err:
+                sys.exit(f"{err}; run again to resume")
+            if checkpoint is None:
+                sys.exit("A re-analysis is already running in another process")
+            print(json.dumps({**checkpoint_record(checkpoint), "seconds": round(time.monotonic() - started, 1)}))
+    finally:
+        read_conn.close()
+        conn.close()
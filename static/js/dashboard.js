@@ -1,3 +1,11 @@
+// Entries pager state: the list shows one cursor page at a time
+const ENTRIES_PAGE_SIZE = 10;
+const ENTRY_FIELDS = 'id,content,emotion_label,emotion_score,created_at';
+let entriesPageIndex = 0;
+let entriesTotal = 0;
+let entriesNextCursor = null;
+let entriesPrevCursor = null;
+
 document.addEventListener('DOMContentLoaded', () => {
     const token = localStorage.getItem('authToken');
     const user = JSON.parse(localStorage.getItem('currentUser'));
@@ -12,9 +20,8 @@ document.addEventListener('DOMContentLoaded', () => {
         document.getElementById('userName').textContent = user.name;
     }
     
-    // Fetch initial data and update the UI
-    fetchProfile();
-    fetchStatsAndRenderCharts();
+    // Fetch initial data and update the UI in one round trip
+    loadDashboard();
 
     // Event Listeners for navigation
     document.querySelectorAll('.sidebar nav a').forEach(link => {
@@ -48,9 +55,20 @@ document.addEventListener('DOMContentLoaded', () => {
         window.location.href = '/login.html';
     });
 
+    // Event listeners for the entries pager
+    document.getElementById('prevPage').addEventListener('click', () => {
+        if (entriesPrevCursor) loadEntriesPage(entriesPageIndex - 1, entriesPrevCursor);
+    });
+    document.getElementById('nextPage').addEventListener('click', () => {
+        if (entriesNextCursor) loadEntriesPage(entriesPageIndex + 1, entriesNextCursor);
+    });
+
     // Event listener for saving a new entry
     document.getElementById('saveEntry').addEventListener('click', saveEntry);
 
+    // Event listener for the CSV export button
+    document.getElementById('exportData').addEventListener('click', exportData);
+
     // Event listeners for subscription upgrade buttons
     document.getElementById('upgradePremium').addEventListener('click', () => {
         manageSubscription('premium');
@@ -85,6 +103,51 @@ function showSection(sectionId) {
     document.querySelector(`a[data-section="${sectionId}"]`).classList.add('active');
 }
 
+// Function to fetch the profile, stats and first entries page in one request
+async function loadDashboard() {
+    const token = localStorage.getItem('authToken');
+    const analyticsRangeEl = document.getElementById('analyticsRange');
+    const days = analyticsRangeEl ? analyticsRangeEl.value : 30;
+
+    let url = `/api/dashboard/bootstrap?days=${days}&limit=${ENTRIES_PAGE_SIZE}&include=entries&total=approx`;
+    url += `&fields=${ENTRY_FIELDS}`;
+    try {
+        const response = await fetch(url, {
+            headers: { 'Authorization': `Bearer ${token}` }
+        });
+        if (!response.ok) {
+            throw new Error('Failed to load dashboard');
+        }
+
+        const data = await response.json();
+        renderProfile(data.profile);
+        renderStats(data.stats);
+        entriesTotal = data.entries.total || 0;
+        renderEntryList(data.entries, 0);
+    } catch (error) {
+        console.error('Error loading dashboard:', error);
+    }
+}
+
+// Function to fetch the entries page before or after a cursor from the last page shown
+async function loadEntriesPage(pageIndex, cursor) {
+    const token = localStorage.getItem('authToken');
+    const params = new URLSearchParams({
+        limit: ENTRIES_PAGE_SIZE, include: 'entries', fields: ENTRY_FIELDS, cursor
+    });
+    try {
+        const response = await fetch(`/api/entries?${params}`, {
+            headers: { 'Authorization': `Bearer ${token}` }
+        });
+        if (!response.ok) {
+            throw new Error('Failed to load entries');
+        }
+        renderEntryList(await response.json(), pageIndex);
+    } catch (error) {
+        console.error('Error loading entries:', error);
+    }
+}
+
 // Function to fetch user profile information and update UI
 async function fetchProfile() {
     const token = localStorage.getItem('authToken');
@@ -95,27 +158,62 @@ async function fetchProfile() {
             }
         });
         if (response.ok) {
-            const data = await response.json();
-            const plan = data.plan;
-            const usage = data.usage;
-
-            const planNameEl = document.getElementById('planName');
-            planNameEl.textContent = plan.name;
-            planNameEl.className = `plan-badge ${plan.name.toLowerCase()}`;
-            
-            document.getElementById('entriesCount').textContent = usage.entries_this_month;
-            document.getElementById('entriesLimit').textContent = plan.max_entries;
-            
-            // NOTE: For demonstration, we'll simulate an expired subscription here.
-            // In a real application, this would come from the backend, e.g., data.subscription_expired.
-            const subscriptionExpired = false;
-            updateSubscriptionUI(plan.name.toLowerCase(), subscriptionExpired);
+            renderProfile(await response.json());
         }
     } catch (error) {
         console.error('Error fetching profile:', error);
     }
 }
 
+// Function to update the plan badge, usage and subscription buttons
+function renderProfile(data) {
+    const plan = data.plan;
+    const usage = data.usage;
+
+    const planNameEl = document.getElementById('planName');
+    planNameEl.textContent = plan.name;
+    planNameEl.className = `plan-badge ${plan.name.toLowerCase()}`;
+
+    document.getElementById('entriesCount').textContent = usage.entries_this_month;
+    document.getElementById('entriesLimit').textContent = plan.max_entries;
+
+    // NOTE: For demonstration, we'll simulate an expired subscription here.
+    // In a real application, this would come from the backend, e.g., data.subscription_expired.
+    const subscriptionExpired = false;
+    updateSubscriptionUI(plan.name.toLowerCase(), subscriptionExpired);
+}
+
+// Function to render one page of GET /api/entries into the entries section
+function renderEntryList(page, pageIndex) {
+    const listEl = document.getElementById('entriesList');
+    listEl.innerHTML = '';
+    page.entries.forEach(entry => {
+        const item = document.createElement('div');
+        item.className = 'entry-item';
+
+        const content = document.createElement('div');
+        content.className = 'entry-content';
+        content.textContent = entry.content;
+
+        const meta = document.createElement('div');
+        meta.className = 'entry-meta';
+        const score = entry.emotion_score === null ? '' : ` ${Number(entry.emotion_score).toFixed(2)}%`;
+        meta.textContent = `${entry.emotion_label || 'pending'}${score} · ${new Date(entry.created_at).toLocaleString()}`;
+
+        item.append(content, meta);
+        listEl.appendChild(item);
+    });
+
+    // Cursor pages carry no total, so the first page's approximate one is kept
+    entriesPageIndex = pageIndex;
+    entriesNextCursor = page.next_cursor;
+    entriesPrevCursor = page.prev_cursor;
+    const totalPages = Math.max(pageIndex + 1, Math.ceil(entriesTotal / ENTRIES_PAGE_SIZE));
+    document.getElementById('pageInfo').textContent = `Page ${pageIndex + 1} of ~${totalPages}`;
+    document.getElementById('prevPage').disabled = !entriesPrevCursor;
+    document.getElementById('nextPage').disabled = !entriesNextCursor;
+}
+
 // Function to handle the subscription upgrade and downgrade API call
 async function manageSubscription(planTier) {
     const token = localStorage.getItem('authToken');
@@ -205,28 +303,30 @@ async function fetchStatsAndRenderCharts(days = 30) {
             throw new Error('Failed to fetch stats');
         }
 
-        const statsData = await response.json();
-        
-        // Update stat cards
-        document.getElementById('statTotal').textContent = statsData.total_entries;
-        document.getElementById('statMonth').textContent = statsData.monthly_entries;
-        document.getElementById('statEmotion').textContent = statsData.top_emotion;
-        document.getElementById('statScore').textContent = `${statsData.avg_score.toFixed(2)}%`;
-        
-        // Render all charts
-        renderMoodTrendChart(statsData.mood_trend);
-        renderEmotionDistributionChart(statsData.emotion_distribution);
-        renderWeeklyMoodChart(statsData.weekly_mood_pattern);
-        renderEmotionCorrelationChart(statsData.emotion_correlation);
-
-        // Generate and display insights
-        document.getElementById('insightsContent').innerHTML = generateInsights(statsData);
-
+        renderStats(await response.json());
     } catch (error) {
         console.error('Error fetching stats:', error);
     }
 }
 
+// Function to update the stat cards, charts and insights
+function renderStats(statsData) {
+    // Update stat cards
+    document.getElementById('statTotal').textContent = statsData.total_entries;
+    document.getElementById('statMonth').textContent = statsData.monthly_entries;
+    document.getElementById('statEmotion').textContent = statsData.top_emotion;
+    document.getElementById('statScore').textContent = `${statsData.avg_score.toFixed(2)}%`;
+    
+    // Render all charts
+    renderMoodTrendChart(statsData.mood_trend);
+    renderEmotionDistributionChart(statsData.emotion_distribution);
+    renderWeeklyMoodChart(statsData.weekly_mood_pattern);
+    renderEmotionCorrelationChart(statsData.emotion_correlation);
+
+    // Generate and display insights
+    document.getElementById('insightsContent').innerHTML = generateInsights(statsData);
+}
+
 // Function to save a new journal entry
 async function saveEntry() {
     const content = document.getElementById('content').value.trim();
@@ -253,13 +353,39 @@ async function saveEntry() {
 
         document.getElementById('content').value = '';
         alert('Entry saved successfully!');
-        fetchStatsAndRenderCharts();
+        // The new entry changes the usage count, the stats and the first page of entries
+        loadDashboard();
     } catch (error) {
         console.error('Error saving entry:', error);
         alert(error.message);
     }
 }
 
+// Function to download the journal as CSV
+async function exportData() {
+    const token = localStorage.getItem('authToken');
+    try {
+        const response = await fetch('/api/entries/export?format=csv', {
+            headers: { 'Authorization': `Bearer ${token}` }
+        });
+
+        if (!response.ok) {
+            const error = await response.json();
+            throw new Error(error.error || 'Failed to export entries');
+        }
+
+        const url = URL.createObjectURL(await response.blob());
+        const link = document.createElement('a');
+        link.href = url;
+        link.download = `mood-journal-${new Date().toISOString().slice(0, 10)}.csv`;
+        link.click();
+        URL.revokeObjectURL(url);
+    } catch (error) {
+        console.error('Error exporting entries:', error);
+        alert(error.message);
+    }
+}
+
 // New function to generate insights
 function generateInsights(statsData) {
     const totalEntries = statsData.total_entries;
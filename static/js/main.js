@@ -29,6 +29,8 @@ const pageInfo = document.getElementById("pageInfo");
 let currentPage = 0;
 const pageSize = 10;
 let totalEntries = 0;
+let nextCursor = null;
+let prevCursor = null;
 let chartOriginal, chartMulti;
 
 // Event listeners
@@ -41,11 +43,10 @@ rangeSelect.addEventListener("change", (e) => {
 applyFilterBtn.addEventListener("click", () => loadEntries(0));
 
 prevBtn.addEventListener("click", () => {
-  if (currentPage > 0) loadEntries(currentPage - 1);
+  if (prevCursor) loadEntries(currentPage - 1, prevCursor);
 });
 nextBtn.addEventListener("click", () => {
-  const totalPages = Math.ceil(totalEntries / pageSize);
-  if (currentPage < totalPages - 1) loadEntries(currentPage + 1);
+  if (nextCursor) loadEntries(currentPage + 1, nextCursor);
 });
 
 form.addEventListener("submit", async (e) => {
@@ -106,8 +107,9 @@ function getEmojiForEmotion(label) {
 }
 
 // Load entries and render charts
-async function loadEntries(page = 0) {
-  const offset = page * pageSize;
+// Pages are fetched with opaque cursors; the total is only an estimate and is
+// requested once per filter, on the first page.
+async function loadEntries(page = 0, cursor = null) {
   const range = rangeSelect.value;
   let start_date = "", end_date = "";
 
@@ -123,16 +125,21 @@ async function loadEntries(page = 0) {
     end_date = endDateEl.value;
   }
 
-  let url = `/api/entries?limit=${pageSize}&offset=${offset}`;
+  // Only the fields the list renders, plus the columnar trend for the charts
+  let url = `/api/entries?limit=${pageSize}&include=entries,trend`;
+  url += "&fields=id,content,emotion_label,emotion_score,created_at";
+  url += cursor ? `&cursor=${encodeURIComponent(cursor)}` : "&total=approx";
   if (start_date) url += `&start_date=${encodeURIComponent(start_date)}`;
   if (end_date) url += `&end_date=${encodeURIComponent(end_date)}`;
 
   const res = await api(url);
-  totalEntries = res.total;
+  if (!cursor) totalEntries = res.total;
+  nextCursor = res.next_cursor;
+  prevCursor = res.prev_cursor;
   currentPage = page;
 
   renderEntries(res.entries);
-  renderCharts(res.original_trend, res.multi_trend);
+  renderCharts(res.trend);
   updatePagination();
 }
 
@@ -155,21 +162,23 @@ function renderEntries(entries) {
   });
 }
 
-// Render both charts with emoji in multi-series legend
-function renderCharts(originalTrend, multiTrend) {
+// Render both charts with emoji in multi-series legend.
+// The trend is columnar: created_at[i], score[i] and emotions[label][i]
+// all describe the i-th entry of the page.
+function renderCharts(trend) {
   if (chartOriginal) chartOriginal.destroy();
   if (chartMulti) chartMulti.destroy();
 
+  const dateLabels = trend.created_at.map(t => new Date(t).toLocaleDateString());
+
   // Original trend chart
-  const labelsOriginal = originalTrend.map(e => new Date(e.created_at).toLocaleDateString());
-  const dataOriginal = originalTrend.map(e => e.score);
   chartOriginal = new Chart(chartOriginalCtx, {
     type: "line",
     data: {
-      labels: labelsOriginal,
+      labels: dateLabels,
       datasets: [{
         label: "Top emotion confidence (%)",
-        data: dataOriginal,
+        data: trend.score,
         borderColor: "#60a5fa",
         backgroundColor: "rgba(96,165,250,0.15)",
         fill: true,
@@ -179,18 +188,13 @@ function renderCharts(originalTrend, multiTrend) {
     options: { responsive: true }
   });
 
-  // Multi-series chart
-  const labelsMulti = multiTrend.map(e => new Date(e.created_at).toLocaleDateString());
-  const emotionSet = new Set();
-  multiTrend.forEach(e => (e.emotions || []).forEach(em => emotionSet.add(em.label)));
-  const emotions = Array.from(emotionSet);
+  // Multi-series chart, skipping labels no entry on the page has a score for
+  const emotions = Object.keys(trend.emotions)
+    .filter(label => trend.emotions[label].some(score => score !== null));
 
   const datasets = emotions.map((label, idx) => ({
     label: `${getEmojiForEmotion(label)} ${label}`,
-    data: multiTrend.map(e => {
-      const found = (e.emotions || []).find(em => em.label === label);
-      return found ? found.score : null;
-    }),
+    data: trend.emotions[label],
     borderColor: colorFromPalette(idx),
     backgroundColor: colorFromPalette(idx, 0.15),
     fill: false,
@@ -200,17 +204,17 @@ function renderCharts(originalTrend, multiTrend) {
 
   chartMulti = new Chart(chartMultiCtx, {
     type: "line",
-    data: { labels: labelsMulti, datasets },
+    data: { labels: dateLabels, datasets },
     options: { responsive: true }
   });
 }
 
 // Pagination UI
 function updatePagination() {
-  const totalPages = Math.max(1, Math.ceil(totalEntries / pageSize));
-  pageInfo.textContent = `Page ${currentPage + 1} of ${totalPages}`;
-  prevBtn.disabled = currentPage === 0;
-  nextBtn.disabled = currentPage >= totalPages - 1;
+  const totalPages = Math.max(currentPage + 1, Math.ceil(totalEntries / pageSize));
+  pageInfo.textContent = `Page ${currentPage + 1} of ~${totalPages}`;
+  prevBtn.disabled = !prevCursor;
+  nextBtn.disabled = !nextCursor;
 }
 
 // Color palette helper
@@ -230,10 +234,9 @@ function escapeHtml(s) {
   return String(s).replace(/[&<>"']/g, c => ({ "&":"&amp;","<":"&lt;",">":"&gt;",'"':"&quot;","'":"&#39;" }[c]));
 }
 
-// Initial load
-if (authToken && currentUser) {
-  loadEntries(0);
-} else {
+// Initial load. Signed-in users are already being redirected to the
+// dashboard, whose bootstrap request brings the first page of entries.
+if (!authToken || !currentUser) {
   // Show login form or redirect
   entriesEl.innerHTML = '<p class="no-entries">Please log in to view your entries</p>';
 }
\ No newline at end of file